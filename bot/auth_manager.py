@@ -1,5 +1,6 @@
 import json
 import logging
+from bot.outbox import reply
 
 logger = logging.getLogger(__name__)
 
@@ -22,6 +23,6 @@ async def check_authorized_user(user_id: int, message):
     """
     if not is_allowed_user(user_id):
         logger.warning(f"Unauthorized access attempt by user {user_id}")
-        await message.answer("You are not authorized to use this bot.")
+        reply(message, "You are not authorized to use this bot.")
         return False
     return True
@@ -0,0 +1,345 @@
+"""
+Backtests of exit rules (take-profit, stop-loss, trailing stop) and DCA over stored price series.
+
+    python -m bot.backtest import <mint> prices.csv
+    python -m bot.backtest exits <mint> --tp 10:200:10 --sl 5:50:5 --trail 0,10,20 --hold 24
+    python -m bot.backtest dca <mint> --every 60,240,1440 --tp 0,25,50,100
+"""
+import argparse
+import csv
+import os
+import struct
+import sys
+from time import perf_counter
+from typing import Dict, List, Optional
+import numpy as np
+
+PRICES_DIR = "data/prices"
+INTERVAL_SECONDS = 60
+FEE_BPS = 100           # Per swap: pool fee plus slippage of a typical memecoin trade
+HOLD_CANDLES = 24 * 60  # Exit at the latest after a day
+ENTRY_EVERY = 60        # A simulated entry every hour
+CHUNK_ELEMENTS = 2_000_000
+TOP_RESULTS = 5
+MAX_GRID = 250_000      # Rule combinations per run
+
+# File layout: header | records (price, volume), one per `interval` seconds from `start`
+MAGIC = b"PXS1"
+HEADER = struct.Struct("<4sqIQ")  # magic, start unix time, interval seconds, record count
+RECORD = np.dtype([("price", "<f4"), ("volume", "<f4")])
+
+
+def series_path(mint: str, directory: str = PRICES_DIR) -> str:
+    return os.path.join(directory, f"{mint}.px")
+
+
+def write_series(path: str, start: int, interval: int, prices: np.ndarray, volumes: Optional[np.ndarray] = None):
+    """
+    Write a fixed-interval price/volume series (atomically).
+    """
+    records = np.zeros(len(prices), dtype=RECORD)
+    records["price"] = prices
+    records["volume"] = volumes if volumes is not None else 0.0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, start, interval, len(records)))
+        records.tofile(f)
+    os.replace(tmp_path, path)
+
+
+class PriceSeries:
+    """
+    Memory-mapped price/volume series; `prices` and `volumes` are views into the file.
+    """
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            header = f.read(HEADER.size)
+        if len(header) < HEADER.size:
+            raise ValueError(f"{path} is truncated")
+        magic, self.start, self.interval, count = HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a price series")
+        self.records = np.memmap(path, dtype=RECORD, mode="r", offset=HEADER.size, shape=(count,))
+        self.prices = self.records["price"]
+        self.volumes = self.records["volume"]
+
+    def __len__(self):
+        return len(self.records)
+
+    def last(self, candles: int) -> "PriceSeries":
+        """
+        The same series restricted to its most recent `candles` records.
+        """
+        if candles < 1:
+            raise ValueError("At least one candle is needed.")
+        view = object.__new__(PriceSeries)
+        view.interval = self.interval
+        view.records = self.records[-candles:] if candles < len(self.records) else self.records
+        view.start = self.start + (len(self.records) - len(view.records)) * self.interval
+        view.prices, view.volumes = view.records["price"], view.records["volume"]
+        return view
+
+
+def import_csv(csv_path: str, path: str, interval: int = INTERVAL_SECONDS) -> int:
+    """
+    Convert a "timestamp,price[,volume]" CSV (unix seconds, any order, header optional) to a series
+    on a fixed grid: volume is summed per candle, the last price of a candle wins and empty candles
+    repeat the previous price. Returns the number of candles.
+    """
+    rows = []
+    with open(csv_path, newline="") as f:
+        for row in csv.reader(f):
+            try:
+                rows.append((float(row[0]), float(row[1]), float(row[2]) if len(row) > 2 and row[2] else 0.0))
+            except (ValueError, IndexError):
+                continue  # Header or malformed line
+    if not rows:
+        raise ValueError(f"No price rows in {csv_path}")
+    data = np.array(sorted(rows), dtype=np.float64)
+    start = int(data[0, 0]) // interval * interval
+    slots = ((data[:, 0] - start) // interval).astype(np.int64)
+    count = int(slots[-1]) + 1
+    prices = np.full(count, np.nan)
+    prices[slots] = data[:, 1]  # Sorted by time, so the last write per slot is the close
+    volumes = np.bincount(slots, weights=data[:, 2], minlength=count)
+    filled = np.maximum.accumulate(np.where(np.isnan(prices), 0, np.arange(count)))
+    write_series(path, start, interval, prices[filled], volumes)
+    return count
+
+
+def parse_values(text: str, scale: float = 1.0) -> np.ndarray:
+    """
+    "10,20,50" or "10:100:10" (start:stop:step, stop included) -> array; 0 or "off" disables a rule.
+    """
+    values = []
+    for part in text.split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        if part == "off":
+            values.append(0.0)
+        elif ":" in part:
+            start, stop, step = (float(x) for x in part.split(":"))
+            if step <= 0 or (stop - start) / step > MAX_GRID:
+                raise ValueError(f"Invalid range '{part}'")
+            values.extend(np.arange(start, stop + step / 2, step))
+        else:
+            values.append(float(part))
+    if not values:
+        raise ValueError(f"No values in '{text}'")
+    return np.array(sorted(set(values)), dtype=np.float64) * scale
+
+
+def to_candles(minutes: np.ndarray, interval: int) -> np.ndarray:
+    """
+    Minute durations -> whole candles of `interval` seconds (at least one).
+    """
+    return np.maximum(1, (np.asarray(minutes) * 60 // interval).astype(np.int64))
+
+
+def _first_hits(rows: np.ndarray, thresholds: np.ndarray) -> np.ndarray:
+    """
+    For nondecreasing rows [R, H] and thresholds [K]: index of the first element >= each threshold
+    in each row ([R, K]), H where never reached. One searchsorted over the rows laid end to end,
+    each lifted above the previous one.
+    """
+    count, length = rows.shape
+    low, high = rows.min(), rows.max()
+    span = high - low + 1.0
+    lift = np.arange(count)[:, None] * span
+    flat = (rows - low + lift).ravel()
+    targets = np.clip(thresholds, low, high + 0.5)[None, :] - low + lift
+    return np.searchsorted(flat, targets.ravel(), side="left").reshape(count, -1) - np.arange(count)[:, None] * length
+
+
+def backtest_exits(prices: np.ndarray, take_profit: np.ndarray, stop_loss: np.ndarray, trailing: np.ndarray,
+                   hold: int = HOLD_CANDLES, entry_every: int = ENTRY_EVERY, fee_bps: int = FEE_BPS,
+                   volumes: Optional[np.ndarray] = None, min_volume: float = 0.0) -> Dict[str, np.ndarray]:
+    """
+    Evaluate every (take-profit, stop-loss, trailing) combination on entries taken every `entry_every`
+    candles, each held for at most `hold` candles. Rule values are fractions (0.2 = 20%), 0 disables.
+
+    Per entry the running max, running min and running max drawdown of the window are monotone, so
+    the first candle hitting each threshold of one axis is a searchsorted; the exit of a grid point is
+    the earliest of its three axes, combined by broadcasting over the whole grid. Fills are at the
+    close of the triggering candle and pay `fee_bps` on both sides.
+
+    Returns arrays shaped [tp, sl, trail]: mean_return, win_rate, mean_hold (candles), plus entries
+    and the hold-only baseline return.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    entries = np.arange(0, len(prices) - hold, entry_every)
+    if volumes is not None and min_volume > 0:
+        # Only enter when the volume of the preceding `entry_every` candles reaches min_volume
+        traded = np.concatenate([[0.0], np.cumsum(np.asarray(volumes, dtype=np.float64))])
+        entries = entries[traded[entries + 1] - traded[np.maximum(entries + 1 - entry_every, 0)] >= min_volume]
+    entries = entries[prices[entries] > 0]
+    shape = (len(take_profit), len(stop_loss), len(trailing))
+    if len(entries) == 0:
+        raise ValueError("Not enough price history for this holding period")
+
+    tp_levels = np.where(take_profit > 0, 1 + take_profit, np.inf)
+    sl_levels = np.where(stop_loss > 0, -(1 - stop_loss), np.inf)
+    trail_levels = np.where(trailing > 0, trailing, np.inf)
+    keep = (1 - fee_bps / 10_000) ** 2
+    grid = int(np.prod(shape))
+    if grid > MAX_GRID:
+        raise ValueError(f"{grid} rule combinations, at most {MAX_GRID}")
+    chunk = max(1, min(CHUNK_ELEMENTS // hold, CHUNK_ELEMENTS // grid))
+    windows = np.lib.stride_tricks.sliding_window_view(prices[1:], hold)
+
+    total = np.zeros(shape)
+    wins = np.zeros(shape)
+    held = np.zeros(shape)
+    baseline = 0.0
+    for start in range(0, len(entries), chunk):
+        batch = entries[start:start + chunk]
+        ratio = windows[batch] / prices[batch][:, None]  # [C, hold] price relative to entry
+        running_max = np.maximum.accumulate(ratio, axis=1)
+        peak = np.maximum(running_max, 1.0)  # The entry price counts as the first peak
+        tp_hit = _first_hits(running_max, tp_levels)
+        sl_hit = _first_hits(-np.minimum.accumulate(ratio, axis=1), sl_levels)
+        trail_hit = _first_hits(np.maximum.accumulate(1 - ratio / peak, axis=1), trail_levels)
+
+        exit_at = np.minimum(np.minimum(tp_hit[:, :, None, None], sl_hit[:, None, :, None]),
+                             trail_hit[:, None, None, :])
+        exit_at = np.minimum(exit_at, hold - 1).reshape(len(batch), -1)
+        returns = (np.take_along_axis(ratio, exit_at, axis=1) * keep - 1).reshape(len(batch), *shape)
+        total += returns.sum(axis=0)
+        wins += (returns > 0).sum(axis=0)
+        held += (exit_at + 1).sum(axis=0).reshape(shape)
+        baseline += (ratio[:, -1] * keep - 1).sum()
+
+    count = len(entries)
+    return {
+        "take_profit": take_profit, "stop_loss": stop_loss, "trailing": trailing,
+        "mean_return": total / count, "win_rate": wins / count, "mean_hold": held / count,
+        "entries": np.array(count), "baseline": np.array(baseline / count),
+    }
+
+
+def backtest_dca(prices: np.ndarray, intervals: np.ndarray, take_profit: np.ndarray,
+                 fee_bps: int = FEE_BPS) -> Dict[str, np.ndarray]:
+    """
+    Buy the same SOL amount every `interval` candles from the start of the series and sell everything
+    once the position is up `take_profit` (0 = hold to the end). All intervals are evaluated as rows of
+    one matrix; the take-profit exits are searchsorted on the running max of position value / spent.
+
+    Returns arrays shaped [interval, tp]: total_return, buys, exit_at (candle index).
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    count = len(prices)
+    intervals = np.asarray(intervals, dtype=np.int64)
+    keep = 1 - fee_bps / 10_000
+    levels = np.where(take_profit > 0, 1 + take_profit, np.inf)
+    inverse = np.where(prices > 0, keep / np.where(prices > 0, prices, 1), 0.0)
+    shape = (len(intervals), len(take_profit))
+    if shape[0] * shape[1] > MAX_GRID:
+        raise ValueError(f"{shape[0] * shape[1]} DCA combinations, at most {MAX_GRID}")
+    total_return = np.zeros(shape)
+    buys = np.zeros(shape, np.int64)
+    exit_at = np.zeros(shape, np.int64)
+    chunk = max(1, CHUNK_ELEMENTS // count)
+    candles = np.arange(count)
+    for start in range(0, len(intervals), chunk):
+        every = intervals[start:start + chunk, None]
+        bought = candles[None, :] % every == 0
+        tokens = np.cumsum(np.where(bought, inverse[None, :], 0.0), axis=1)
+        spent = np.cumsum(bought, axis=1)
+        ratio = tokens * prices[None, :] * keep / spent  # Position value per SOL spent
+        hit = np.minimum(_first_hits(np.maximum.accumulate(ratio, axis=1), levels), count - 1)
+        rows = slice(start, start + len(every))
+        total_return[rows] = np.take_along_axis(ratio, hit, axis=1) - 1
+        buys[rows] = hit // every + 1
+        exit_at[rows] = hit
+    return {"intervals": intervals, "take_profit": take_profit, "total_return": total_return,
+            "buys": buys, "exit_at": exit_at}
+
+
+def _percent(value: float) -> str:
+    return "off" if value <= 0 else f"{value * 100:g}%"
+
+
+def _duration(candles: float, interval: int) -> str:
+    minutes = int(candles * interval // 60)
+    return f"{minutes // 60}h{minutes % 60:02d}m" if minutes >= 60 else f"{minutes}m"
+
+
+def render_exits(result: Dict[str, np.ndarray], interval: int = INTERVAL_SECONDS, top: int = TOP_RESULTS) -> str:
+    mean_return = result["mean_return"]
+    best = np.argsort(-mean_return, axis=None, kind="stable")[:top]
+    lines = [f"{int(result['entries'])} entries, {mean_return.size} rule combinations. "
+             f"Holding without rules: {float(result['baseline']) * 100:+.2f}% per trade.", ""]
+    for flat in best:
+        tp, sl, trail = np.unravel_index(flat, mean_return.shape)
+        lines.append(f"TP {_percent(result['take_profit'][tp])} / SL {_percent(result['stop_loss'][sl])} / "
+                     f"trail {_percent(result['trailing'][trail])}: {mean_return[tp, sl, trail] * 100:+.2f}% per trade, "
+                     f"win {result['win_rate'][tp, sl, trail] * 100:.0f}%, "
+                     f"hold {_duration(result['mean_hold'][tp, sl, trail], interval)}")
+    return "\n".join(lines)
+
+
+def render_dca(result: Dict[str, np.ndarray], interval: int = INTERVAL_SECONDS, top: int = TOP_RESULTS) -> str:
+    total_return = result["total_return"]
+    lines = [f"{total_return.size} DCA combinations.", ""]
+    for flat in np.argsort(-total_return, axis=None, kind="stable")[:top]:
+        every, tp = np.unravel_index(flat, total_return.shape)
+        lines.append(f"Every {_duration(result['intervals'][every], interval)}, TP {_percent(result['take_profit'][tp])}: "
+                     f"{total_return[every, tp] * 100:+.2f}% after {result['buys'][every, tp]} buys "
+                     f"({_duration(result['exit_at'][every, tp], interval)})")
+    return "\n".join(lines)
+
+
+# ----------------- CLI -----------------
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(prog="python -m bot.backtest", description="Backtest exit rules and DCA")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    importer = commands.add_parser("import", help="Convert a timestamp,price[,volume] CSV to a price series")
+    importer.add_argument("mint")
+    importer.add_argument("csv")
+    importer.add_argument("--interval", type=int, default=INTERVAL_SECONDS, help="Candle length, seconds")
+
+    for name in ("exits", "dca"):
+        command = commands.add_parser(name)
+        command.add_argument("mint", help="Mint address or path to a .px file")
+        command.add_argument("--days", type=float, default=0, help="Only the last N days (0 = all)")
+        command.add_argument("--fee-bps", type=int, default=FEE_BPS)
+        command.add_argument("--top", type=int, default=TOP_RESULTS)
+        command.add_argument("--tp", default="off,10:200:10", help="Take-profit %% values")
+        if name == "exits":
+            command.add_argument("--sl", default="off,5:50:5", help="Stop-loss %% values")
+            command.add_argument("--trail", default="off,5:30:5", help="Trailing stop distance %% values")
+            command.add_argument("--hold", type=float, default=24, help="Max holding time, hours")
+            command.add_argument("--entry-every", type=float, default=60, help="Minutes between entries")
+            command.add_argument("--min-volume", type=float, default=0, help="Volume required before an entry")
+        else:
+            command.add_argument("--every", default="15,60,240,720,1440", help="Minutes between buys")
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        count = import_csv(args.csv, series_path(args.mint), args.interval)
+        print(f"{count} candles written to {series_path(args.mint)}")
+        return
+
+    series = PriceSeries(args.mint if args.mint.endswith(".px") else series_path(args.mint))
+    if args.days:
+        series = series.last(int(args.days * 86400 // series.interval))
+    started = perf_counter()
+    if args.command == "exits":
+        result = backtest_exits(series.prices, parse_values(args.tp, 0.01), parse_values(args.sl, 0.01),
+                                parse_values(args.trail, 0.01), hold=int(to_candles(args.hold * 60, series.interval)),
+                                entry_every=int(to_candles(args.entry_every, series.interval)), fee_bps=args.fee_bps,
+                                volumes=series.volumes, min_volume=args.min_volume)
+        report = render_exits(result, series.interval, args.top)
+    else:
+        result = backtest_dca(series.prices, to_candles(parse_values(args.every), series.interval), parse_values(args.tp, 0.01), fee_bps=args.fee_bps)
+        report = render_dca(result, series.interval, args.top)
+    print(f"{len(series)} candles, evaluated in {perf_counter() - started:.2f} s\n")
+    print(report)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
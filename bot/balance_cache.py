@@ -0,0 +1,284 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Callable, Dict, Optional, Set
+from solders.pubkey import Pubkey
+from solana.rpc.commitment import Confirmed
+from solana.rpc.websocket_api import connect
+from solders.rpc.responses import AccountNotification, SubscriptionResult
+
+logger = logging.getLogger(__name__)
+
+IDLE_TIMEOUT = 600  # Unsubscribe users that did nothing for 10 minutes
+POLL_INTERVAL = 10  # Fallback polling period while the websocket is down
+RECONNECT_DELAY = 5
+MAX_ACCOUNTS_PER_POLL = 100  # getMultipleAccounts limit
+
+
+def ws_url_from_rpc(rpc_url: str) -> str:
+    """
+    Derive the websocket endpoint from an HTTP RPC url (https -> wss, http -> ws).
+    """
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://"):]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://"):]
+    return rpc_url
+
+
+def parse_token_amount(data: bytes) -> int:
+    """
+    Read the raw amount from SPL token account data (u64 LE at offset 64).
+    Works for both Token and Token-2022 accounts.
+    """
+    if len(data) < 72:
+        return 0
+    return int.from_bytes(data[64:72], "little")
+
+
+class BalanceSubscriptionManager:
+    """
+    Keeps an in-memory balance cache for active users.
+
+    Wallet (SOL) and token accounts are subscribed with `accountSubscribe` over a single
+    multiplexed websocket and updated from push notifications. If the socket drops, tracked
+    accounts are polled with `getMultipleAccounts` until the connection is restored.
+    Users that were not seen for `idle_timeout` seconds are unsubscribed and evicted.
+
+    The cache is only kept current while `run()` is running: without the websocket or a recent
+    fallback poll the getters return None, so callers read from RPC instead of a stale value.
+    """
+
+    def __init__(self, ws_url: Optional[str] = None, idle_timeout: float = IDLE_TIMEOUT,
+                 poll_interval: float = POLL_INTERVAL, clock: Callable[[], float] = monotonic):
+        self.ws_url = ws_url
+        self.idle_timeout = idle_timeout
+        self.poll_interval = poll_interval
+        self.clock = clock
+        self.connected = False
+        self.polled_at: Optional[float] = None  # clock() of the last completed poll_once
+
+        self._balances: Dict[str, int] = {}            # account -> lamports / raw token amount
+        self._token_accounts: Set[str] = set()         # accounts whose balance lives in token data
+        self._wallets: Dict[int, str] = {}             # user_id -> wallet address
+        self._user_tokens: Dict[int, Dict[str, str]] = {}  # user_id -> {mint: token account}
+        self._account_users: Dict[str, Set[int]] = {}  # account -> users referencing it
+        self._last_seen: Dict[int, float] = {}
+        self._subscriptions: Dict[str, int] = {}       # account -> subscription id
+        self._pending: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._ws = None
+
+    # ----------------- Tracking (request path) -----------------
+    def track_wallet(self, user_id: int, wallet: str, lamports: Optional[int] = None):
+        self._touch(user_id)
+        previous = self._wallets.get(user_id)
+        if previous and previous != wallet:
+            self._release(user_id, previous)
+        self._wallets[user_id] = wallet
+        self._retain(user_id, wallet, lamports)
+
+    def track_token_account(self, user_id: int, mint: str, token_account: str, amount: Optional[int] = None):
+        self._touch(user_id)
+        self._token_accounts.add(token_account)
+        self._user_tokens.setdefault(user_id, {})[mint] = token_account
+        self._retain(user_id, token_account, amount)
+
+    def get_sol_balance(self, user_id: int) -> Optional[int]:
+        """
+        Cached lamports of the user's wallet or None if the wallet is not tracked yet.
+        """
+        wallet = self._wallets.get(user_id)
+        if wallet is None or not self.fresh():
+            return None
+        self._touch(user_id)
+        return self._balances.get(wallet)
+
+    def get_token_balance(self, user_id: int, mint: str) -> Optional[int]:
+        """
+        Cached raw token amount of the user's token account for `mint` or None if not tracked yet.
+        """
+        token_account = self._user_tokens.get(user_id, {}).get(mint)
+        if token_account is None or not self.fresh():
+            return None
+        self._touch(user_id)
+        return self._balances.get(token_account)
+
+    def get_account_balance(self, account: str) -> Optional[int]:
+        return self._balances.get(account) if self.fresh() else None
+
+    def fresh(self) -> bool:
+        """
+        Whether cached balances are current: pushed over the websocket or polled within two poll intervals.
+        """
+        if self.connected:
+            return True
+        return self.polled_at is not None and self.clock() - self.polled_at <= 2 * self.poll_interval
+
+    def _touch(self, user_id: int):
+        self._last_seen[user_id] = self.clock()
+
+    def _retain(self, user_id: int, account: str, amount: Optional[int]):
+        users = self._account_users.setdefault(account, set())
+        is_new = not users
+        users.add(user_id)
+        if amount is not None:
+            self._balances[account] = amount
+        if is_new:
+            self._schedule("subscribe", account)
+
+    def _release(self, user_id: int, account: str):
+        users = self._account_users.get(account)
+        if not users:
+            return
+        users.discard(user_id)
+        if not users:
+            del self._account_users[account]
+            self._balances.pop(account, None)
+            self._token_accounts.discard(account)
+            self._schedule("unsubscribe", account)
+
+    def _schedule(self, op: str, account: str):
+        if self._loop is None or self._pending is None:
+            return  # Not running yet, everything is subscribed on connect
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._pending.put_nowait((op, account))
+        else:
+            self._loop.call_soon_threadsafe(self._pending.put_nowait, (op, account))
+
+    # ----------------- Idle eviction -----------------
+    def evict_idle(self):
+        deadline = self.clock() - self.idle_timeout
+        for user_id in [uid for uid, seen in self._last_seen.items() if seen < deadline]:
+            logger.info(f"[{user_id}] idle for {self.idle_timeout}s, dropping balance subscriptions")
+            self.untrack_user(user_id)
+
+    def untrack_user(self, user_id: int):
+        wallet = self._wallets.pop(user_id, None)
+        if wallet:
+            self._release(user_id, wallet)
+        for token_account in self._user_tokens.pop(user_id, {}).values():
+            self._release(user_id, token_account)
+        self._last_seen.pop(user_id, None)
+
+    # ----------------- Background tasks -----------------
+    async def run(self):
+        """
+        Main loop: keep the websocket connected and poll while it is not.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._pending = asyncio.Queue()
+        poller = asyncio.create_task(self._poll_loop())
+        try:
+            while True:
+                try:
+                    await self._listen()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Balance websocket dropped: {e}. Falling back to polling.")
+                finally:
+                    self.connected = False
+                    self._ws = None
+                    self._subscriptions.clear()
+                await asyncio.sleep(RECONNECT_DELAY)
+        finally:
+            poller.cancel()
+
+    async def _listen(self):
+        async with connect(self.ws_url) as ws:
+            self._ws = ws
+            # Drop queued ops, the full tracked set is (re)subscribed below
+            while not self._pending.empty():
+                self._pending.get_nowait()
+            for account in list(self._account_users):
+                await self._subscribe(account)
+            # Updates pushed while we were disconnected are lost, re-seed the cache once
+            await asyncio.to_thread(self.poll_once)
+            self.connected = True
+            logger.info(f"Balance websocket connected, {len(self._account_users)} accounts subscribed")
+
+            commands = asyncio.create_task(self._process_pending())
+            try:
+                while True:
+                    for item in await ws.recv():
+                        self._handle_message(item)
+                    if commands.done():
+                        commands.result()  # Re-raise send errors
+            finally:
+                commands.cancel()
+
+    async def _process_pending(self):
+        while True:
+            op, account = await self._pending.get()
+            if op == "subscribe":
+                if account in self._account_users and account not in self._subscriptions:
+                    await self._subscribe(account)
+            elif op == "unsubscribe":
+                subscription = self._subscriptions.pop(account, None)
+                if subscription is not None and account not in self._account_users:
+                    await self._ws.account_unsubscribe(subscription)
+
+    async def _subscribe(self, account: str):
+        await self._ws.account_subscribe(Pubkey.from_string(account), commitment=Confirmed, encoding="base64")
+
+    def _handle_message(self, item):
+        if isinstance(item, SubscriptionResult):
+            request = self._ws.subscriptions.get(item.result)
+            if request is None:
+                return
+            account = str(request.account)
+            self._subscriptions[account] = item.result
+            if account not in self._account_users:
+                # Released while the subscribe request was in flight
+                self._pending.put_nowait(("unsubscribe", account))
+        elif isinstance(item, AccountNotification):
+            request = self._ws.subscriptions.get(item.subscription)
+            if request is None:
+                return
+            account = str(request.account)
+            if account not in self._account_users:
+                return
+            value = item.result.value
+            if account in self._token_accounts:
+                self._balances[account] = parse_token_amount(bytes(value.data)) if value else 0
+            else:
+                self._balances[account] = value.lamports if value else 0
+
+    async def _poll_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self.evict_idle()
+            if self.connected or not self._account_users:
+                continue
+            try:
+                await asyncio.to_thread(self.poll_once)
+            except Exception as e:
+                logger.error(f"Balance polling failed: {e}")
+
+    def poll_once(self):
+        """
+        Refresh every tracked account with getMultipleAccounts (fallback while the socket is down).
+        """
+        from bot.wallet_manager import get_solana_client
+
+        client = get_solana_client()
+        accounts = list(self._account_users)
+        for start in range(0, len(accounts), MAX_ACCOUNTS_PER_POLL):
+            chunk = accounts[start:start + MAX_ACCOUNTS_PER_POLL]
+            response = client.get_multiple_accounts([Pubkey.from_string(a) for a in chunk], commitment=Confirmed)
+            for account, value in zip(chunk, response.value):
+                if account not in self._account_users:
+                    continue
+                if account in self._token_accounts:
+                    self._balances[account] = parse_token_amount(bytes(value.data)) if value else 0
+                else:
+                    self._balances[account] = value.lamports if value else 0
+        self.polled_at = self.clock()
+
+
+balance_manager = BalanceSubscriptionManager()
@@ -1,19 +1,41 @@
+import asyncio
 import logging
+from typing import Optional
 from aiogram import Router, types
-from aiogram.filters import Command
-from bot.auth_manager import check_authorized_user
-from bot.utils import fetch_token_decimals
+from aiogram.filters import Command, CommandObject
+from bot.auth_manager import check_authorized_user, is_allowed_user
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, ReplyKeyboardMarkup, KeyboardButton
+from aiogram.types import InlineQuery, InlineQueryResultArticle, InputTextMessageContent
 from aiogram.filters import StateFilter
-from bot.utils import get_token_balance_lamports, get_sol_balance
 from bot.states import BuyState, SellState
-from bot.transaction import TransactionManager
+from bot.status_message import StatusMessage
+from bot.outbox import reply
+from bot.lazy import lazy
 
 router = Router()
 logger = logging.getLogger(__name__)
 
-from bot.wallet_manager import (
+# Heavy modules (solana, solders, spl) are imported on first use, see bot/startup.py for warm-up
+fetch_token_decimals, get_token_balance_lamports, get_sol_balance = lazy(
+    "bot.utils", "fetch_token_decimals", "get_token_balance_lamports", "get_sol_balance"
+)
+TransactionManager = lazy("bot.transaction", "TransactionManager")
+balance_manager = lazy("bot.balance_cache", "balance_manager")
+order_engine, fetch_prices, TRAILING_STOP = lazy("bot.orders", "order_engine", "fetch_prices", "TRAILING_STOP")
+dca_scheduler = lazy("bot.scheduler", "dca_scheduler")
+sniper = lazy("bot.sniper", "sniper")
+fan_out, format_summary = lazy("bot.multi_wallet", "fan_out", "format_summary")
+token_index, is_valid_pubkey = lazy("bot.token_index", "token_index", "is_valid_pubkey")
+fetch_ladder, render_ladder = lazy("bot.quote_ladder", "fetch_ladder", "render_ladder")
+history_store = lazy("bot.history", "history_store")
+wallet_pnl, render_pnl = lazy("bot.pnl", "wallet_pnl", "render_pnl")
+paper_trading = lazy("bot.paper", "paper_trading")
+(PriceSeries, series_path, parse_values, to_candles, backtest_exits, backtest_dca, render_exits,
+ render_dca) = lazy("bot.backtest", "PriceSeries", "series_path", "parse_values", "to_candles", "backtest_exits",
+                    "backtest_dca", "render_exits", "render_dca")
+
+(
     generate_private_key,
     save_user_data,
     get_user_data,
@@ -21,7 +43,25 @@ from bot.wallet_manager import (
     initialize_user_balances,
     update_user_balances,
     get_user_balances,
-    generate_public_key_from_private_key
+    generate_public_key_from_private_key,
+    get_user_wallets,
+    add_user_wallet,
+    remove_user_wallet,
+    set_user_setting,
+) = lazy(
+    "bot.wallet_manager",
+    "generate_private_key",
+    "save_user_data",
+    "get_user_data",
+    "user_exists",
+    "initialize_user_balances",
+    "update_user_balances",
+    "get_user_balances",
+    "generate_public_key_from_private_key",
+    "get_user_wallets",
+    "add_user_wallet",
+    "remove_user_wallet",
+    "set_user_setting",
 )
 
 # Main menu
@@ -47,14 +87,15 @@ async def start_command(message: types.Message):
     if user_exists(user_id):
         user_data = get_user_data(user_id)
         logger.info(f"User {user_id} started the bot. Returning existing public address.")
-        await message.answer(
+        reply(
+            message,
             f"Welcome back! Your public address:\n`{user_data['solana_wallet_address']}`",
             parse_mode="Markdown",
             reply_markup=main_menu(),
         )
     else:
         logger.info(f"User {user_id} started the bot with no private key.")
-        await message.answer("No private key found. Press 'Create private key'.", reply_markup=main_menu())
+        reply(message, "No private key found. Press 'Create private key'.", reply_markup=main_menu())
 
 # ----------------- Button: Create private key -----------------
 @router.message(lambda msg: msg.text == "Create private key")
@@ -73,19 +114,22 @@ async def create_private_key(message: types.Message):
                 if user_data["solana_wallet_address"] != str(wallet_address):
                     user_data["solana_wallet_address"] = str(wallet_address)
                     save_user_data(user_id, private_key_str, wallet_address)
+                    balance_manager.untrack_user(user_id)
                     logger.info(f"User {user_id} updated solana_wallet_address.")
-                await message.answer(
+                reply(
+                    message,
                     f"Your private key already exists. Public address:\n`{user_data['solana_wallet_address']}`",
                     parse_mode="Markdown",
                 )
             except Exception as e:
                 logger.error(f"Failed to update solana_wallet_address for user {user_id}: {e}")
-                await message.answer("An error occurred while updating your wallet address. Please try again.")
+                reply(message, "An error occurred while updating your wallet address. Please try again.")
         else:
             private_key, public_key = generate_private_key()
             save_user_data(user_id, private_key, public_key)
             logger.info(f"User {user_id} created a new private key.")
-            await message.answer(
+            reply(
+                message,
                 f"The private key has been created and saved.\n\nYour public key:\n`{public_key}`",
                 parse_mode="Markdown",
             )
@@ -93,7 +137,8 @@ async def create_private_key(message: types.Message):
         private_key, public_key = generate_private_key()
         save_user_data(user_id, private_key, public_key)
         logger.info(f"User {user_id} created a new private key.")
-        await message.answer(
+        reply(
+            message,
             f"The private key has been created and saved.\n\nYour public key:\n`{public_key}`",
             parse_mode="Markdown",
         )
@@ -107,22 +152,26 @@ async def balance_command(message: types.Message):
 
     if not user_exists(user_id):
         logger.info(f"User {user_id} requested balance without a private key.")
-        await message.answer("No private key found. Please create it first from the menu.")
+        reply(message, "No private key found. Please create it first from the menu.")
         return
 
-    user_data = get_user_data(user_id)
-    initialize_user_balances(user_id, user_data["solana_wallet_address"])
-    update_user_balances(user_id, user_data["solana_wallet_address"])
-    balances = get_user_balances(user_id)
+    if paper_trading.enabled(user_id):
+        balances = paper_trading.balances(user_id)
+        response = "📝 Your paper trading balances:\n\n"
+    else:
+        user_data = get_user_data(user_id)
+        initialize_user_balances(user_id, user_data["solana_wallet_address"])
+        update_user_balances(user_id, user_data["solana_wallet_address"])
+        balances = get_user_balances(user_id)
+        response = "Your balances:\n\n"
 
     if balances:
-        response = "Your balances:\n\n"
         for token in balances:
             balance_in_decimal = token["balance"] / (10 ** token["decimals"])
             response += f"{token['ticker']}: {balance_in_decimal:.6f}\n`{token['contract_address']}`\n\n"
-        await message.answer(response, parse_mode="Markdown")
+        reply(message, response, parse_mode="Markdown")
     else:
-        await message.answer("No balances found for your account.")
+        reply(message, "No balances found for your account.")
 
 # ----------------- Menu: BUY -----------------
 def buy_menu() -> ReplyKeyboardMarkup:
@@ -134,7 +183,7 @@ def buy_menu() -> ReplyKeyboardMarkup:
 
 @router.message(lambda msg: msg.text == "Buy")
 async def start_buy_process(message: Message, state: FSMContext):
-    await message.answer("Please enter the token address or click 'Back' to return.", reply_markup=buy_menu())
+    reply(message, "Please enter the token address or symbol or click 'Back' to return.", reply_markup=buy_menu())
     await state.set_state(BuyState.waiting_for_token_address)
 
 @router.message(lambda msg: msg.text == "Back", StateFilter(BuyState.waiting_for_token_address))
@@ -152,23 +201,45 @@ async def back_to_main_menu(message: Message, state: FSMContext):
     await state.clear()
     logger.info(f"[DEBUG] State cleared for user {message.from_user.id}.")
     # print(f"[DEBUG] State cleared for user {message.from_user.id}.")
-    await message.answer("You are back to the main menu.", reply_markup=main_menu())
+    reply(message, "You are back to the main menu.", reply_markup=main_menu())
+
+async def resolve_token_address(message: Message) -> Optional[str]:
+    """
+    Accept a mint address or a symbol known to the local token index.
+    Answers the user and returns None when the input can't be resolved to one mint.
+    """
+    text = message.text.strip()
+    if is_valid_pubkey(text):
+        return text
+
+    matches = token_index.search(text, limit=5)
+    exact = [token for token in matches if token["symbol"].lower() == text.lower()]
+    if len(exact) == 1:
+        return exact[0]["address"]
+    if matches:
+        response = "Several tokens match, please send the address:\n\n"
+        for token in matches:
+            response += f"{token['symbol']} ({token['name']})\n`{token['address']}`\n\n"
+        reply(message, response, parse_mode="Markdown")
+    else:
+        reply(message, "Invalid token address. Please enter a valid address.")
+    return None
 
 @router.message(StateFilter(BuyState.waiting_for_token_address))
 async def handle_token_address(message: Message, state: FSMContext):
-    token_address = message.text.strip()
-    if len(token_address) != 44:
-        await message.answer("Invalid token address. Please enter a valid address.")
+    token_address = await resolve_token_address(message)
+    if token_address is None:
         return
     await state.update_data(token_address=token_address)
     token_balance = get_token_balance_lamports(user_id=message.from_user.id, token_address=token_address)
     if not token_balance:
-        await message.answer(text=f"You don't have this tokens on your account!",
-                             parse_mode="Markdown")
+        reply(message, text=f"You don't have this tokens on your account!",
+              parse_mode="Markdown")
     else:
-        await message.answer(text=f"Find {token_balance / (10 ** int(fetch_token_decimals(token_address)))} Tokens",
-                             parse_mode="Markdown")
-    await message.answer(
+        reply(message, text=f"Find {token_balance / (10 ** int(fetch_token_decimals(token_address)))} Tokens",
+              parse_mode="Markdown")
+    reply(
+        message,
         "Token address saved. Now enter the SOL amount you want to sell or click 'Back' to change the address.",
         reply_markup=buy_menu(),
     )
@@ -187,35 +258,41 @@ async def handle_sol_amount(message: Message, state: FSMContext):
         logger.info(f"Converted sol_amount: {sol_amount}")
 
         if sol_amount <= 0:
-            await message.answer("Amount must be positive.")
+            reply(message, "Amount must be positive.")
             return
 
         sol_balance: int = get_sol_balance(message.from_user.id)
         if sol_amount > (sol_balance / 10**9):
-            await message.answer(f"Your SOL balance [{sol_amount}] less than [{sol_balance / 10**9}] what you want swap")
+            reply(message, f"Your SOL balance [{sol_amount}] less than [{sol_balance / 10**9}] what you want swap")
             return
         await state.update_data(sol_amount=sol_amount)
         data = await state.get_data()
         token_address = data.get("token_address")
 
         user_data = get_user_data(message.from_user.id)
-        estimated_amount = TransactionManager.get_quote(
+        # Quotes for 0.25x/0.5x/1x/2x of the amount arrive together, the 1x one is the estimate
+        ladder = await fetch_ladder(
             input_mint="So11111111111111111111111111111111111111112",
             output_mint=token_address,
-            amount=int(sol_amount * 1e9),
-            pub_key_str=user_data['solana_wallet_address']
+            base_amount=int(sol_amount * 1e9),
+            pub_key_str=user_data['solana_wallet_address'],
+            user_id=message.from_user.id,
         )
+        estimated_amount = next(rung["quote"] for rung in ladder if rung["multiplier"] == 1)
 
         if not estimated_amount:
-            await message.answer("Failed to fetch a quote. Please try again later.")
+            reply(message, "Failed to fetch a quote. Please try again later.")
             return
 
+        token_decimals = int(fetch_token_decimals(token_address))
         await state.update_data(token_out_amount=int(estimated_amount["outAmount"]))
-        output_amount = int(estimated_amount["outAmount"]) / (10 ** int(fetch_token_decimals(token_address)))
+        output_amount = int(estimated_amount["outAmount"]) / (10 ** token_decimals)
 
-        await message.answer(
+        reply(
+            message,
             f"You want to sell {sol_amount} SOL for the token:\n`{token_address}`\n"
             f"Approximate result: {output_amount} tokens.\n\n"
+            f"Price impact by size:\n{render_ladder(ladder, 9, token_decimals, balance=sol_balance)}\n\n"
             "Click 'Back' to change the amount or 'Confirm' to proceed.",
             reply_markup=ReplyKeyboardMarkup(
                 keyboard=[[KeyboardButton(text="Back")], [KeyboardButton(text="Confirm and send transaction")]],
@@ -228,7 +305,34 @@ async def handle_sol_amount(message: Message, state: FSMContext):
         await state.set_state(BuyState.waiting_for_confirmation)
 
     except ValueError:
-        await message.answer("Please enter a valid number (e.g., 0.123).")
+        reply(message, "Please enter a valid number (e.g., 0.123).")
+
+def show_result(status: StatusMessage, result, success_body: str):
+    """
+    Final edit of the status message; finalization may still update it afterwards.
+    """
+    if result.landed:
+        status.update(body=f"{success_body}\n🔹 Attempts: {len(result.attempts)}")
+        return
+    status.signature = result.signature if result.state == "failed" else None
+    status.update(body="", status=failure_text(result))
+
+def failure_text(result) -> str:
+    """
+    Explain why a swap did not land, using the final lifecycle state.
+    """
+    if result.state == "duplicate":
+        return "⏳ The same swap is already being sent, wait for its result."
+    if result.state == "failed":
+        return f"❌ Transaction failed on chain: {result.error}"
+    if result.state == "expired":
+        return f"⌛ Transaction expired after {len(result.attempts)} attempt(s) without landing. Nothing was swapped."
+    if result.error in ("no quote", "no swap"):
+        return "❌ Jupiter returned no route for this swap. Please try again later."
+    if result.signature:
+        return (f"⚠️ Transaction was sent but its status is unknown ({result.error}). Check it before retrying:\n"
+                f"https://solana.fm/tx/{result.signature}")
+    return f"❌ Transaction was not sent ({result.error}). Please try again later."
 
 @router.message(lambda msg: msg.text == "Confirm and send transaction", StateFilter(BuyState.waiting_for_confirmation))
 async def confirm_transaction(message: Message, state: FSMContext):
@@ -241,36 +345,34 @@ async def confirm_transaction(message: Message, state: FSMContext):
         amount_out_token = data.get('token_out_amount')
 
         if not token_address or sol_amount is None:
-            await message.answer("Transaction data is incomplete. Please start again.")
+            reply(message, "Transaction data is incomplete. Please start again.")
             await state.clear()
-            await message.answer("You are back to the main menu.", reply_markup=main_menu())
+            reply(message, "You are back to the main menu.", reply_markup=main_menu())
             return
 
-        await message.answer("Try to send transaction wait... (90 sec basic)")
+        status = await StatusMessage.send(message, "⏳ Preparing transaction...")
 
-        success, tx_hash = TransactionManager.buy(
+        result = await asyncio.to_thread(
+            TransactionManager.place_buy,
             user_id=message.from_user.id,
             token_address=token_address,
             sol_amount=sol_amount,
+            on_status=status.on_status,
         )
 
-        if success:
-            await message.answer(
-                "✅ Your transaction has been successfully sent!\n\n"
-                f"🔹 Token Address: `{token_address}`\n"
-                f"🔹 Amount: {sol_amount} SOL to token {amount_out_token / (10 ** int(fetch_token_decimals(token_address)))}\n\n"
-                f"https://solana.fm/tx/{tx_hash}",
-                parse_mode="Markdown"
-            )
-        else:
-            await message.answer("❌ Transaction failed. Please try again later.")
+        show_result(
+            status, result,
+            "✅ Your transaction has been successfully sent!\n\n"
+            f"🔹 Token Address: `{token_address}`\n"
+            f"🔹 Amount: {sol_amount} SOL to token {amount_out_token / (10 ** int(fetch_token_decimals(token_address)))}",
+        )
 
         await state.clear()
-        await message.answer("You are back to the main menu.", reply_markup=main_menu())
+        reply(message, "You are back to the main menu.", reply_markup=main_menu())
 
     except Exception as e:
         logger.error(f"Unexpected error in confirm_transaction: {e}")
-        await message.answer("An unexpected error occurred. Please try again later.")
+        reply(message, "An unexpected error occurred. Please try again later.")
         await state.clear()
 
 
@@ -284,25 +386,25 @@ def sell_menu() -> ReplyKeyboardMarkup:
 
 @router.message(lambda msg: msg.text == "Sell")
 async def start_sell_process(message: Message, state: FSMContext):
-    await message.answer("Please enter the token address you want to sell or click 'Back' to return.", reply_markup=sell_menu())
+    reply(message, "Please enter the token address or symbol you want to sell or click 'Back' to return.", reply_markup=sell_menu())
     await state.set_state(SellState.waiting_for_token_address)
 
 
 @router.message(StateFilter(SellState.waiting_for_token_address))
 async def handle_token_address_for_sell(message: Message, state: FSMContext):
-    token_address = message.text.strip()
-    if len(token_address) != 44:
-        await message.answer("Invalid token address. Please enter a valid address.")
+    token_address = await resolve_token_address(message)
+    if token_address is None:
         return
     await state.update_data(token_address=token_address)
     token_balance = get_token_balance_lamports(user_id=message.from_user.id, token_address=token_address)
     if not token_balance:
-        await message.answer(text=f"You don't have this tokens on your account!",
-                             parse_mode="Markdown")
+        reply(message, text=f"You don't have this tokens on your account!",
+              parse_mode="Markdown")
         return
-    await message.answer(text=f"Find {token_balance / (10 ** int(fetch_token_decimals(token_address)))} Tokens",
-                         parse_mode="Markdown")
-    await message.answer(
+    reply(message, text=f"Find {token_balance / (10 ** int(fetch_token_decimals(token_address)))} Tokens",
+          parse_mode="Markdown")
+    reply(
+        message,
         text="Token address saved. Now enter the amount you want to sell (as a percentage of your balance 1 to 100) or click 'Back' to change the address.",
         reply_markup=sell_menu(),
     )
@@ -316,34 +418,37 @@ async def handle_token_amount_for_sell(message: Message, state: FSMContext):
         await state.update_data(percentage=percentage)
 
         if not (1 <= percentage <= 100):
-            await message.answer("Percentage must be between 1 and 100. Please try again.")
+            reply(message, "Percentage must be between 1 and 100. Please try again.")
             return
 
         data = await state.get_data()
         token_address = data.get("token_address")
         token_balance = get_token_balance_lamports(user_id=message.from_user.id, token_address=token_address)
         if token_balance == 0:
-            await message.answer("No token balance. Nothing to sell.")
+            reply(message, "No token balance. Nothing to sell.")
             return
 
         sell_amount = int(token_balance * (percentage / 100))
         await state.update_data(sell_amount=sell_amount, percentage=percentage)
         user_data = get_user_data(message.from_user.id)
 
-        output_amount_out = TransactionManager.get_quote(
+        output_amount_out = await asyncio.to_thread(
+            TransactionManager.get_quote,
             input_mint=token_address,
             output_mint='So11111111111111111111111111111111111111112',
             amount=sell_amount,
-            pub_key_str=user_data['solana_wallet_address']
+            pub_key_str=user_data['solana_wallet_address'],
+            user_id=message.from_user.id,
         )
         if not output_amount_out:
-            await message.answer("Failed to fetch a quote. Please try again later.")
+            reply(message, "Failed to fetch a quote. Please try again later.")
             return
         output_amount = int(output_amount_out["outAmount"]) / (10**9)
         await state.update_data(output_amount=output_amount)
         await state.update_data(token_balance=token_balance)
 
-        await message.answer(
+        reply(
+            message,
             text=f"You want to sell {percentage}% of your tokens.\n"
             f"Token amount: {(token_balance / (10 ** int(fetch_token_decimals(token_address)))) * (percentage/100)}\n"
             f"Token Address: `{token_address}`\n"
@@ -359,7 +464,7 @@ async def handle_token_amount_for_sell(message: Message, state: FSMContext):
         await state.set_state(SellState.waiting_for_confirmation)
 
     except ValueError:
-        await message.answer("Please enter a valid percentage (1-100).")
+        reply(message, "Please enter a valid percentage (1-100).")
 
 @router.message(lambda msg: msg.text == "Confirm and send transaction", StateFilter(SellState.waiting_for_confirmation))
 async def confirm_sell_transaction(message: Message, state: FSMContext):
@@ -372,35 +477,620 @@ async def confirm_sell_transaction(message: Message, state: FSMContext):
         output_amount = data.get('output_amount')
 
         if not token_address or sell_amount is None:
-            await message.answer("Transaction data is incomplete. Please start again.")
+            reply(message, "Transaction data is incomplete. Please start again.")
             await state.clear()
-            await message.answer("You are back to the main menu.", reply_markup=main_menu())
+            reply(message, "You are back to the main menu.", reply_markup=main_menu())
             return
 
-        await message.answer("Try to send transaction wait... (90 sec basic)")
+        status = await StatusMessage.send(message, "⏳ Preparing transaction...")
 
-        success, tx_hash = TransactionManager.sell(
+        result = await asyncio.to_thread(
+            TransactionManager.place_sell,
             user_id=message.from_user.id,
             token_address=token_address,
             percentage=percentage,  # Always 100% as we already calculate sell_amount
+            on_status=status.on_status,
         )
 
-        if success:
-            await message.answer(
-                f"✅ Your transaction has been successfully sent!\n\n"
-                f"🔹 Token Address: `{token_address}`\n"
-                f"🔹 Amount: {(token_balance / (10 ** int(fetch_token_decimals(token_address)))) * (percentage/100)}\n\n"
-                f"🔹 Get SOL: {output_amount}\n\n"
-                f"https://solana.fm/tx/{tx_hash}",
-                parse_mode="Markdown",
-            )
-        else:
-            await message.answer("❌ Transaction failed. Please try again later.")
+        show_result(
+            status, result,
+            f"✅ Your transaction has been successfully sent!\n\n"
+            f"🔹 Token Address: `{token_address}`\n"
+            f"🔹 Amount: {(token_balance / (10 ** int(fetch_token_decimals(token_address)))) * (percentage/100)}\n"
+            f"🔹 Get SOL: {output_amount}",
+        )
 
         await state.clear()
-        await message.answer("You are back to the main menu.", reply_markup=main_menu())
+        reply(message, "You are back to the main menu.", reply_markup=main_menu())
 
     except Exception as e:
         logger.error(f"Unexpected error in confirm_sell_transaction: {e}")
-        await message.answer("An unexpected error occurred. Please try again later.")
-        await state.clear()
\ No newline at end of file
+        reply(message, "An unexpected error occurred. Please try again later.")
+        await state.clear()
+
+# ----------------- Commands: TP / SL / trailing orders -----------------
+ORDERS_USAGE = (
+    "Usage:\n"
+    "/tp <token address> <price in SOL> [percent]\n"
+    "/sl <token address> <price in SOL> [percent]\n"
+    "/trail <token address> <distance %> [percent]\n"
+    "/orders - list open orders\n"
+    "/cancel <order id>"
+)
+
+@router.message(Command("tp", "sl", "trail"))
+async def place_order_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    args = (command.args or "").split()
+    if len(args) not in (2, 3):
+        reply(message, ORDERS_USAGE)
+        return
+    token_address = args[0]
+    try:
+        value = float(args[1].replace(",", "."))
+        percentage = int(args[2]) if len(args) == 3 else 100
+    except ValueError:
+        reply(message, ORDERS_USAGE)
+        return
+
+    if not get_token_balance_lamports(user_id=user_id, token_address=token_address):
+        reply(message, "You don't have this tokens on your account!")
+        return
+
+    try:
+        if command.command == TRAILING_STOP:
+            current_price = fetch_prices([token_address]).get(token_address, 0.0)
+            order = order_engine.place(user_id, token_address, command.command, percentage,
+                                       trail_pct=value, current_price=current_price)
+        else:
+            order = order_engine.place(user_id, token_address, command.command, percentage, trigger_price=value)
+    except ValueError as e:
+        reply(message, str(e))
+        return
+
+    reply(
+        message,
+        f"Order #{order.order_id} placed: {order.kind.upper()} {order.percentage}% "
+        f"at {order.trigger_price:.10f} SOL\n`{token_address}`",
+        parse_mode="Markdown",
+    )
+
+@router.message(Command("orders"))
+async def list_orders_command(message: Message):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    orders = order_engine.user_orders(user_id)
+    if not orders:
+        reply(message, "You have no open orders.\n\n" + ORDERS_USAGE)
+        return
+    response = "Your open orders:\n\n"
+    for order in orders:
+        response += f"#{order.order_id} {order.kind.upper()} {order.percentage}% at {order.trigger_price:.10f} SOL"
+        if order.kind == TRAILING_STOP:
+            response += f" (trail {order.trail_pct}% from {order.peak:.10f})"
+        response += f"\n`{order.mint}`\n\n"
+    reply(message, response, parse_mode="Markdown")
+
+@router.message(Command("cancel"))
+async def cancel_order_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    try:
+        order_id = int((command.args or "").strip().lstrip("#"))
+    except ValueError:
+        reply(message, ORDERS_USAGE)
+        return
+    if order_engine.cancel(user_id, order_id):
+        reply(message, f"Order #{order_id} cancelled.")
+    else:
+        reply(message, f"Order #{order_id} not found.")
+
+
+# ----------------- Commands: DCA (recurring buys) -----------------
+DCA_USAGE = (
+    "Usage:\n"
+    "/dca <token address> <SOL amount> <interval minutes> <number of buys>\n"
+    "/dca_list - list your DCA schedules\n"
+    "/dca_cancel <schedule id>"
+)
+
+@router.message(Command("dca"))
+async def add_dca_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    args = (command.args or "").split()
+    if len(args) != 4:
+        reply(message, DCA_USAGE)
+        return
+    try:
+        token_address = args[0]
+        sol_amount = float(args[1].replace(",", "."))
+        interval_minutes = float(args[2].replace(",", "."))
+        count = int(args[3])
+        schedule = dca_scheduler.add(user_id, token_address, sol_amount, int(interval_minutes * 60), count)
+    except ValueError as e:
+        reply(message, f"{e}\n\n{DCA_USAGE}")
+        return
+
+    reply(
+        message,
+        f"DCA #{schedule.schedule_id} created: {schedule.sol_amount} SOL every "
+        f"{schedule.interval_seconds // 60} min, {schedule.remaining} buys\n`{token_address}`",
+        parse_mode="Markdown",
+    )
+
+@router.message(Command("dca_list"))
+async def list_dca_command(message: Message):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    schedules = dca_scheduler.user_schedules(user_id)
+    if not schedules:
+        reply(message, "You have no DCA schedules.\n\n" + DCA_USAGE)
+        return
+    response = "Your DCA schedules:\n\n"
+    for schedule in schedules:
+        response += (f"#{schedule.schedule_id} {schedule.sol_amount} SOL every {schedule.interval_seconds // 60} min, "
+                     f"{schedule.remaining} left (done {schedule.executed}, failed {schedule.failed})\n"
+                     f"`{schedule.mint}`\n\n")
+    reply(message, response, parse_mode="Markdown")
+
+@router.message(Command("dca_cancel"))
+async def cancel_dca_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    try:
+        schedule_id = int((command.args or "").strip().lstrip("#"))
+    except ValueError:
+        reply(message, DCA_USAGE)
+        return
+    if dca_scheduler.cancel(user_id, schedule_id):
+        reply(message, f"DCA #{schedule_id} cancelled.")
+    else:
+        reply(message, f"DCA #{schedule_id} not found.")
+
+
+# ----------------- Commands: new-pool sniper -----------------
+SNIPER_USAGE = (
+    "Usage:\n"
+    "/snipe <SOL amount> [min liquidity SOL] - arm the sniper\n"
+    "/snipe_creator <creator address | clear> - only snipe pools of these creators\n"
+    "/snipe_off - disarm the sniper\n"
+    "/snipe_status - settings and latency"
+)
+
+@router.message(Command("snipe"))
+async def snipe_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    args = (command.args or "").split()
+    if len(args) not in (1, 2):
+        reply(message, SNIPER_USAGE)
+        return
+    try:
+        sol_amount = float(args[0].replace(",", "."))
+        min_liquidity = float(args[1].replace(",", ".")) if len(args) == 2 else 0.0
+    except ValueError:
+        reply(message, SNIPER_USAGE)
+        return
+    if sol_amount <= 0:
+        reply(message, "Amount must be positive.")
+        return
+    if paper_trading.enabled(user_id):
+        reply(message, "The sniper sends real transactions and is not available in paper mode. Use /paper off first.")
+        return
+
+    config = sniper.get_config(user_id)
+    config["sol_amount"] = sol_amount
+    config.setdefault("filters", {})["min_liquidity_sol"] = min_liquidity
+    try:
+        sniper.arm(user_id, config)
+    except ValueError as e:
+        reply(message, str(e))
+        return
+    reply(message, f"🎯 Sniper armed: {sol_amount} SOL per new pool, min liquidity {min_liquidity} SOL.")
+
+@router.message(Command("snipe_creator"))
+async def snipe_creator_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    creator = (command.args or "").strip()
+    if not creator:
+        reply(message, SNIPER_USAGE)
+        return
+    config = sniper.get_config(user_id)
+    filters = config.setdefault("filters", {})
+    if creator == "clear":
+        filters["creators"] = []
+    else:
+        filters.setdefault("creators", []).append(creator)
+    sniper.save_config(user_id, config)
+    if user_id in sniper.armed:
+        sniper.arm(user_id, config)
+    reply(message, f"Creator filter: {', '.join(filters['creators']) or 'any'}")
+
+@router.message(Command("snipe_off"))
+async def snipe_off_command(message: Message):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    sniper.disarm(user_id)
+    reply(message, "Sniper disarmed.")
+
+@router.message(Command("snipe_status"))
+async def snipe_status_command(message: Message):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    config = sniper.get_config(user_id)
+    armed = user_id in sniper.armed
+    response = f"Sniper: {'armed' if armed else 'off'}\n"
+    if config:
+        filters = config.get("filters", {})
+        response += (f"Amount: {config.get('sol_amount')} SOL\n"
+                     f"Min liquidity: {filters.get('min_liquidity_sol', 0)} SOL\n"
+                     f"Creators: {', '.join(filters.get('creators', [])) or 'any'}\n")
+    latency = sniper.latency_summary()
+    if latency:
+        response += (f"\nDetect→send p50 {latency['sent_p50_ms']:.0f} ms, "
+                     f"p95 {latency['sent_p95_ms']:.0f} ms")
+    reply(message, response + "\n\n" + SNIPER_USAGE)
+
+
+# ----------------- Commands: wallet group (multi-wallet) -----------------
+WALLETS_USAGE = (
+    "Usage:\n"
+    "/wallets - list your wallet group\n"
+    "/add_wallet [private key] - add a new or imported wallet\n"
+    "/remove_wallet <address>\n"
+    "/multibuy <token address> <SOL per wallet>\n"
+    "/multisell <token address> <percent>"
+)
+
+@router.message(Command("wallets"))
+async def list_wallets_command(message: Message):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    wallets = get_user_wallets(user_id)
+    if not wallets:
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+    response = "Your wallets:\n\n"
+    for index, wallet in enumerate(wallets):
+        label = "main" if index == 0 else f"#{index}"
+        response += f"{label}: `{wallet['solana_wallet_address']}`\n"
+    reply(message, response + "\n" + WALLETS_USAGE, parse_mode="Markdown")
+
+@router.message(Command("add_wallet"))
+async def add_wallet_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    private_key_str = (command.args or "").strip()
+    if private_key_str:
+        # The private key must not stay in the chat history
+        try:
+            await message.delete()
+            reply(message, "🔒 Your message with the private key was deleted from the chat.")
+        except Exception as e:
+            logger.warning(f"Could not delete /add_wallet message: {e}", extra={"user": user_id})
+            reply(message, "⚠️ Could not delete your message with the private key, please delete it yourself.")
+        try:
+            public_key = generate_public_key_from_private_key(private_key_str)
+        except Exception:
+            reply(message, "Invalid private key.")
+            return
+        private_key = private_key_str
+    else:
+        private_key, public_key = generate_private_key()
+
+    if add_user_wallet(user_id, private_key, public_key):
+        logger.info(f"User {user_id} added wallet {public_key} to the group.")
+        reply(message, f"Wallet added:\n`{public_key}`", parse_mode="Markdown")
+    else:
+        reply(message, "This wallet is already in your group.")
+
+@router.message(Command("remove_wallet"))
+async def remove_wallet_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+
+    address = (command.args or "").strip()
+    if address and remove_user_wallet(user_id, address):
+        reply(message, "Wallet removed.")
+    else:
+        reply(message, "Wallet not found (the main wallet can't be removed).")
+
+@router.message(Command("multibuy", "multisell"))
+async def multi_wallet_swap_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    args = (command.args or "").split()
+    if len(args) != 2:
+        reply(message, WALLETS_USAGE)
+        return
+    token_address = args[0]
+    try:
+        if command.command == "multibuy":
+            sol_amount = float(args[1].replace(",", "."))
+            if sol_amount <= 0:
+                raise ValueError
+        else:
+            percentage = int(args[1])
+            if not (1 <= percentage <= 100):
+                raise ValueError
+    except ValueError:
+        reply(message, WALLETS_USAGE)
+        return
+    if paper_trading.enabled(user_id):
+        reply(message, "Multi-wallet trading is not available in paper mode. Use /paper off first.")
+        return
+
+    wallets = get_user_wallets(user_id)
+    reply(message, f"Sending transactions from {len(wallets)} wallets, wait... (90 sec basic)")
+    if command.command == "multibuy":
+        results = await fan_out.buy(user_id, token_address, sol_amount)
+        summary = format_summary(results, "Buy", token_address, 9)
+    else:
+        results = await fan_out.sell(user_id, token_address, percentage)
+        summary = format_summary(results, "Sell", token_address, int(fetch_token_decimals(token_address)))
+    reply(message, summary, parse_mode="Markdown", disable_web_page_preview=True)
+
+
+# ----------------- Commands: transaction settings -----------------
+@router.message(Command("resubmits"))
+async def resubmits_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    if not command.args:
+        current = TransactionManager.max_resubmits(user_id)
+        reply(message, f"Expired transactions are re-quoted and resubmitted up to {current} time(s).\n"
+                       "Usage: /resubmits <0-5>")
+        return
+    try:
+        limit = int(command.args.strip())
+        if not 0 <= limit <= 5:
+            raise ValueError
+    except ValueError:
+        reply(message, "Usage: /resubmits <0-5>")
+        return
+    set_user_setting(user_id, "max_resubmits", limit)
+    reply(message, f"Resubmit limit set to {limit}.")
+
+COMMITMENT_LEVELS = ("processed", "confirmed", "finalized")
+
+@router.message(Command("commitment"))
+async def commitment_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    level = (command.args or "").strip().lower()
+    if not level:
+        current = TransactionManager.success_commitment(user_id)
+        reply(message, f"Swaps are reported as successful at '{current}'.\n"
+                       "Usage: /commitment <processed|confirmed|finalized>")
+        return
+    if level not in COMMITMENT_LEVELS:
+        reply(message, "Usage: /commitment <processed|confirmed|finalized>")
+        return
+    set_user_setting(user_id, "success_commitment", level)
+    reply(message, f"Swaps will be reported as successful at '{level}'.")
+
+
+# ----------------- Commands: paper trading -----------------
+PAPER_USAGE = (
+    "Usage:\n"
+    "/paper on [starting SOL] - trade against the local simulator instead of mainnet\n"
+    "/paper off - back to real trading (the paper account is kept)\n"
+    "/paper reset [starting SOL] - start the paper account over"
+)
+
+@router.message(Command("paper"))
+async def paper_command(message: Message, command: CommandObject):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    args = (command.args or "").lower().split()
+    if not args:
+        if paper_trading.enabled(user_id):
+            account = paper_trading.account(user_id)
+            reply(message, f"📝 Paper trading is on: {account.sol / 10 ** 9:.4f} SOL, "
+                           f"{len(account.tokens)} token(s), {account.swaps} swap(s).\n\n{PAPER_USAGE}")
+        else:
+            reply(message, f"Paper trading is off, swaps use real SOL.\n\n{PAPER_USAGE}")
+        return
+    try:
+        starting_sol = float(args[1].replace(",", ".")) if len(args) == 2 else None
+        if starting_sol is not None and starting_sol <= 0:
+            raise ValueError
+    except ValueError:
+        reply(message, PAPER_USAGE)
+        return
+    if args[0] not in ("on", "off", "reset"):
+        reply(message, PAPER_USAGE)
+        return
+
+    # Orders, DCA and the sniper execute in whatever mode is active when they fire, so the mode
+    # only changes while none of them is open
+    if (args[0] == "off") == paper_trading.enabled(user_id):
+        open_items = []
+        if order_engine.user_orders(user_id):
+            open_items.append("open orders (/orders)")
+        if dca_scheduler.user_schedules(user_id):
+            open_items.append("DCA schedules (/dca_list)")
+        if user_id in sniper.armed:
+            open_items.append("an armed sniper (/snipe_off)")
+        if open_items:
+            reply(message, f"Paper trading can't be switched {'off' if args[0] == 'off' else 'on'} while you have "
+                           f"{', '.join(open_items)}: they would execute in the other mode. Cancel them first.")
+            return
+
+    if args[0] in ("on", "reset"):
+        account = paper_trading.enable(user_id, starting_sol, reset=args[0] == "reset")
+        reply(message, f"📝 Paper trading is on with {account.sol / 10 ** 9:.4f} SOL. "
+                       "Buys, sells, orders and DCA now run against the simulator.")
+    elif args[0] == "off":
+        paper_trading.disable(user_id)
+        reply(message, "Paper trading is off, swaps use real SOL again.")
+
+
+# ----------------- Commands: PnL -----------------
+@router.message(Command("pnl"))
+async def pnl_command(message: Message):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    if not user_exists(user_id):
+        reply(message, "No private key found. Please create it first from the menu.")
+        return
+
+    history = history_store.get(get_user_data(user_id)["solana_wallet_address"])
+    if history.cursor is None:
+        reply(message, "Syncing your wallet history for the first time, this can take a minute...")
+    try:
+        await asyncio.to_thread(history.sync)
+    except Exception as e:
+        logger.error(f"History sync failed: {e}", extra={"user": user_id})
+        reply(message, "Could not fetch the latest transactions, showing the stored history.")
+
+    def report() -> str:
+        pnl = wallet_pnl(history, fetch_prices)
+        return render_pnl(history, pnl, lambda mint: (token_index.get(mint) or {}).get("symbol"))
+
+    reply(message, await asyncio.to_thread(report), parse_mode="Markdown")
+
+# ----------------- Commands: Backtest -----------------
+BACKTEST_USAGE = (
+    "Usage:\n"
+    "/backtest <token> [tp=10:200:10] [sl=off,5:50:5] [trail=off,5:30:5] [hold=24] [days=30]\n"
+    "/backtest_dca <token> [every=15,60,240,1440] [tp=off,10:200:10] [days=30]\n"
+    "Percent values as lists or start:stop:step ranges, 'off' disables a rule; hold in hours, every in minutes."
+)
+
+
+def parse_backtest_args(args: Optional[str]) -> Optional[tuple]:
+    """
+    "<token> key=value ..." -> (token, {key: value}); None if the token is missing or an option is malformed.
+    """
+    parts = (args or "").split()
+    if not parts or not is_valid_pubkey(parts[0]):
+        return None
+    options = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition("=")
+        if not sep or not value:
+            return None
+        options[key.lower()] = value
+    return parts[0], options
+
+
+def load_price_series(token: str, days: float):
+    series = PriceSeries(series_path(token))
+    return series.last(int(days * 86400 // series.interval)) if days > 0 else series
+
+
+async def run_backtest(message: Message, command: CommandObject, dca: bool):
+    user_id = message.from_user.id
+    if not await check_authorized_user(user_id, message):
+        return
+    parsed = parse_backtest_args(command.args)
+    allowed = {"every", "tp", "days"} if dca else {"tp", "sl", "trail", "hold", "days"}
+    if parsed is None or not set(parsed[1]) <= allowed:
+        reply(message, BACKTEST_USAGE)
+        return
+    token, options = parsed
+
+    def report() -> str:
+        series = load_price_series(token, float(options.get("days", 0)))
+        take_profit = parse_values(options.get("tp", "off,10:200:10"), 0.01)
+        if dca:
+            intervals = to_candles(parse_values(options.get("every", "15,60,240,720,1440")), series.interval)
+            return render_dca(backtest_dca(series.prices, intervals, take_profit), series.interval)
+        result = backtest_exits(series.prices, take_profit, parse_values(options.get("sl", "off,5:50:5"), 0.01),
+                                parse_values(options.get("trail", "off,5:30:5"), 0.01),
+                                hold=int(to_candles(float(options.get("hold", 24)) * 60, series.interval)))
+        return render_exits(result, series.interval)
+
+    try:
+        text = await asyncio.to_thread(report)
+    except FileNotFoundError:
+        reply(message, f"No price history stored for this token. Import one on the server with:\n"
+                       f"python -m bot.backtest import {token} prices.csv")
+        return
+    except ValueError as e:
+        reply(message, f"Invalid backtest: {e}\n\n{BACKTEST_USAGE}")
+        return
+    reply(message, f"📊 Backtest over stored price history:\n\n{text}")
+
+
+@router.message(Command("backtest"))
+async def backtest_command(message: Message, command: CommandObject):
+    await run_backtest(message, command, dca=False)
+
+
+@router.message(Command("backtest_dca"))
+async def backtest_dca_command(message: Message, command: CommandObject):
+    await run_backtest(message, command, dca=True)
+
+# ----------------- Inline query: token autocomplete -----------------
+@router.inline_query()
+async def token_autocomplete(inline_query: InlineQuery):
+    if not is_allowed_user(inline_query.from_user.id):
+        await inline_query.answer([], cache_time=60, is_personal=True)
+        return
+
+    results = [
+        InlineQueryResultArticle(
+            id=token["address"],
+            title=f"{token['symbol']} — {token['name']}",
+            description=token["address"],
+            input_message_content=InputTextMessageContent(message_text=token["address"]),
+        )
+        for token in token_index.search(inline_query.query, limit=20)
+    ]
+    await inline_query.answer(results, cache_time=300)
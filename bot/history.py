@@ -0,0 +1,246 @@
+import json
+import logging
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solana.rpc.commitment import Confirmed
+from bot.transaction import SOL, http_session
+from bot.wallet_manager import get_solana_client, load_settings
+
+logger = logging.getLogger(__name__)
+
+HISTORY_DIR = "data/history"
+PAGE_LIMIT = 1000   # getSignaturesForAddress max page size
+TX_BATCH = 50       # getTransaction calls per JSON-RPC batch
+MAX_BACKFILL = 10_000  # Signatures fetched on the first sync of a wallet
+MAX_FETCH_ATTEMPTS = 5  # Syncs a signature may come back empty before it is skipped
+INT64_MAX = 2 ** 63 - 1
+
+# Columnar layout: one append-only binary file per column, row count and cursor in meta.json
+COLUMNS = {
+    "slot": np.int64,
+    "block_time": np.int64,
+    "mint": np.int32,         # index into meta["mints"]
+    "token_delta": np.int64,  # raw token units, + received / - sent
+    "sol_delta": np.int64,    # lamports incl. fees and wrapped SOL
+}
+
+
+def parse_transaction(tx: dict, wallet: str) -> Optional[Tuple[int, int, int, Dict[str, Tuple[int, int]]]]:
+    """
+    Balance changes of `wallet` in a getTransaction (json encoding) result:
+    (slot, block_time, lamport delta, {mint: (raw delta, decimals)}). None for failed transactions.
+    Wrapped SOL is folded into the lamport delta.
+    """
+    meta = tx.get("meta")
+    if not meta or meta.get("err") is not None:
+        return None
+    keys = list(tx["transaction"]["message"]["accountKeys"])
+    loaded = meta.get("loadedAddresses") or {}
+    keys += loaded.get("writable", []) + loaded.get("readonly", [])
+
+    sol_delta = 0
+    if wallet in keys:
+        index = keys.index(wallet)
+        sol_delta = meta["postBalances"][index] - meta["preBalances"][index]
+
+    tokens: Dict[str, Tuple[int, int]] = {}
+    for sign, field in ((-1, "preTokenBalances"), (1, "postTokenBalances")):
+        for balance in meta.get(field) or []:
+            if balance.get("owner") != wallet:
+                continue
+            amount = balance["uiTokenAmount"]
+            delta, _ = tokens.get(balance["mint"], (0, 0))
+            tokens[balance["mint"]] = (delta + sign * int(amount["amount"]), int(amount["decimals"]))
+
+    wrapped = tokens.pop(SOL, None)
+    if wrapped:
+        sol_delta += wrapped[0]
+    tokens = {mint: change for mint, change in tokens.items() if change[0]}
+    return tx["slot"], tx.get("blockTime") or 0, sol_delta, tokens
+
+
+def fetch_transactions(signatures: List[str]) -> List[Optional[dict]]:
+    """
+    getTransaction for each signature in one JSON-RPC batch request; None where the node has no result yet.
+    """
+    payload = [{
+        "jsonrpc": "2.0", "id": index, "method": "getTransaction",
+        "params": [signature, {"encoding": "json", "commitment": "confirmed", "maxSupportedTransactionVersion": 0}],
+    } for index, signature in enumerate(signatures)]
+    response = http_session.post(load_settings()["solana_rpc_url"], json=payload, timeout=30)
+    response.raise_for_status()
+    results = response.json()
+    if not isinstance(results, list):
+        raise ValueError(f"Batch request rejected: {results.get('error', results)}")
+    by_id = {item.get("id"): item.get("result") for item in results}
+    return [by_id.get(index) for index in range(len(signatures))]
+
+
+class WalletHistory:
+    """
+    Token balance changes of one wallet, stored column by column under data/history/<wallet>/.
+
+    Columns are append-only files read back with NumPy; meta.json holds the row count, the mint table
+    and the sync cursor (newest signature already processed), so a sync only pages through signatures
+    newer than the cursor. Rows past the recorded count (a crash mid-append) are truncated on load.
+    A transaction the node keeps returning null for is retried on later syncs and recorded as skipped
+    after MAX_FETCH_ATTEMPTS, so it cannot hold the cursor back forever.
+    """
+
+    def __init__(self, wallet: str, directory: str = HISTORY_DIR):
+        self.wallet = wallet
+        self.path = os.path.join(directory, wallet)
+        self.cursor: Optional[str] = None
+        self.mints: List[str] = []
+        self.decimals: List[int] = []
+        self.transactions = 0
+        self.attempts: Dict[str, int] = {}
+        self.skipped: List[str] = []
+        self.columns: Dict[str, np.ndarray] = {name: np.empty(0, dtype) for name, dtype in COLUMNS.items()}
+        self.lock = threading.Lock()
+        self._mint_index: Dict[str, int] = {}
+        self.load()
+
+    def __len__(self):
+        return len(self.columns["slot"])
+
+    def load(self):
+        try:
+            with open(os.path.join(self.path, "meta.json"), "r") as f:
+                meta = json.load(f)
+        except FileNotFoundError:
+            return
+        self.cursor = meta.get("cursor")
+        self.mints = meta.get("mints", [])
+        self.decimals = meta.get("decimals", [])
+        self.transactions = meta.get("transactions", 0)
+        self.attempts = meta.get("attempts", {})
+        self.skipped = meta.get("skipped", [])
+        self._mint_index = {mint: index for index, mint in enumerate(self.mints)}
+        rows = meta.get("rows", 0)
+        for name, dtype in COLUMNS.items():
+            column_path = os.path.join(self.path, f"{name}.bin")
+            column = np.fromfile(column_path, dtype=dtype) if os.path.exists(column_path) else np.empty(0, dtype)
+            if len(column) > rows:
+                os.truncate(column_path, rows * np.dtype(dtype).itemsize)
+            self.columns[name] = column[:rows]
+
+    def append(self, rows: List[tuple], cursor: str, transactions: int):
+        """
+        Append (slot, block_time, mint, token_delta, sol_delta) rows and move the cursor.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        if rows:
+            for position, (name, dtype) in enumerate(COLUMNS.items()):
+                values = np.array([row[position] for row in rows], dtype=dtype)
+                with open(os.path.join(self.path, f"{name}.bin"), "ab") as f:
+                    values.tofile(f)
+                self.columns[name] = np.concatenate([self.columns[name], values])
+        self.cursor = cursor
+        self.transactions += transactions
+        self.save_meta()
+
+    def save_meta(self):
+        os.makedirs(self.path, exist_ok=True)
+        meta = {"cursor": self.cursor, "rows": len(self), "transactions": self.transactions,
+                "mints": self.mints, "decimals": self.decimals,
+                "attempts": self.attempts, "skipped": self.skipped}
+        tmp_path = os.path.join(self.path, "meta.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(self.path, "meta.json"))
+
+    def mint_index(self, mint: str, decimals: int) -> int:
+        index = self._mint_index.get(mint)
+        if index is None:
+            index = self._mint_index[mint] = len(self.mints)
+            self.mints.append(mint)
+            self.decimals.append(decimals)
+        return index
+
+    # ----------------- Sync -----------------
+    def new_signatures(self, max_backfill: int = MAX_BACKFILL) -> List[str]:
+        """
+        Signatures newer than the cursor, oldest first. The first sync keeps the newest `max_backfill`.
+        """
+        client = get_solana_client()
+        until = Signature.from_string(self.cursor) if self.cursor else None
+        found = []
+        before = None
+        while True:
+            page = client.get_signatures_for_address(Pubkey.from_string(self.wallet), before=before, until=until,
+                                                     limit=PAGE_LIMIT, commitment=Confirmed).value
+            found.extend(page)
+            if len(page) < PAGE_LIMIT or (until is None and len(found) >= max_backfill):
+                break
+            before = page[-1].signature
+        if until is None:
+            found = found[:max_backfill]
+        return [str(item.signature) for item in reversed(found) if item.err is None]
+
+    def sync(self, max_backfill: int = MAX_BACKFILL) -> int:
+        """
+        Fetch and parse transactions newer than the cursor. Returns the number of new rows.
+        """
+        with self.lock:
+            signatures = self.new_signatures(max_backfill)
+            added = 0
+            for start in range(0, len(signatures), TX_BATCH):
+                batch = signatures[start:start + TX_BATCH]
+                rows, cursor, processed = [], None, 0
+                for signature, tx in zip(batch, fetch_transactions(batch)):
+                    if tx is None:
+                        attempts = self.attempts.get(signature, 0) + 1
+                        if attempts < MAX_FETCH_ATTEMPTS:
+                            self.attempts[signature] = attempts
+                            self.save_meta()
+                            break  # Not served yet, resume from here on the next sync
+                        self.attempts.pop(signature, None)
+                        self.skipped.append(signature)
+                        logger.warning(f"History of {self.wallet}: skipping {signature}, "
+                                       f"no transaction after {attempts} attempts")
+                        cursor = signature
+                        continue
+                    self.attempts.pop(signature, None)
+                    parsed = parse_transaction(tx, self.wallet)
+                    if parsed is not None:
+                        slot, block_time, sol_delta, tokens = parsed
+                        # A lamport change is only attributed to a single-mint swap
+                        share = sol_delta if len(tokens) == 1 else 0
+                        for mint, (delta, decimals) in tokens.items():
+                            delta = max(min(delta, INT64_MAX), -INT64_MAX)
+                            rows.append((slot, block_time, self.mint_index(mint, decimals), delta, share))
+                    cursor, processed = signature, processed + 1
+                if cursor is not None:
+                    self.append(rows, cursor, processed)
+                    added += len(rows)
+                if cursor != batch[-1]:
+                    break
+            if added:
+                logger.info(f"History of {self.wallet}: {added} new rows, {len(self)} total")
+            return added
+
+
+class HistoryStore:
+    """
+    Loaded wallet histories, kept in memory so repeated /pnl requests only sync the tail.
+    """
+
+    def __init__(self, directory: str = HISTORY_DIR):
+        self.directory = directory
+        self._wallets: Dict[str, WalletHistory] = {}
+        self._lock = threading.Lock()
+
+    def get(self, wallet: str) -> WalletHistory:
+        with self._lock:
+            history = self._wallets.get(wallet)
+            if history is None:
+                history = self._wallets[wallet] = WalletHistory(wallet, self.directory)
+            return history
+
+
+history_store = HistoryStore()
@@ -0,0 +1,52 @@
+import importlib
+from typing import Any
+
+
+class LazyObject:
+    """
+    Stand-in for `from module import name` that imports the module on first use.
+
+    Lets the handlers module be imported (and routes registered) without pulling in the
+    solana/solders/spl stack; the real object is resolved on the first attribute access or call.
+    """
+
+    __slots__ = ("_module", "_name", "_target")
+
+    def __init__(self, module: str, name: str):
+        object.__setattr__(self, "_module", module)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_target", None)
+
+    def _resolve(self) -> Any:
+        target = object.__getattribute__(self, "_target")
+        if target is None:
+            module = importlib.import_module(object.__getattribute__(self, "_module"))
+            target = getattr(module, object.__getattribute__(self, "_name"))
+            object.__setattr__(self, "_target", target)
+        return target
+
+    def __getattr__(self, item):
+        return getattr(self._resolve(), item)
+
+    def __setattr__(self, key, value):
+        setattr(self._resolve(), key, value)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __eq__(self, other):
+        return self._resolve() == other
+
+    def __hash__(self):
+        return hash(self._resolve())
+
+    def __repr__(self):
+        return f"<lazy {object.__getattribute__(self, '_module')}.{object.__getattribute__(self, '_name')}>"
+
+
+def lazy(module: str, *names: str):
+    """
+    lazy("bot.utils", "a", "b") -> (LazyObject, LazyObject); a single name returns the object itself.
+    """
+    objects = tuple(LazyObject(module, name) for name in names)
+    return objects[0] if len(objects) == 1 else objects
@@ -0,0 +1,109 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Optional
+
+LOG_DIR = "logs"
+LOG_FILE = "bot.log"
+MAX_BYTES = 10 * 1024 * 1024
+BACKUP_COUNT = 5
+DEBUG_SAMPLE_RATE = 100  # Keep 1 of every N debug records per call site
+STRUCTURED_FIELDS = ("user", "mint", "signature", "stage")
+
+_listener: Optional[QueueListener] = None
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line with the trade fields passed through `extra=`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = str(value)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text  # Formatted before queueing, see TracebackQueueHandler
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TracebackQueueHandler(QueueHandler):
+    """
+    QueueHandler.prepare() folds the traceback into the message and drops exc_info. Keep the message
+    as is and carry the formatted traceback in exc_text, so the JSON file gets it as its own field.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class DebugSampler(logging.Filter):
+    """
+    Passes every record above DEBUG and one of every `rate` DEBUG records per call site.
+    """
+
+    def __init__(self, rate: int = DEBUG_SAMPLE_RATE):
+        super().__init__()
+        self.rate = max(1, rate)
+        self._counters = {}
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        seen = self._counters.get(key, 0)
+        self._counters[key] = seen + 1
+        return seen % self.rate == 0
+
+
+def setup_logging(level: int = logging.INFO, log_dir: str = LOG_DIR, max_bytes: int = MAX_BYTES,
+                  backup_count: int = BACKUP_COUNT, debug_sample_rate: int = DEBUG_SAMPLE_RATE) -> QueueListener:
+    """
+    Route all logging through a queue. Handlers on the event loop only enqueue records; a background
+    thread writes JSON lines to a size-rotated file and plain text to the console.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    os.makedirs(log_dir, exist_ok=True)  # Create logs directory if it doesn't exist
+    file_handler = RotatingFileHandler(os.path.join(log_dir, LOG_FILE), maxBytes=max_bytes,
+                                       backupCount=backup_count, encoding="utf-8")
+    file_handler.setFormatter(JsonFormatter())
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter("%(asctime)s - %(name)s - %(levelname)s - %(message)s"))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = TracebackQueueHandler(log_queue)
+    queue_handler.addFilter(DebugSampler(debug_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Dict, List, Optional
+from solders.keypair import Keypair
+from bot.transaction import TransactionManager, SOL
+from bot.utils import get_wallet_token_balance_lamports
+from bot.wallet_manager import get_user_wallets
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = 8  # Wallets swapped in parallel per fan-out
+
+
+@dataclass
+class WalletResult:
+    address: str
+    amount: int = 0
+    success: bool = False
+    tx_hash: Optional[str] = None
+    error: Optional[str] = None
+
+
+class FanOut:
+    """
+    Runs one buy or sell across every wallet of a user's group.
+
+    Quotes are shared: one request per distinct input amount. Swap builds, sends and confirmations
+    run in parallel, bounded by `max_concurrency`. A failing wallet never blocks the others.
+    """
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENCY):
+        self.max_concurrency = max_concurrency
+
+    async def buy(self, user_id: int, token_address: str, sol_amount: float) -> List[WalletResult]:
+        amount_lamports = int(sol_amount * 1e9)
+        wallets = get_user_wallets(user_id)
+        amounts = {w["solana_wallet_address"]: amount_lamports for w in wallets}
+        return await self._run(user_id, SOL, token_address, amounts, wallets)
+
+    async def sell(self, user_id: int, token_address: str, percentage: int = 100) -> List[WalletResult]:
+        if not (1 <= percentage <= 100):
+            raise ValueError("Percentage must be between 1 and 100.")
+        wallets = get_user_wallets(user_id)
+        balances = await asyncio.gather(*(
+            asyncio.to_thread(get_wallet_token_balance_lamports, w["solana_wallet_address"], token_address)
+            for w in wallets
+        ))
+        amounts = {w["solana_wallet_address"]: int(balance * (percentage / 100)) for w, balance in zip(wallets, balances)}
+        return await self._run(user_id, token_address, SOL, amounts, wallets)
+
+    async def _run(self, user_id: int, input_mint: str, output_mint: str, amounts: Dict[str, int],
+                   wallets: List[dict]) -> List[WalletResult]:
+        started = perf_counter()
+        # One quote per distinct amount, shared by every wallet swapping that amount
+        distinct = sorted({amount for amount in amounts.values() if amount > 0})
+        quoted = await asyncio.gather(*(
+            asyncio.to_thread(TransactionManager.get_quote, input_mint, output_mint, amount, None)
+            for amount in distinct
+        ))
+        quotes = dict(zip(distinct, quoted))
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_wallet(wallet: dict) -> WalletResult:
+            address = wallet["solana_wallet_address"]
+            result = WalletResult(address, amounts.get(address, 0))
+            if result.amount <= 0:
+                result.error = "nothing to swap"
+                return result
+            quote = quotes.get(result.amount)
+            if not quote:
+                result.error = "no quote"
+                return result
+            async with semaphore:
+                try:
+                    keypair = Keypair.from_base58_string(wallet["private_key"])
+                    outcome = await asyncio.to_thread(TransactionManager.execute_swap, user_id, keypair, quote)
+                    if outcome:
+                        result.success, result.tx_hash = outcome
+                        if not result.success:
+                            result.error = "not confirmed"
+                    else:
+                        result.error = "swap failed"
+                except Exception as e:
+                    logger.error(f"[{user_id}] {address} | fan-out swap failed: {e}")
+                    result.error = str(e)
+            return result
+
+        results = await asyncio.gather(*(run_wallet(wallet) for wallet in wallets))
+        logger.info(f"[{user_id}] fan-out {input_mint} -> {output_mint} over {len(wallets)} wallets: "
+                    f"{sum(r.success for r in results)} ok in {perf_counter() - started:.1f}s")
+        return results
+
+
+def format_summary(results: List[WalletResult], action: str, token_address: str, decimals: int) -> str:
+    ok = sum(result.success for result in results)
+    response = f"{action} across {len(results)} wallets: ✅ {ok} / ❌ {len(results) - ok}\n`{token_address}`\n\n"
+    for result in results:
+        short = f"{result.address[:4]}…{result.address[-4:]}"
+        amount = result.amount / (10 ** decimals)
+        if result.success:
+            response += f"✅ {short} {amount} https://solana.fm/tx/{result.tx_hash}\n"
+        else:
+            response += f"❌ {short} {amount}: {result.error}\n"
+    return response
+
+
+fan_out = FanOut()
@@ -0,0 +1,292 @@
+import asyncio
+import json
+import logging
+import requests
+from bisect import bisect_left, bisect_right, insort
+from dataclasses import dataclass, asdict
+from itertools import count
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from bot.transaction import TransactionManager, SOL, http_session
+from bot.tx_lifecycle import FAILED
+from bot.outbox import escape_markdown
+
+logger = logging.getLogger(__name__)
+
+ORDERS_FILE = "data/orders.json"
+PRICE_URL = "https://api.jup.ag/price/v2"
+PRICE_BATCH = 100  # Max ids per price request
+TICK_SECONDS = 5
+MAX_SELL_ATTEMPTS = 3  # Failed sells of a triggered order before it is cancelled
+
+TAKE_PROFIT = "tp"
+STOP_LOSS = "sl"
+TRAILING_STOP = "trail"
+
+
+@dataclass
+class Order:
+    order_id: int
+    user_id: int
+    mint: str
+    kind: str
+    percentage: int = 100
+    trigger_price: float = 0.0  # SOL per token, current stop for trailing orders
+    trail_pct: float = 0.0
+    peak: float = 0.0
+    failures: int = 0
+
+
+class MintBook:
+    """
+    Open orders of a single mint, kept in sorted trigger lists.
+
+    Take-profit thresholds fire when price >= threshold (a prefix of the ascending list), stops fire
+    when price <= threshold (a suffix). Trailing stops keep their current stop in the stop list and
+    their peak in a separate ascending list, so a tick only touches orders whose peak was exceeded.
+    """
+
+    def __init__(self):
+        self.take_profit: List[Tuple[float, int]] = []
+        self.stops: List[Tuple[float, int]] = []
+        self.peaks: List[Tuple[float, int]] = []
+
+    def __len__(self):
+        return len(self.take_profit) + len(self.stops)
+
+    def add(self, order: Order):
+        if order.kind == TAKE_PROFIT:
+            insort(self.take_profit, (order.trigger_price, order.order_id))
+        else:
+            insort(self.stops, (order.trigger_price, order.order_id))
+            if order.kind == TRAILING_STOP:
+                insort(self.peaks, (order.peak, order.order_id))
+
+    def remove(self, order: Order):
+        if order.kind == TAKE_PROFIT:
+            _remove(self.take_profit, (order.trigger_price, order.order_id))
+        else:
+            _remove(self.stops, (order.trigger_price, order.order_id))
+            if order.kind == TRAILING_STOP:
+                _remove(self.peaks, (order.peak, order.order_id))
+
+    def evaluate(self, price: float, orders: Dict[int, Order]) -> List[int]:
+        """
+        Apply one price tick and return ids of triggered orders (they stay in the book).
+        """
+        # Raise peaks (and stops) of trailing orders the price went above
+        raised = self.peaks[:bisect_left(self.peaks, (price, -1))]
+        if raised:
+            del self.peaks[:len(raised)]
+            for _, order_id in raised:
+                order = orders[order_id]
+                _remove(self.stops, (order.trigger_price, order_id))
+                order.peak = price
+                order.trigger_price = price * (1 - order.trail_pct / 100)
+                insort(self.stops, (order.trigger_price, order_id))
+                insort(self.peaks, (order.peak, order_id))
+
+        triggered = [order_id for _, order_id in self.take_profit[:bisect_right(self.take_profit, (price, float("inf")))]]
+        triggered += [order_id for _, order_id in self.stops[bisect_left(self.stops, (price, -1)):]]
+        return triggered
+
+
+def _remove(items: list, key: tuple):
+    index = bisect_left(items, key)
+    if index < len(items) and items[index] == key:
+        del items[index]
+
+
+def fetch_prices(mints: Iterable[str]) -> Dict[str, float]:
+    """
+    Price of each mint in SOL per token, one request per PRICE_BATCH mints.
+    """
+    mints = list(mints)
+    prices = {}
+    for start in range(0, len(mints), PRICE_BATCH):
+        chunk = mints[start:start + PRICE_BATCH]
+        try:
+            response = http_session.get(PRICE_URL, params={"ids": ",".join(chunk), "vsToken": SOL}, timeout=10)
+            response.raise_for_status()
+            for mint, item in (response.json().get("data") or {}).items():
+                if item and item.get("price") is not None:
+                    prices[mint] = float(item["price"])
+        except (requests.RequestException, ValueError) as e:
+            logger.error(f"Error fetching prices for {len(chunk)} mints: {e}")
+    return prices
+
+
+class OrderEngine:
+    """
+    Conditional TP/SL/trailing orders. Each tick samples every mint with open orders once and
+    evaluates all of that mint's orders against the sample. Triggered orders are sold through
+    `TransactionManager.place_sell`. A sell that sent nothing or failed on chain re-arms the order; one
+    that was sent but whose outcome is unknown cancels it, since that transaction may still land.
+    """
+
+    def __init__(self, orders_file: str = ORDERS_FILE, tick_seconds: float = TICK_SECONDS,
+                 price_source: Callable[[Iterable[str]], Dict[str, float]] = fetch_prices,
+                 seller: Callable[..., object] = TransactionManager.place_sell):
+        self.orders_file = orders_file
+        self.tick_seconds = tick_seconds
+        self.price_source = price_source
+        self.seller = seller
+        self.notify: Optional[Callable[[int, str], Awaitable[None]]] = None
+        self.orders: Dict[int, Order] = {}
+        self.books: Dict[str, MintBook] = {}
+        self._ids = count(1)
+        self._executing: set = set()
+        self._tasks: set = set()
+
+    # ----------------- Order management -----------------
+    def load(self):
+        try:
+            with open(self.orders_file, "r") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = []
+        for item in stored:
+            self._add(Order(**item))
+        self._ids = count(max(self.orders, default=0) + 1)
+        logger.info(f"Loaded {len(self.orders)} open orders over {len(self.books)} mints")
+
+    def save(self):
+        with open(self.orders_file, "w") as f:
+            json.dump([asdict(order) for order in self.orders.values()], f, indent=4)
+
+    def place(self, user_id: int, mint: str, kind: str, percentage: int = 100,
+              trigger_price: float = 0.0, trail_pct: float = 0.0, current_price: float = 0.0) -> Order:
+        if kind not in (TAKE_PROFIT, STOP_LOSS, TRAILING_STOP):
+            raise ValueError(f"Unknown order kind: {kind}")
+        if not (1 <= percentage <= 100):
+            raise ValueError("Percentage must be between 1 and 100.")
+        if kind == TRAILING_STOP:
+            if not (0 < trail_pct < 100) or current_price <= 0:
+                raise ValueError("Trailing distance must be between 0 and 100 and price must be known.")
+            trigger_price = current_price * (1 - trail_pct / 100)
+        elif trigger_price <= 0:
+            raise ValueError("Trigger price must be positive.")
+
+        order = Order(next(self._ids), user_id, mint, kind, percentage, trigger_price, trail_pct, current_price)
+        self._add(order)
+        self.save()
+        logger.info(f"[{user_id}] placed {kind} order #{order.order_id} on {mint} at {trigger_price}")
+        return order
+
+    def cancel(self, user_id: int, order_id: int) -> bool:
+        order = self.orders.get(order_id)
+        if order is None or order.user_id != user_id:
+            return False
+        self._discard(order)
+        self.save()
+        return True
+
+    def user_orders(self, user_id: int) -> List[Order]:
+        return [order for order in self.orders.values() if order.user_id == user_id]
+
+    def _add(self, order: Order):
+        self.orders[order.order_id] = order
+        self.books.setdefault(order.mint, MintBook()).add(order)
+
+    def _discard(self, order: Order):
+        self.orders.pop(order.order_id, None)
+        book = self.books.get(order.mint)
+        if book is not None:
+            book.remove(order)
+            if not len(book):
+                del self.books[order.mint]
+
+    # ----------------- Evaluation -----------------
+    def evaluate(self, prices: Dict[str, float]) -> List[Order]:
+        """
+        Apply one tick of prices and pull triggered orders out of the books.
+        """
+        triggered = []
+        for mint, price in prices.items():
+            book = self.books.get(mint)
+            if book is None:
+                continue
+            for order_id in book.evaluate(price, self.orders):
+                order = self.orders[order_id]
+                self._discard(order)
+                triggered.append(order)
+        return triggered
+
+    async def tick(self):
+        if not self.books:
+            return
+        prices = await asyncio.to_thread(self.price_source, list(self.books))
+        triggered = self.evaluate(prices)
+        if triggered:
+            self.save()
+            # Sells take seconds to minutes, the next ticks keep evaluating the other mints meanwhile
+            for order in triggered:
+                task = asyncio.create_task(self._execute(order, prices[order.mint]))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _execute(self, order: Order, price: float):
+        key = (order.user_id, order.mint)
+        if key in self._executing:
+            # Another order of this user is selling this mint, re-evaluate this one once it is done
+            logger.info(f"[{order.user_id}] order #{order.order_id} waits for another sell of {order.mint}")
+            self._add(order)
+            self.save()
+            return
+        self._executing.add(key)
+        result, error = None, None
+        try:
+            logger.info(f"[{order.user_id}] {order.kind} order #{order.order_id} triggered on {order.mint} at {price}")
+            result = await asyncio.to_thread(self.seller, order.user_id, order.mint, order.percentage)
+        except Exception as e:
+            logger.error(f"[{order.user_id}] failed executing order #{order.order_id}: {e}")
+            error = e
+        finally:
+            self._executing.discard(key)
+
+        if result is not None and result.landed:
+            if order.percentage == 100:
+                # Position is closed, drop the remaining orders on this mint
+                for sibling in [o for o in self.user_orders(order.user_id) if o.mint == order.mint]:
+                    self._discard(sibling)
+                self.save()
+            text = (f"✅ {order.kind.upper()} order #{order.order_id} executed at {price:.10f} SOL\n"
+                    f"`{order.mint}`\nhttps://solana.fm/tx/{result.signature}")
+        elif result is not None and result.signature is not None and result.state != FAILED:
+            # Sent but never confirmed either way: selling again could sell the position twice
+            logger.warning(f"[{order.user_id}] order #{order.order_id} cancelled, sell {result.signature} "
+                           f"has unknown status: {result.error}")
+            self.save()
+            text = (f"⚠️ {order.kind.upper()} order #{order.order_id} triggered and a sell was sent, but its status "
+                    f"is unknown. The order was cancelled so it doesn't sell twice, check the transaction:\n"
+                    f"`{order.mint}`\nhttps://solana.fm/tx/{result.signature}")
+        else:
+            if error is None and result is not None:
+                error = result.error
+            reason = f": {escape_markdown(str(error))}" if error else "."
+            order.failures += 1
+            if order.failures < MAX_SELL_ATTEMPTS:
+                self._add(order)  # Stays open and fires again on the next tick that meets its trigger
+                outcome = f"The order stays open (attempt {order.failures}/{MAX_SELL_ATTEMPTS})."
+            else:
+                outcome = f"The order was cancelled after {MAX_SELL_ATTEMPTS} failed attempts."
+            self.save()
+            link = f"https://solana.fm/tx/{result.signature}\n" if result is not None and result.signature else ""
+            text = (f"❌ {order.kind.upper()} order #{order.order_id} triggered but the sell failed{reason}\n"
+                    f"`{order.mint}`\n{link}{outcome}")
+        if self.notify:
+            try:
+                await self.notify(order.user_id, text)
+            except Exception as e:
+                logger.error(f"[{order.user_id}] could not notify about order #{order.order_id}: {e}")
+
+    async def run(self):
+        self.load()
+        while True:
+            try:
+                await self.tick()
+            except Exception as e:
+                logger.error(f"Order engine tick failed: {e}")
+            await asyncio.sleep(self.tick_seconds)
+
+
+order_engine = OrderEngine()
@@ -0,0 +1,278 @@
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, field
+from time import monotonic
+from typing import Any, Deque, Dict, List, Optional
+from aiogram.exceptions import TelegramBadRequest, TelegramNetworkError, TelegramRetryAfter
+from aiogram.types import ReplyKeyboardMarkup, ReplyKeyboardRemove
+
+logger = logging.getLogger(__name__)
+
+# Telegram limits: about 1 message per second per chat (short bursts tolerated), 30 per second overall
+PER_CHAT_RATE = 1.0
+PER_CHAT_BURST = 3
+GLOBAL_RATE = 30.0
+GLOBAL_BURST = 30
+MAX_IN_FLIGHT = 16
+MAX_TEXT_LENGTH = 4096
+MAX_NETWORK_RETRIES = 3
+
+SEND = "send"
+EDIT = "edit"
+MARKDOWN_SPECIAL = "_*`["
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    def _fill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        self._fill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._fill(now)
+        self.tokens -= 1
+
+
+@dataclass
+class Outgoing:
+    kind: str
+    chat_id: int
+    text: str
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    message_id: Optional[int] = None
+    mergeable: bool = True
+    waiters: List[asyncio.Future] = field(default_factory=list)
+    network_retries: int = 0
+
+
+@dataclass
+class ChatQueue:
+    items: Deque[Outgoing] = field(default_factory=deque)
+    bucket: TokenBucket = None
+    blocked_until: float = 0.0
+    in_flight: bool = False
+
+
+def escape_markdown(text: str) -> str:
+    """
+    Escape free text (error messages, token symbols) for parse_mode="Markdown".
+    """
+    for char in MARKDOWN_SPECIAL:
+        text = text.replace(char, "\\" + char)
+    return text
+
+
+def can_merge(first: Outgoing, second: Outgoing) -> bool:
+    """
+    Two pending sends become one message if formatting matches (plain text next to Markdown is
+    escaped) and no keyboard would be lost (a later reply keyboard replaces an earlier one anyway).
+    """
+    if first.kind != SEND or second.kind != SEND or not (first.mergeable and second.mergeable):
+        return False
+    first_markup = first.kwargs.get("reply_markup")
+    first_rest = {k: v for k, v in first.kwargs.items() if k not in ("reply_markup", "parse_mode")}
+    second_rest = {k: v for k, v in second.kwargs.items() if k not in ("reply_markup", "parse_mode")}
+    if first_rest != second_rest:
+        return False
+    modes = {first.kwargs.get("parse_mode"), second.kwargs.get("parse_mode")}
+    if len(modes) > 1 and modes != {None, "Markdown"}:
+        return False  # Plain text can be escaped into legacy Markdown, other mixes are sent apart
+    first_text, second_text = first.text, second.text
+    if first.kwargs.get("parse_mode") is None and len(modes) > 1:
+        first_text = escape_markdown(first_text)
+    if second.kwargs.get("parse_mode") is None and len(modes) > 1:
+        second_text = escape_markdown(second_text)
+    if len(first_text) + len(second_text) + 2 > MAX_TEXT_LENGTH:
+        return False
+    return first_markup is None or isinstance(first_markup, (ReplyKeyboardMarkup, ReplyKeyboardRemove))
+
+
+class Outbox:
+    """
+    Outbound Telegram delivery. Handlers enqueue and return; a single dispatcher sends in order per
+    chat within per-chat and global token buckets, parks a chat for Telegram's retry-after, merges
+    consecutive pending messages to the same chat and keeps only the latest text of pending edits.
+    """
+
+    def __init__(self, bot=None, per_chat_rate: float = PER_CHAT_RATE, per_chat_burst: int = PER_CHAT_BURST,
+                 global_rate: float = GLOBAL_RATE, global_burst: int = GLOBAL_BURST,
+                 max_in_flight: int = MAX_IN_FLIGHT):
+        self.bot = bot
+        self.per_chat_rate = per_chat_rate
+        self.per_chat_burst = per_chat_burst
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self.max_in_flight = max_in_flight
+        self._chats: Dict[int, ChatQueue] = {}
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: set = set()
+        self.stats = {"sent": 0, "edited": 0, "merged": 0, "coalesced": 0, "retry_after": 0}
+
+    # ----------------- Enqueue -----------------
+    def _queue(self, chat_id: int) -> ChatQueue:
+        queue = self._chats.get(chat_id)
+        if queue is None:
+            queue = self._chats[chat_id] = ChatQueue(bucket=TokenBucket(self.per_chat_rate, self.per_chat_burst))
+        return queue
+
+    def _wake(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def send(self, chat_id: int, text: str, wait: bool = False, **kwargs) -> Optional[asyncio.Future]:
+        """
+        Queue a message. With `wait=True` returns a future resolved with the sent Message; such a
+        message is never merged, so it can be edited later on its own.
+        """
+        item = Outgoing(SEND, chat_id, text, kwargs, mergeable=not wait)
+        future = None
+        if wait:
+            future = asyncio.get_running_loop().create_future()
+            item.waiters.append(future)
+        queue = self._queue(chat_id)
+        if queue.items and can_merge(queue.items[-1], item):
+            last = queue.items[-1]
+            if last.kwargs.get("parse_mode") != kwargs.get("parse_mode"):
+                if last.kwargs.get("parse_mode") is None:
+                    last.text = escape_markdown(last.text)
+                else:
+                    text = escape_markdown(text)
+                kwargs = {**kwargs, "parse_mode": "Markdown"}
+            last.text = f"{last.text}\n\n{text}"
+            last.kwargs = {**last.kwargs, **kwargs}
+            self.stats["merged"] += 1
+        else:
+            queue.items.append(item)
+        self._wake()
+        return future
+
+    def edit(self, chat_id: int, message_id: int, text: str, **kwargs):
+        """
+        Queue an edit; a pending edit of the same message is replaced in place.
+        """
+        queue = self._queue(chat_id)
+        for pending in queue.items:
+            if pending.kind == EDIT and pending.message_id == message_id:
+                pending.text, pending.kwargs = text, kwargs
+                self.stats["coalesced"] += 1
+                return
+        queue.items.append(Outgoing(EDIT, chat_id, text, kwargs, message_id=message_id))
+        self._wake()
+
+    def pending(self) -> int:
+        return sum(len(queue.items) for queue in self._chats.values())
+
+    # ----------------- Dispatch -----------------
+    def _dispatch_ready(self) -> Optional[float]:
+        """
+        Start deliveries that are allowed now; return seconds until the next one may be, if any.
+        """
+        now = monotonic()
+        next_wait = None
+        for chat_id in list(self._chats):
+            queue = self._chats[chat_id]
+            if not queue.items:
+                if not queue.in_flight and queue.bucket.wait_time(now) == 0 and queue.blocked_until <= now:
+                    del self._chats[chat_id]  # Idle with a full bucket, nothing to remember
+                continue
+            if queue.in_flight or self._in_flight >= self.max_in_flight:
+                continue
+            wait = max(queue.blocked_until - now, queue.bucket.wait_time(now), self.global_bucket.wait_time(now))
+            if wait > 0:
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                continue
+            queue.bucket.take(now)
+            self.global_bucket.take(now)
+            queue.in_flight = True
+            self._in_flight += 1
+            task = asyncio.create_task(self._deliver(queue, queue.items.popleft()))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return next_wait
+
+    async def run(self):
+        self._wakeup = asyncio.Event()
+        while True:
+            self._wakeup.clear()
+            next_wait = self._dispatch_ready()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=next_wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _deliver(self, queue: ChatQueue, item: Outgoing):
+        try:
+            result = await self._call(item)
+        except TelegramRetryAfter as e:
+            self.stats["retry_after"] += 1
+            logger.warning(f"Flood limit for chat {item.chat_id}, retrying after {e.retry_after} s")
+            queue.blocked_until = monotonic() + e.retry_after
+            queue.items.appendleft(item)
+            return
+        except TelegramNetworkError as e:
+            item.network_retries += 1
+            if item.network_retries <= MAX_NETWORK_RETRIES:
+                logger.warning(f"Network error sending to chat {item.chat_id}, retrying: {e}")
+                queue.blocked_until = monotonic() + item.network_retries
+                queue.items.appendleft(item)
+                return
+            self._fail(item, e)
+            return
+        except Exception as e:
+            self._fail(item, e)
+            return
+        finally:
+            queue.in_flight = False
+            self._in_flight -= 1
+            self._wake()
+        for waiter in item.waiters:
+            if not waiter.done():
+                waiter.set_result(result)
+
+    async def _call(self, item: Outgoing):
+        try:
+            return await self._request(item, item.kwargs)
+        except TelegramBadRequest as e:
+            if "not modified" in str(e):
+                return None
+            if "parse entities" in str(e) and item.kwargs.get("parse_mode"):
+                # Error texts and user input can break Markdown entities, deliver as plain text
+                plain = {k: v for k, v in item.kwargs.items() if k != "parse_mode"}
+                return await self._request(item, plain)
+            raise
+
+    async def _request(self, item: Outgoing, kwargs: Dict[str, Any]):
+        if item.kind == EDIT:
+            result = await self.bot.edit_message_text(text=item.text, chat_id=item.chat_id,
+                                                      message_id=item.message_id, **kwargs)
+            self.stats["edited"] += 1
+            return result
+        result = await self.bot.send_message(item.chat_id, item.text, **kwargs)
+        self.stats["sent"] += 1
+        return result
+
+    def _fail(self, item: Outgoing, error: Exception):
+        logger.error(f"Failed to deliver {item.kind} to chat {item.chat_id}: {error}")
+        for waiter in item.waiters:
+            if not waiter.done():
+                waiter.set_exception(error)
+
+
+outbox = Outbox()
+
+
+def reply(message, text: str, **kwargs):
+    """
+    Queue an answer to `message` in its chat without waiting for delivery.
+    """
+    outbox.send(message.chat.id, text, **kwargs)
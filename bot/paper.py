@@ -0,0 +1,345 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, asdict
+from itertools import count
+from time import sleep as default_sleep, time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from bot.transaction import SOL
+from bot.tx_lifecycle import Attempt, TxResult, LANDED, FAILED, ABORTED
+from bot.wallet_manager import get_user_setting, set_user_setting
+
+logger = logging.getLogger(__name__)
+
+PAPER_FILE = "data/paper.json"
+FEE_BPS = 25                # Pool fee, Raydium AMM v4 level
+LIQUIDITY_SOL = 200         # SOL side of a newly seeded pool
+STARTING_SOL = 10
+LATENCY_SECONDS = 0.4       # Simulated quote round trip and time to land
+NETWORK_FEE = 5000          # Lamports charged per simulated transaction
+SLIPPAGE_BPS = 100
+DEFAULT_PRICE = 1e-6        # SOL per token when no market price is available
+DEFAULT_DECIMALS = 6
+SAVE_SECONDS = 5
+
+
+@dataclass
+class Pool:
+    """
+    Constant-product SOL/token pool; the fee stays in the pool like on Raydium.
+    """
+    mint: str
+    decimals: int
+    sol_reserve: int    # lamports
+    token_reserve: int  # raw token units
+    fee_bps: int = FEE_BPS
+
+    def price(self) -> float:
+        """
+        Spot price in SOL per token.
+        """
+        return (self.sol_reserve / 10 ** 9) / (self.token_reserve / 10 ** self.decimals)
+
+    def amount_out(self, amount_in: int, sol_in: bool) -> Tuple[int, int, float]:
+        """
+        (amount out, fee, price impact) of an exact-in swap at the current reserves.
+        """
+        reserve_in, reserve_out = (self.sol_reserve, self.token_reserve) if sol_in else (self.token_reserve, self.sol_reserve)
+        fee = amount_in * self.fee_bps // 10_000
+        net_in = amount_in - fee
+        out = reserve_out * net_in // (reserve_in + net_in)
+        return out, fee, net_in / (reserve_in + net_in)
+
+    def apply(self, amount_in: int, amount_out: int, sol_in: bool):
+        if sol_in:
+            self.sol_reserve += amount_in
+            self.token_reserve -= amount_out
+        else:
+            self.token_reserve += amount_in
+            self.sol_reserve -= amount_out
+
+
+class AmmSimulator:
+    """
+    In-process stand-in for Jupiter: one constant-product pool per mint, seeded at the market price
+    (or DEFAULT_PRICE) with `liquidity_sol` on the SOL side. Quotes have the Jupiter response shape,
+    so the bot's quote rendering works unchanged, and executed swaps move the reserves.
+    """
+
+    def __init__(self, fee_bps: int = FEE_BPS, liquidity_sol: float = LIQUIDITY_SOL,
+                 latency: float = LATENCY_SECONDS, market_prices: bool = True,
+                 price_source: Optional[Callable[[Iterable[str]], Dict[str, float]]] = None,
+                 decimals_source: Optional[Callable[[str], int]] = None,
+                 sleep: Callable[[float], None] = default_sleep):
+        self.fee_bps = fee_bps
+        self.liquidity_sol = liquidity_sol
+        self.latency = latency
+        self.market_prices = market_prices
+        self.price_source = price_source
+        self.decimals_source = decimals_source
+        self.sleep = sleep
+        self.pools: Dict[str, Pool] = {}
+        self.swaps = 0
+        self._lock = threading.Lock()
+
+    def seed(self, mint: str, price: float, decimals: int, liquidity_sol: Optional[float] = None) -> Pool:
+        sol_reserve = int((liquidity_sol or self.liquidity_sol) * 10 ** 9)
+        token_reserve = int(sol_reserve / 10 ** 9 / price * 10 ** decimals)
+        pool = Pool(mint, decimals, sol_reserve, max(token_reserve, 1), self.fee_bps)
+        with self._lock:
+            self.pools[mint] = pool
+        return pool
+
+    def pool(self, mint: str) -> Pool:
+        pool = self.pools.get(mint)
+        if pool is not None:
+            return pool
+        price, decimals = DEFAULT_PRICE, DEFAULT_DECIMALS
+        try:
+            if self.decimals_source is None:
+                from bot.utils import fetch_token_decimals
+                self.decimals_source = fetch_token_decimals
+            decimals = int(self.decimals_source(mint))
+            if self.market_prices:
+                if self.price_source is None:
+                    from bot.orders import fetch_prices
+                    self.price_source = fetch_prices
+                price = self.price_source([mint]).get(mint) or DEFAULT_PRICE
+        except Exception as e:
+            logger.warning(f"Paper pool for {mint} seeded with defaults: {e}", extra={"mint": mint})
+        with self._lock:
+            if mint in self.pools:  # Seeded concurrently
+                return self.pools[mint]
+        return self.seed(mint, price, decimals)
+
+    def quote(self, input_mint: str, output_mint: str, amount: int, slippage_bps: int = SLIPPAGE_BPS) -> Optional[dict]:
+        if (input_mint == SOL) == (output_mint == SOL) or amount <= 0:
+            return None  # Only SOL <-> token pools are simulated
+        if self.latency:
+            self.sleep(self.latency)
+        sol_in = input_mint == SOL
+        pool = self.pool(output_mint if sol_in else input_mint)
+        with self._lock:
+            out, fee, impact = pool.amount_out(amount, sol_in)
+        return {
+            "inputMint": input_mint,
+            "inAmount": str(amount),
+            "outputMint": output_mint,
+            "outAmount": str(out),
+            "otherAmountThreshold": str(out * (10_000 - slippage_bps) // 10_000),
+            "swapMode": "ExactIn",
+            "slippageBps": slippage_bps,
+            "priceImpactPct": str(impact),
+            "routePlan": [{"swapInfo": {"ammKey": "paper", "label": "Paper AMM", "inputMint": input_mint,
+                                        "outputMint": output_mint, "inAmount": str(amount), "outAmount": str(out),
+                                        "feeAmount": str(fee), "feeMint": input_mint}, "percent": 100}],
+            "paper": True,
+        }
+
+    def execute(self, quote: dict) -> Optional[int]:
+        """
+        Swap at the current reserves; None if the output fell below the quote's slippage threshold.
+        """
+        sol_in = quote["inputMint"] == SOL
+        pool = self.pool(quote["outputMint"] if sol_in else quote["inputMint"])
+        amount_in = int(quote["inAmount"])
+        with self._lock:
+            out, _, _ = pool.amount_out(amount_in, sol_in)
+            if out < int(quote["otherAmountThreshold"]) or out <= 0:
+                return None
+            pool.apply(amount_in, out, sol_in)
+            self.swaps += 1
+        return out
+
+
+@dataclass
+class PaperAccount:
+    sol: int
+    tokens: Dict[str, int]
+    decimals: Dict[str, int]
+    swaps: int = 0
+
+
+class PaperTrading:
+    """
+    Per-user paper accounts trading against the AMM simulator. A user is in paper mode while the
+    "paper_trading" user setting is on; their swaps, quotes and balance reads are then served here
+    instead of Jupiter and the RPC. The setting is cached per user, since quotes check it on the event
+    loop. Accounts are kept in memory and saved to data/paper.json by `run`.
+    """
+
+    def __init__(self, paper_file: str = PAPER_FILE, simulator: Optional[AmmSimulator] = None,
+                 starting_sol: float = STARTING_SOL):
+        self.paper_file = paper_file
+        self.simulator = simulator or AmmSimulator()
+        self.starting_sol = starting_sol
+        self.accounts: Dict[str, PaperAccount] = {}
+        self._enabled: Dict[str, bool] = {}
+        self._ids = count(1)
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._loaded = False
+
+    # ----------------- Accounts -----------------
+    def load(self):
+        try:
+            with open(self.paper_file, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        except json.JSONDecodeError as e:
+            # Keep the damaged file for inspection instead of overwriting it on the next save
+            corrupt_path = f"{self.paper_file}.corrupt-{int(time())}"
+            os.replace(self.paper_file, corrupt_path)
+            logger.error(f"Paper accounts file is corrupt ({e}), moved to {corrupt_path}")
+            data = {}
+        self.accounts = {user_id: PaperAccount(**account) for user_id, account in data.get("accounts", {}).items()}
+        for mint, pool in data.get("pools", {}).items():
+            self.simulator.pools[mint] = Pool(**pool)
+        self._loaded = True
+
+    def save(self):
+        with self._lock:
+            accounts = {user_id: asdict(account) for user_id, account in self.accounts.items()}
+            self._dirty = False
+        with self.simulator._lock:
+            pools = {mint: asdict(pool) for mint, pool in self.simulator.pools.items()}
+        data = {"accounts": accounts, "pools": pools}
+        tmp_path = f"{self.paper_file}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=4)
+        os.replace(tmp_path, self.paper_file)
+
+    def enabled(self, user_id) -> bool:
+        enabled = self._enabled.get(str(user_id))
+        if enabled is None:
+            enabled = self._enabled[str(user_id)] = bool(get_user_setting(user_id, "paper_trading", False))
+        return enabled
+
+    def enable(self, user_id, starting_sol: Optional[float] = None, reset: bool = False) -> PaperAccount:
+        account = self.account(user_id)
+        if reset or starting_sol is not None:
+            with self._lock:
+                account = self.accounts[str(user_id)] = PaperAccount(
+                    int((starting_sol if starting_sol is not None else self.starting_sol) * 10 ** 9), {}, {})
+                self._dirty = True
+        set_user_setting(user_id, "paper_trading", True)
+        self._enabled[str(user_id)] = True
+        return account
+
+    def disable(self, user_id):
+        set_user_setting(user_id, "paper_trading", False)
+        self._enabled[str(user_id)] = False
+
+    def account(self, user_id) -> PaperAccount:
+        if not self._loaded:
+            self.load()
+        with self._lock:
+            account = self.accounts.get(str(user_id))
+            if account is None:
+                account = self.accounts[str(user_id)] = PaperAccount(int(self.starting_sol * 10 ** 9), {}, {})
+                self._dirty = True
+            return account
+
+    def sol_balance(self, user_id) -> int:
+        return self.account(user_id).sol
+
+    def token_balance(self, user_id, mint: str) -> int:
+        return self.account(user_id).tokens.get(mint, 0)
+
+    def balances(self, user_id) -> List[dict]:
+        """
+        Paper holdings in the shape of `get_user_balances`, SOL first.
+        """
+        from bot.token_index import token_index
+
+        account = self.account(user_id)
+        balances = [{"ticker": "SOL", "balance": account.sol, "decimals": 9, "contract_address": SOL}]
+        for mint, amount in account.tokens.items():
+            token = token_index.get(mint) or {}
+            balances.append({"ticker": token.get("symbol") or "Token", "balance": amount,
+                             "decimals": account.decimals.get(mint, DEFAULT_DECIMALS), "contract_address": mint})
+        return balances
+
+    # ----------------- Swaps -----------------
+    def swap(self, user_id, input_mint: str, output_mint: str, amount: int, quote: Optional[dict] = None,
+             on_status=None) -> TxResult:
+        """
+        Paper counterpart of `TransactionManager.run_swap`: same status events and TxResult, no chain.
+        """
+        def notify(event: str):
+            if on_status is not None:
+                try:
+                    on_status(event, None, 1)
+                except Exception as e:
+                    logger.error(f"Status callback failed: {e}")
+
+        notify("building")
+        if quote is None or not quote.get("paper") or int(quote.get("inAmount", 0)) != amount:
+            quote = self.simulator.quote(input_mint, output_mint, amount)
+        if quote is None:
+            return TxResult(ABORTED, error="no quote")
+
+        sol_in = input_mint == SOL
+        mint = output_mint if sol_in else input_mint
+        account = self.account(user_id)
+        with self._lock:
+            spend = amount + NETWORK_FEE if sol_in else amount
+            available = account.sol if sol_in else account.tokens.get(mint, 0)
+            if available < spend or account.sol < NETWORK_FEE:
+                return TxResult(ABORTED, error="insufficient paper balance")
+            # Reserve the input while the swap is "in flight"
+            if sol_in:
+                account.sol -= spend
+            else:
+                account.tokens[mint] -= amount
+                account.sol -= NETWORK_FEE
+            self._dirty = True
+
+        signature = f"paper-{next(self._ids)}"
+        notify("sent")
+        if self.simulator.latency:
+            self.simulator.sleep(self.simulator.latency)
+        out = self.simulator.execute(quote)
+
+        with self._lock:
+            if out is None:
+                # Failed on "chain": the input comes back, the fee is spent
+                if sol_in:
+                    account.sol += amount
+                else:
+                    account.tokens[mint] += amount
+                return TxResult(FAILED, signature, [Attempt(signature, None, "slippage tolerance exceeded")],
+                                "slippage tolerance exceeded")
+            if sol_in:
+                account.tokens[mint] = account.tokens.get(mint, 0) + out
+                account.decimals[mint] = self.simulator.pools[mint].decimals
+            else:
+                account.sol += out
+                if not account.tokens[mint]:
+                    del account.tokens[mint]
+            account.swaps += 1
+        for event in ("processed", "confirmed", "finalized"):
+            notify(event)
+        logger.info(f"[{user_id}] Paper swap {amount} {input_mint} -> {out} {output_mint}",
+                    extra={"user": user_id, "mint": mint, "signature": signature, "stage": "done"})
+        return TxResult(LANDED, signature, [Attempt(signature, None, commitment="finalized")])
+
+    async def run(self, save_seconds: float = SAVE_SECONDS):
+        """
+        Persist accounts and pool reserves when they changed.
+        """
+        if not self._loaded:
+            await asyncio.to_thread(self.load)
+        while True:
+            await asyncio.sleep(save_seconds)
+            if self._dirty:
+                try:
+                    await asyncio.to_thread(self.save)
+                except Exception as e:
+                    logger.error(f"Saving paper accounts failed: {e}")
+
+
+paper_trading = PaperTrading()
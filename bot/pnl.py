@@ -0,0 +1,139 @@
+from typing import Callable, Dict, Iterable, Optional
+import numpy as np
+from bot.history import WalletHistory
+from bot.outbox import escape_markdown
+
+LAMPORTS_PER_SOL = 10 ** 9
+MAX_LINES = 15
+
+
+def _grouped_cumsum(values: np.ndarray, group: np.ndarray, starts: np.ndarray):
+    """
+    Running sum restarting at every group; also returns the global running sum and its value before each group.
+    """
+    total = np.cumsum(values)
+    before = (total - values)[starts]
+    return total - before[group], total, before
+
+
+def compute_pnl(mint: np.ndarray, token_delta: np.ndarray, sol_delta: np.ndarray, mint_count: int) -> Dict[str, np.ndarray]:
+    """
+    FIFO cost basis over chronological balance-change rows, vectorized across all mints.
+
+    Token inflows are lots costing the lamports spent with them (transfers in cost nothing); outflows
+    consume the oldest lots. The cost of everything sold up to a row is the cumulative buy cost
+    interpolated at the cumulative sold quantity, so no per-row loop is needed. Outflows without a
+    lamport inflow are transfers: they remove cost basis without realizing PnL. Units sold beyond
+    the known buys (history older than the backfill) have no cost basis.
+
+    Returns per-mint arrays: position (raw units), cost_basis, realized, spent, received (lamports), trades.
+    """
+    if len(mint) == 0:
+        result = {name: np.zeros(mint_count) for name in ("position", "cost_basis", "realized", "spent", "received")}
+        result["trades"] = np.zeros(mint_count, np.int64)
+        return result
+
+    order = np.argsort(mint, kind="stable")
+    m = mint[order]
+    quantity = token_delta[order].astype(np.float64)
+    lamports = sol_delta[order].astype(np.float64)
+    buy = quantity > 0
+    sell = quantity < 0
+    trade_sell = sell & (lamports > 0)
+    cost = np.where(buy, np.maximum(-lamports, 0.0), 0.0)
+    proceeds = np.where(trade_sell, lamports, 0.0)
+
+    new_group = np.r_[True, m[1:] != m[:-1]]
+    starts = np.flatnonzero(new_group)
+    group = np.cumsum(new_group) - 1
+    bought, all_bought, bought_before = _grouped_cumsum(np.where(buy, quantity, 0.0), group, starts)
+    sold, _, _ = _grouped_cumsum(np.where(sell, -quantity, 0.0), group, starts)
+    _, all_cost, cost_before = _grouped_cumsum(cost, group, starts)
+
+    # Running max of the oversold quantity per mint; groups are lifted apart so one accumulate suffices
+    oversold = np.maximum(sold - bought, 0.0)
+    if oversold.any():
+        lift = group * (oversold.max() + 1.0)
+        oversold = np.maximum.accumulate(oversold + lift) - lift
+    matched = sold - oversold
+
+    # Cumulative cost of the units sold so far (cost of lots as a piecewise-linear function of quantity)
+    consumed = np.interp(bought_before[group] + matched, np.r_[0.0, all_bought[buy]], np.r_[0.0, all_cost[buy]])
+    consumed -= cost_before[group]
+    consumed_before = np.r_[0.0, consumed[:-1]]
+    consumed_before[starts] = 0.0
+    realized = np.where(trade_sell, proceeds - (consumed - consumed_before), 0.0)
+
+    ends = np.r_[starts[1:], len(m)] - 1
+    mints = m[starts]
+    position = np.zeros(mint_count)
+    cost_basis = np.zeros(mint_count)
+    position[mints] = bought[ends] - matched[ends]
+    cost_basis[mints] = np.maximum(all_cost[ends] - cost_before - consumed[ends], 0.0)
+    return {
+        "position": position,
+        "cost_basis": cost_basis,
+        "realized": np.bincount(m, weights=realized, minlength=mint_count),
+        "spent": np.bincount(m, weights=cost, minlength=mint_count),
+        "received": np.bincount(m, weights=proceeds, minlength=mint_count),
+        "trades": np.bincount(m, weights=buy | trade_sell, minlength=mint_count).astype(np.int64),
+    }
+
+
+def wallet_pnl(history: WalletHistory,
+               price_source: Optional[Callable[[Iterable[str]], Dict[str, float]]] = None) -> Dict[str, np.ndarray]:
+    """
+    compute_pnl over a wallet history plus unrealized PnL (lamports) of open positions, priced in
+    SOL per token by `price_source`. Mints without a price keep an unrealized PnL of 0.
+    """
+    columns = history.columns
+    result = compute_pnl(columns["mint"], columns["token_delta"], columns["sol_delta"], len(history.mints))
+    held = [history.mints[index] for index in np.flatnonzero(result["position"] > 0)]
+    prices = price_source(held) if price_source and held else {}
+    price = np.array([prices.get(mint, np.nan) for mint in history.mints], dtype=np.float64)
+    scale = np.power(10.0, np.array(history.decimals, dtype=np.float64))
+    value = result["position"] / scale * price * LAMPORTS_PER_SOL
+    priced = ~np.isnan(value)
+    result["value"] = np.where(priced, value, 0.0)
+    result["unrealized"] = np.where(priced, value - result["cost_basis"], 0.0)
+    result["priced"] = priced
+    return result
+
+
+def render_pnl(history: WalletHistory, pnl: Dict[str, np.ndarray],
+               symbol_of: Callable[[str], Optional[str]] = lambda mint: None, limit: int = MAX_LINES) -> str:
+    """
+    Per-token lines sorted by total PnL magnitude, then wallet totals (SOL).
+    """
+    traded = np.flatnonzero(pnl["trades"] > 0)
+    if len(traded) == 0:
+        return "No swaps found in this wallet's history yet."
+    total = pnl["realized"] + pnl["unrealized"]
+    traded = traded[np.argsort(-np.abs(total[traded]), kind="stable")]
+
+    lines = []
+    for index in traded[:limit]:
+        mint = history.mints[index]
+        name = escape_markdown(symbol_of(mint) or f"{mint[:4]}…{mint[-4:]}")
+        line = (f"*{name}*: {total[index] / LAMPORTS_PER_SOL:+.4f} SOL "
+                f"(realized {pnl['realized'][index] / LAMPORTS_PER_SOL:+.4f}")
+        if pnl["position"][index] > 0:
+            amount = pnl["position"][index] / 10 ** history.decimals[index]
+            average = pnl["cost_basis"][index] / LAMPORTS_PER_SOL / amount
+            unrealized = (f"unrealized {pnl['unrealized'][index] / LAMPORTS_PER_SOL:+.4f}"
+                          if pnl["priced"][index] else "no price")
+            line += f", {unrealized})\nHolding {amount:,.4f} @ {average:.10f} SOL avg"
+        else:
+            line += ")"
+        lines.append(line)
+    if len(traded) > limit:
+        lines.append(f"…and {len(traded) - limit} more tokens")
+
+    realized = pnl["realized"].sum() / LAMPORTS_PER_SOL
+    unrealized = pnl["unrealized"].sum() / LAMPORTS_PER_SOL
+    lines.append(f"Total: {realized + unrealized:+.4f} SOL (realized {realized:+.4f}, "
+                 f"unrealized {unrealized:+.4f})\n"
+                 f"Spent {pnl['spent'].sum() / LAMPORTS_PER_SOL:.4f} SOL, "
+                 f"received {pnl['received'].sum() / LAMPORTS_PER_SOL:.4f} SOL "
+                 f"over {int(pnl['trades'].sum())} swaps in {history.transactions} transactions")
+    return "\n\n".join(lines)
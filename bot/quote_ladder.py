@@ -0,0 +1,102 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+from bot.transaction import TransactionManager
+from bot.paper import paper_trading
+
+logger = logging.getLogger(__name__)
+
+LADDER = (0.25, 0.5, 1, 2)
+CACHE_TTL_SECONDS = 10
+CACHE_MAX_ENTRIES = 1024
+
+
+class QuoteCache:
+    """
+    Short-lived cache of Jupiter quotes keyed by (input mint, output mint, amount).
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: Dict[Tuple[str, str, int], Tuple[float, Dict[str, Any]]] = {}
+
+    def get(self, key: Tuple[str, str, int]) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, quote = entry
+        if expires_at < monotonic():
+            del self._entries[key]
+            return None
+        return quote
+
+    def put(self, key: Tuple[str, str, int], quote: Dict[str, Any]):
+        if len(self._entries) >= self.max_entries:
+            now = monotonic()
+            for stale in [k for k, (expires_at, _) in self._entries.items() if expires_at < now]:
+                del self._entries[stale]
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+        self._entries[key] = (monotonic() + self.ttl, quote)
+
+
+quote_cache = QuoteCache()
+
+
+async def get_quote_cached(input_mint: str, output_mint: str, amount: int, pub_key_str: str,
+                           user_id=None) -> Optional[Dict[str, Any]]:
+    if user_id is not None and paper_trading.enabled(user_id):
+        # Simulated reserves move with every paper swap, never serve them from the cache
+        return await asyncio.to_thread(TransactionManager.get_quote, input_mint, output_mint, amount, pub_key_str, user_id)
+    key = (input_mint, output_mint, amount)
+    quote = quote_cache.get(key)
+    if quote is None:
+        quote = await asyncio.to_thread(TransactionManager.get_quote, input_mint, output_mint, amount, pub_key_str)
+        if quote:
+            quote_cache.put(key, quote)
+    return quote
+
+
+async def fetch_ladder(input_mint: str, output_mint: str, base_amount: int, pub_key_str: str,
+                       multipliers: Tuple[float, ...] = LADDER, user_id=None) -> List[Dict[str, Any]]:
+    """
+    Quotes for several sizes around `base_amount`, fetched concurrently over the pooled session.
+    Total latency is that of the slowest quote.
+    """
+    amounts = [max(1, int(base_amount * multiplier)) for multiplier in multipliers]
+    quotes = await asyncio.gather(
+        *(get_quote_cached(input_mint, output_mint, amount, pub_key_str, user_id) for amount in amounts),
+        return_exceptions=True,
+    )
+    ladder = []
+    for multiplier, amount, quote in zip(multipliers, amounts, quotes):
+        if isinstance(quote, Exception):
+            logger.error(f"Ladder quote for {amount} failed: {quote}")
+            quote = None
+        ladder.append({"multiplier": multiplier, "amount": amount, "quote": quote})
+    return ladder
+
+
+def render_ladder(ladder: List[Dict[str, Any]], input_decimals: int, output_decimals: int,
+                  input_symbol: str = "SOL", balance: Optional[int] = None) -> str:
+    """
+    One line per size: input amount, expected output, effective price and price impact.
+    """
+    lines = []
+    for rung in ladder:
+        amount_in = rung["amount"] / (10 ** input_decimals)
+        marker = "▶ " if rung["multiplier"] == 1 else ""
+        quote = rung["quote"]
+        if not quote:
+            lines.append(f"{marker}{amount_in:g} {input_symbol}: no quote")
+            continue
+        amount_out = int(quote["outAmount"]) / (10 ** output_decimals)
+        price = amount_in / amount_out if amount_out else 0.0
+        impact = float(quote.get("priceImpactPct") or 0) * 100
+        line = f"{marker}{amount_in:g} {input_symbol} → {amount_out:,.4f} | price {price:.10f} | impact {impact:.2f}%"
+        if balance is not None and rung["amount"] > balance:
+            line += " ⚠ exceeds balance"
+        lines.append(line)
+    return "\n".join(lines)
@@ -0,0 +1,206 @@
+import asyncio
+import heapq
+import json
+import logging
+import random
+from dataclasses import dataclass, asdict
+from time import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from bot.transaction import TransactionManager
+
+logger = logging.getLogger(__name__)
+
+DCA_FILE = "data/dca.json"
+MAX_RUNS_PER_SECOND = 5  # Spread due buys so many schedules don't hit the RPC in the same second
+MAX_JITTER_SECONDS = 30
+MIN_INTERVAL_SECONDS = 60
+
+
+@dataclass
+class DcaSchedule:
+    schedule_id: int
+    user_id: int
+    mint: str
+    sol_amount: float
+    interval_seconds: int
+    remaining: int
+    next_run: float  # Unix time, survives restarts
+    slippage: int = 1
+    executed: int = 0
+    failed: int = 0
+
+
+class DcaScheduler:
+    """
+    Recurring buys driven by a min-heap of (next_run, schedule_id).
+
+    Firing pops only due entries, so its cost is O(log n) per run regardless of how many schedules
+    exist. Cancelled schedules are dropped lazily when they reach the top of the heap. Each run is
+    jittered and at most `max_per_second` buys are started per second. The clock and random source are
+    injectable for deterministic tests.
+    """
+
+    def __init__(self, dca_file: str = DCA_FILE, max_per_second: int = MAX_RUNS_PER_SECOND,
+                 clock: Callable[[], float] = time, rng: Optional[random.Random] = None,
+                 buyer: Callable[..., object] = TransactionManager.buy):
+        self.dca_file = dca_file
+        self.max_per_second = max_per_second
+        self.clock = clock
+        self.rng = rng or random.Random()
+        self.buyer = buyer
+        self.notify: Optional[Callable[[int, str], Awaitable[None]]] = None
+        self.schedules: Dict[int, DcaSchedule] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self.next_id = 1  # Persisted, so ids of cancelled or finished schedules are never reused
+        self._wakeup: Optional[asyncio.Event] = None
+        self._running: set = set()
+
+    # ----------------- Schedule management -----------------
+    def load(self):
+        try:
+            with open(self.dca_file, "r") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = {}
+        if isinstance(stored, list):
+            stored = {"schedules": stored}  # Files written before the id counter was stored
+        for item in stored.get("schedules", []):
+            schedule = DcaSchedule(**item)
+            self.schedules[schedule.schedule_id] = schedule
+            heapq.heappush(self._heap, (schedule.next_run, schedule.schedule_id))
+        self.next_id = max(stored.get("next_id", 1), max(self.schedules, default=0) + 1)
+        logger.info(f"Loaded {len(self.schedules)} DCA schedules")
+
+    def save(self):
+        with open(self.dca_file, "w") as f:
+            json.dump({"next_id": self.next_id,
+                       "schedules": [asdict(schedule) for schedule in self.schedules.values()]}, f, indent=4)
+
+    def add(self, user_id: int, mint: str, sol_amount: float, interval_seconds: int, count: int,
+            slippage: int = 1) -> DcaSchedule:
+        if sol_amount <= 0:
+            raise ValueError("Amount must be positive.")
+        if interval_seconds < MIN_INTERVAL_SECONDS:
+            raise ValueError(f"Interval must be at least {MIN_INTERVAL_SECONDS // 60} minute(s).")
+        if count < 1:
+            raise ValueError("Number of intervals must be at least 1.")
+
+        schedule_id = self.next_id
+        self.next_id += 1
+        next_run = self.clock() + self._jitter(interval_seconds)
+        schedule = DcaSchedule(schedule_id, user_id, mint, sol_amount, interval_seconds, count, next_run, slippage)
+        self.schedules[schedule_id] = schedule
+        self._push(schedule)
+        self.save()
+        logger.info(f"[{user_id}] added DCA #{schedule_id}: {sol_amount} SOL into {mint} "
+                    f"every {interval_seconds}s x{count}")
+        return schedule
+
+    def cancel(self, user_id: int, schedule_id: int) -> bool:
+        schedule = self.schedules.get(schedule_id)
+        if schedule is None or schedule.user_id != user_id:
+            return False
+        del self.schedules[schedule_id]  # Heap entry is skipped lazily
+        self.save()
+        return True
+
+    def user_schedules(self, user_id: int) -> List[DcaSchedule]:
+        return [schedule for schedule in self.schedules.values() if schedule.user_id == user_id]
+
+    def _jitter(self, interval_seconds: int) -> float:
+        return self.rng.uniform(0, min(interval_seconds * 0.1, MAX_JITTER_SECONDS))
+
+    def _push(self, schedule: DcaSchedule):
+        heapq.heappush(self._heap, (schedule.next_run, schedule.schedule_id))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # ----------------- Firing -----------------
+    def pop_due(self, now: float, limit: int) -> List[DcaSchedule]:
+        """
+        Pop up to `limit` schedules whose run time has come. Overdue ones beyond the limit stay
+        at the top of the heap and fire on the next second.
+        """
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < limit:
+            next_run, schedule_id = heapq.heappop(self._heap)
+            schedule = self.schedules.get(schedule_id)
+            if schedule is None or schedule.next_run != next_run:
+                continue  # Cancelled or rescheduled
+            due.append(schedule)
+        return due
+
+    def reschedule(self, schedule: DcaSchedule, now: float):
+        schedule.remaining -= 1
+        if schedule.remaining <= 0:
+            self.schedules.pop(schedule.schedule_id, None)
+            return
+        # Keep the cadence anchored to the previous slot; after a long downtime restart from now
+        next_run = schedule.next_run + schedule.interval_seconds
+        if next_run < now:
+            next_run = now
+        schedule.next_run = next_run + self._jitter(schedule.interval_seconds)
+        self._push(schedule)
+
+    async def run_due(self) -> int:
+        """
+        Start every due buy allowed for this second and return how many were started.
+        """
+        now = self.clock()
+        due = self.pop_due(now, self.max_per_second)
+        for schedule in due:
+            self.reschedule(schedule, now)
+        if due:
+            self.save()
+        for schedule in due:
+            # Buys run in the background so slow confirmations don't hold up the next second
+            task = asyncio.create_task(self._execute(schedule))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+        return len(due)
+
+    async def _execute(self, schedule: DcaSchedule):
+        try:
+            result = await asyncio.to_thread(self.buyer, schedule.user_id, schedule.mint,
+                                             schedule.sol_amount, schedule.slippage)
+            success, tx_hash = result if result else (False, None)
+        except Exception as e:
+            logger.error(f"[{schedule.user_id}] DCA #{schedule.schedule_id} buy failed: {e}")
+            success, tx_hash = False, None
+
+        if success:
+            schedule.executed += 1
+            text = (f"✅ DCA #{schedule.schedule_id}: bought {schedule.sol_amount} SOL of\n`{schedule.mint}`\n"
+                    f"{schedule.remaining} left\nhttps://solana.fm/tx/{tx_hash}")
+        else:
+            schedule.failed += 1
+            text = f"❌ DCA #{schedule.schedule_id}: buy failed, {schedule.remaining} left\n`{schedule.mint}`"
+        if schedule.schedule_id in self.schedules:
+            self.save()
+        if self.notify:
+            await self.notify(schedule.user_id, text)
+
+    async def run(self):
+        self.load()
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                started = await self.run_due()
+            except Exception as e:
+                logger.error(f"DCA scheduler tick failed: {e}")
+                started = 0
+
+            if started >= self.max_per_second:
+                timeout = 1.0  # Budget for this second used up, continue with the backlog next second
+            elif self._heap:
+                timeout = max(0.0, min(self._heap[0][0] - self.clock(), 60.0))
+            else:
+                timeout = None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+dca_scheduler = DcaScheduler()
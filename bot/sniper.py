@@ -0,0 +1,422 @@
+import asyncio
+import json
+import logging
+import re
+import sys
+from collections import deque
+from dataclasses import dataclass, field
+from time import perf_counter
+from typing import Awaitable, Callable, Deque, Dict, Iterable, List, Optional
+import httpx
+from based58 import b58decode
+from solders.keypair import Keypair
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.rpc.config import RpcTransactionLogsFilterMentions
+from solders.rpc.responses import LogsNotification, parse_websocket_message
+from solana.rpc.async_api import AsyncClient
+from solana.rpc.commitment import Confirmed, Processed
+from solana.rpc.types import TxOpts
+from solana.rpc.websocket_api import connect
+from bot.transaction import TransactionManager, SOL, jupiter_url
+from bot.wallet_manager import get_user_data
+
+logger = logging.getLogger(__name__)
+
+SNIPER_FILE = "data/sniper.json"
+RAYDIUM_AMM_V4 = "675kPX9MHTjS2zt1qfr1NYHuzeLXfQM9H24wFSUt1Mp8"
+PUMP_FUN = "6EF8rrecthR5Dkzon8Nwu78hRvfCKubJ14M5uBEwF6P"
+DEFAULT_PROGRAMS = [RAYDIUM_AMM_V4, PUMP_FUN]
+RESOLVE_ATTEMPTS = 5
+RESOLVE_RETRY_SECONDS = 0.2
+SEEN_SIGNATURES = 10_000
+LATENCY_SAMPLES = 500
+
+# Program log markers of pool creation, keyed by program id
+POOL_MARKERS = {
+    RAYDIUM_AMM_V4: "Program log: initialize2: InitializeInstruction2",
+    PUMP_FUN: "Program log: Instruction: Create",
+}
+RAYDIUM_AMOUNTS = re.compile(r"init_pc_amount: (\d+), init_coin_amount: (\d+)")
+
+# Pool-creation instructions: data prefix and positions in the instruction's account list
+RAYDIUM_INITIALIZE2 = bytes([1])  # tag, nonce u8, open_time u64, init_pc_amount u64, init_coin_amount u64
+PUMP_FUN_CREATE = bytes.fromhex("181ec828051c0777")  # Anchor discriminator of "global:create"
+POOL_INSTRUCTIONS = {
+    RAYDIUM_AMM_V4: (RAYDIUM_INITIALIZE2, {"coin_mint": 8, "pc_mint": 9, "creator": 17}),
+    PUMP_FUN: (PUMP_FUN_CREATE, {"mint": 0, "bonding_curve": 2, "creator": 7}),
+}
+BONDING_CURVE_REAL_SOL = slice(32, 40)  # discriminator, virtual token/SOL and real token reserves come first
+
+
+@dataclass
+class PoolEvent:
+    program: str
+    signature: str
+    slot: int
+    detected_at: float  # perf_counter() when the notification was received
+    init_pc_amount: Optional[int] = None
+    init_coin_amount: Optional[int] = None
+    mint: Optional[str] = None
+    creator: Optional[str] = None
+    liquidity_lamports: Optional[int] = None
+    mint_authority_revoked: Optional[bool] = None
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class SniperFilters:
+    creators: List[str] = field(default_factory=list)  # Empty means any creator
+    min_liquidity_sol: float = 0.0
+    require_mint_authority_revoked: bool = True
+
+    def matches(self, event: PoolEvent) -> bool:
+        if self.creators and event.creator not in self.creators:
+            return False
+        if self.min_liquidity_sol > 0:
+            if event.liquidity_lamports is None or event.liquidity_lamports < self.min_liquidity_sol * 1e9:
+                return False
+        if self.require_mint_authority_revoked and not event.mint_authority_revoked:
+            return False
+        return True
+
+
+class ArmedBuy:
+    """
+    Everything a snipe needs resolved ahead of time: keypair, amount, slippage and fee settings.
+    """
+
+    def __init__(self, user_id: int, private_key: str, sol_amount: float, slippage: int, filters: SniperFilters):
+        self.user_id = user_id
+        self.keypair = Keypair.from_base58_string(private_key)
+        self.pub_key_str = str(self.keypair.pubkey())
+        self.amount_lamports = int(sol_amount * 1e9)
+        self.slippage_bps = slippage * 100
+        self.filters = filters
+
+
+def parse_pool_logs(program: str, logs: Iterable[str]) -> Optional[Dict[str, int]]:
+    """
+    Scan log lines one at a time and stop at the pool-creation marker of `program`.
+    Returns the amounts found in the marker line (may be empty) or None if it is not a new pool.
+    """
+    marker = POOL_MARKERS.get(program)
+    if marker is None:
+        return None
+    for line in logs:
+        if line.startswith(marker):
+            found = RAYDIUM_AMOUNTS.search(line)
+            if found:
+                return {"init_pc_amount": int(found.group(1)), "init_coin_amount": int(found.group(2))}
+            return {}
+    return None
+
+
+def find_pool_instruction(program: str, tx) -> Optional[tuple]:
+    """
+    (account addresses, data) of the pool-creation instruction of `program` in a base64-encoded
+    getTransaction result, top level or invoked by another program; None if there is none.
+    """
+    prefix, _ = POOL_INSTRUCTIONS[program]
+    meta = tx.transaction.meta
+    keys = [str(key) for key in tx.transaction.transaction.message.account_keys]
+    loaded = meta.loaded_addresses
+    if loaded is not None:
+        keys += [str(key) for key in list(loaded.writable) + list(loaded.readonly)]
+
+    candidates = [(ix.program_id_index, ix.accounts, bytes(ix.data))
+                  for ix in tx.transaction.transaction.message.instructions]
+    for inner in meta.inner_instructions or []:
+        candidates += [(ix.program_id_index, ix.accounts, b58decode(ix.data.encode())) for ix in inner.instructions]
+    for program_index, accounts, data in candidates:
+        if keys[program_index] == program and data.startswith(prefix):
+            return [keys[index] for index in accounts], data
+    return None
+
+
+class Sniper:
+    """
+    Watches `logsSubscribe` streams of AMM/launchpad programs for new pools and fires pre-armed buys
+    for every user whose filters match. Detection-to-send latency of each stage is recorded.
+
+    `resolver` and `sender` are injectable so recorded log streams can be replayed offline.
+    """
+
+    def __init__(self, ws_url: Optional[str] = None, rpc_url: Optional[str] = None,
+                 programs: Optional[List[str]] = None, send_urls: Optional[List[str]] = None,
+                 sniper_file: str = SNIPER_FILE, dry_run: bool = False):
+        self.ws_url = ws_url
+        self.rpc_url = rpc_url
+        self.programs = programs or list(DEFAULT_PROGRAMS)
+        self.send_urls = send_urls or []
+        self.sniper_file = sniper_file
+        self.dry_run = dry_run
+        self.notify: Optional[Callable[[int, str], Awaitable[None]]] = None
+        self.resolver: Callable[[PoolEvent], Awaitable[None]] = self.resolve_event
+        self.sender: Callable[[ArmedBuy, PoolEvent], Awaitable[Optional[str]]] = self.send_buy
+        self.armed: Dict[int, ArmedBuy] = {}
+        self.latencies: Deque[Dict[str, float]] = deque(maxlen=LATENCY_SAMPLES)
+        self._seen: Deque[str] = deque(maxlen=SEEN_SIGNATURES)
+        self._seen_set: set = set()
+        self._rpc: Optional[AsyncClient] = None
+        self._send_clients: List[AsyncClient] = []
+        self._http: Optional[httpx.AsyncClient] = None
+        self._tasks: set = set()
+
+    # ----------------- User configuration -----------------
+    def load(self):
+        try:
+            with open(self.sniper_file, "r") as f:
+                stored = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stored = {}
+        for user_id, config in stored.items():
+            if config.get("enabled"):
+                try:
+                    self.arm(int(user_id), config, save=False)
+                except (ValueError, KeyError) as e:
+                    logger.error(f"[{user_id}] failed to arm sniper: {e}")
+
+    def _load_config(self) -> dict:
+        try:
+            with open(self.sniper_file, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def get_config(self, user_id: int) -> dict:
+        return self._load_config().get(str(user_id), {})
+
+    def save_config(self, user_id: int, config: dict):
+        stored = self._load_config()
+        stored[str(user_id)] = config
+        with open(self.sniper_file, "w") as f:
+            json.dump(stored, f, indent=4)
+
+    def arm(self, user_id: int, config: dict, save: bool = True):
+        user_data = get_user_data(user_id)
+        if not user_data.get("private_key"):
+            raise ValueError("No private key found. Please create it first from the menu.")
+        filters = SniperFilters(**config.get("filters", {}))
+        self.armed[user_id] = ArmedBuy(user_id, user_data["private_key"], config["sol_amount"],
+                                       config.get("slippage", 1), filters)
+        if save:
+            config["enabled"] = True
+            self.save_config(user_id, config)
+        logger.info(f"[{user_id}] sniper armed with {config['sol_amount']} SOL")
+
+    def disarm(self, user_id: int):
+        self.armed.pop(user_id, None)
+        config = self.get_config(user_id)
+        if config:
+            config["enabled"] = False
+            self.save_config(user_id, config)
+
+    # ----------------- Stream handling -----------------
+    async def run(self):
+        self.load()
+        self._rpc = AsyncClient(self.rpc_url, commitment=Confirmed)
+        self._send_clients = [AsyncClient(url) for url in self.send_urls] or [self._rpc]
+        self._http = httpx.AsyncClient(timeout=10)
+        while True:
+            try:
+                async with connect(self.ws_url) as ws:
+                    for program in self.programs:
+                        await ws.logs_subscribe(RpcTransactionLogsFilterMentions(Pubkey.from_string(program)),
+                                                commitment=Processed)
+                    logger.info(f"Sniper subscribed to {len(self.programs)} programs")
+                    while True:
+                        for item in await ws.recv():
+                            received_at = perf_counter()
+                            if isinstance(item, LogsNotification):
+                                request = ws.subscriptions.get(item.subscription)
+                                if request is not None:
+                                    self.handle_notification(str(request.filter_.pubkey), item, received_at)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Sniper websocket dropped: {e}, reconnecting")
+                await asyncio.sleep(1)
+
+    def handle_notification(self, program: str, item: LogsNotification, received_at: float) -> Optional[PoolEvent]:
+        if not self.armed:
+            return None
+        value = item.result.value
+        if value.err is not None:
+            return None
+        signature = str(value.signature)
+        if signature in self._seen_set:
+            return None  # The same transaction mentions several watched programs
+        amounts = parse_pool_logs(program, value.logs)
+        if amounts is None:
+            return None
+
+        if len(self._seen) == self._seen.maxlen:
+            self._seen_set.discard(self._seen[0])
+        self._seen.append(signature)
+        self._seen_set.add(signature)
+
+        event = PoolEvent(program, signature, item.result.context.slot, received_at, **amounts)
+        event.timings["parsed"] = perf_counter() - received_at
+        task = asyncio.create_task(self.process_event(event))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return event
+
+    async def process_event(self, event: PoolEvent):
+        try:
+            await self.resolver(event)
+        except Exception as e:
+            logger.error(f"Failed to resolve pool {event.signature}: {e}")
+            return
+        event.timings["resolved"] = perf_counter() - event.detected_at
+        if event.mint is None:
+            return
+
+        matched = [armed for armed in self.armed.values() if armed.filters.matches(event)]
+        logger.info(f"New pool {event.mint} ({event.program}) by {event.creator}, "
+                    f"liquidity {event.liquidity_lamports}, {len(matched)} matches")
+        await asyncio.gather(*(self._fire(armed, event) for armed in matched))
+
+    async def _fire(self, armed: ArmedBuy, event: PoolEvent):
+        try:
+            tx_hash = await self.sender(armed, event)
+        except Exception as e:
+            logger.error(f"[{armed.user_id}] snipe of {event.mint} failed: {e}")
+            tx_hash = None
+        sent = perf_counter() - event.detected_at
+        sample = dict(event.timings, sent=sent)
+        self.latencies.append(sample)
+        logger.info(f"[{armed.user_id}] snipe {event.mint} | tx {tx_hash} | detect->send {sent * 1000:.1f} ms",
+                    extra={"user": armed.user_id, "mint": event.mint, "signature": tx_hash, "stage": "snipe"})
+        if self.notify:
+            if tx_hash:
+                text = (f"🎯 Sniped new pool `{event.mint}`\n{armed.amount_lamports / 1e9} SOL, "
+                        f"detect→send {sent * 1000:.0f} ms\nhttps://solana.fm/tx/{tx_hash}")
+            else:
+                text = f"❌ Snipe of `{event.mint}` failed."
+            await self.notify(armed.user_id, text)
+
+    # ----------------- Resolution and sending -----------------
+    async def resolve_event(self, event: PoolEvent):
+        """
+        Fill mint, creator, liquidity and mint authority of a pool event from the chain.
+        """
+        tx = None
+        for _ in range(RESOLVE_ATTEMPTS):
+            tx = (await self._rpc.get_transaction(Signature.from_string(event.signature), encoding="base64",
+                                                  max_supported_transaction_version=0)).value
+            if tx is not None:
+                break
+            await asyncio.sleep(RESOLVE_RETRY_SECONDS)
+        if tx is None:
+            return
+
+        found = find_pool_instruction(event.program, tx)
+        if found is None:
+            return
+        accounts, data = found
+        positions = POOL_INSTRUCTIONS[event.program][1]
+        event.creator = accounts[positions["creator"]]
+        bonding_curve = None
+        if event.program == RAYDIUM_AMM_V4:
+            # initialize2 also mints LP tokens, so the token is whichever side of the pair is not SOL
+            coin_mint, pc_mint = accounts[positions["coin_mint"]], accounts[positions["pc_mint"]]
+            event.init_pc_amount = int.from_bytes(data[10:18], "little")
+            event.init_coin_amount = int.from_bytes(data[18:26], "little")
+            if pc_mint == SOL:
+                event.mint, event.liquidity_lamports = coin_mint, event.init_pc_amount
+            elif coin_mint == SOL:
+                event.mint, event.liquidity_lamports = pc_mint, event.init_coin_amount
+            else:
+                return  # Not a SOL pair
+        else:
+            event.mint = accounts[positions["mint"]]
+            bonding_curve = accounts[positions["bonding_curve"]]
+
+        addresses = [event.mint] + ([bonding_curve] if bonding_curve else [])
+        infos = (await self._rpc.get_multiple_accounts([Pubkey.from_string(a) for a in addresses])).value
+        mint_info = infos[0]
+        if mint_info is not None:
+            data = bytes(mint_info.data)
+            event.mint_authority_revoked = len(data) >= 4 and int.from_bytes(data[0:4], "little") == 0
+        if bonding_curve and infos[1] is not None:
+            # SOL actually deposited into the pump.fun curve (the creator's initial buy)
+            event.liquidity_lamports = int.from_bytes(bytes(infos[1].data)[BONDING_CURVE_REAL_SOL], "little")
+
+    async def send_buy(self, armed: ArmedBuy, event: PoolEvent) -> Optional[str]:
+        params = TransactionManager.quote_params(SOL, event.mint, armed.amount_lamports, armed.pub_key_str)
+        params["slippageBps"] = armed.slippage_bps
+        response = await self._http.get(jupiter_url("quote"), params=params)
+        response.raise_for_status()
+        event.timings["quoted"] = perf_counter() - event.detected_at
+
+        payload = TransactionManager.swap_payload(armed.pub_key_str, response.json())
+        response = await self._http.post(jupiter_url("swap"), json=payload, params={'swapType': 'aggregator'})
+        response.raise_for_status()
+        signed_txn = TransactionManager.sign_swap_transaction(armed.keypair, response.json())
+        event.timings["built"] = perf_counter() - event.detected_at
+        if self.dry_run:
+            return str(signed_txn.signatures[0])
+
+        # Send through every configured path at once, the first accepted signature wins
+        opts = TxOpts(skip_preflight=True, max_retries=0)
+        results = await asyncio.gather(
+            *(client.send_raw_transaction(bytes(signed_txn), opts=opts) for client in self._send_clients),
+            return_exceptions=True,
+        )
+        for result in results:
+            if not isinstance(result, Exception):
+                return str(result.value)
+        raise results[0]
+
+    # ----------------- Replay -----------------
+    async def replay(self, path: str, program: str):
+        """
+        Feed a recorded stream (one raw websocket message per line) through the live code path.
+        """
+        with open(path, "r") as f:
+            for raw in f:
+                raw = raw.strip()
+                if not raw:
+                    continue
+                received_at = perf_counter()
+                for item in parse_websocket_message(raw):
+                    if isinstance(item, LogsNotification):
+                        self.handle_notification(program, item, received_at)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    def latency_summary(self) -> Dict[str, float]:
+        """
+        p50/p95 of each stage in milliseconds over recent snipes.
+        """
+        summary = {}
+        stages = {stage for sample in self.latencies for stage in sample}
+        for stage in sorted(stages):
+            values = sorted(sample[stage] for sample in self.latencies if stage in sample)
+            summary[f"{stage}_p50_ms"] = values[len(values) // 2] * 1000
+            summary[f"{stage}_p95_ms"] = values[min(len(values) - 1, int(len(values) * 0.95))] * 1000
+        return summary
+
+
+sniper = Sniper()
+
+
+if __name__ == "__main__":
+    # python -m bot.sniper <recorded.jsonl> [program id] -- replay in dry-run mode and print latencies
+    logging.basicConfig(level=logging.INFO)
+    replay_sniper = Sniper(dry_run=True)
+
+    async def _replay_resolver(event: PoolEvent):
+        event.mint = event.mint or event.signature[:32]
+        event.mint_authority_revoked = True
+
+    async def _replay_sender(armed: ArmedBuy, event: PoolEvent) -> Optional[str]:
+        return event.signature
+
+    replay_sniper.resolver = _replay_resolver
+    replay_sniper.sender = _replay_sender
+    replay_sniper.armed[0] = ArmedBuy(0, str(Keypair()), 0.01, 1, SniperFilters(require_mint_authority_revoked=False))
+    asyncio.run(replay_sniper.replay(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else RAYDIUM_AMM_V4))
+    print(json.dumps(replay_sniper.latency_summary(), indent=4))
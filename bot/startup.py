@@ -0,0 +1,119 @@
+import asyncio
+import importlib
+import logging
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+# Modules the handlers resolve lazily; imported in the background while connections warm up
+HEAVY_MODULES = [
+    "bot.wallet_manager",
+    "bot.utils",
+    "bot.tx_lifecycle",
+    "bot.transaction",
+    "bot.swap_builder",
+    "bot.balance_cache",
+    "bot.orders",
+    "bot.scheduler",
+    "bot.sniper",
+    "bot.multi_wallet",
+    "bot.token_index",
+    "bot.quote_ladder",
+    "bot.history",
+    "bot.pnl",
+    "bot.paper",
+    "bot.backtest",
+]
+
+
+class StartupTimer:
+    """
+    Collects durations of startup phases relative to process start.
+    """
+
+    def __init__(self, started_at: float):
+        self.started_at = started_at
+        self.phases: Dict[str, float] = {}
+        self.first_response_logged = False
+
+    @contextmanager
+    def phase(self, name: str):
+        started = perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = perf_counter() - started
+
+    async def timed(self, name: str, awaitable: Awaitable) -> Any:
+        started = perf_counter()
+        try:
+            return await awaitable
+        finally:
+            self.phases[name] = perf_counter() - started
+
+    def report(self) -> str:
+        parts = ", ".join(f"{name} {seconds * 1000:.0f} ms" for name, seconds in self.phases.items())
+        return f"Startup in {(perf_counter() - self.started_at) * 1000:.0f} ms ({parts})"
+
+
+def import_heavy_modules():
+    for name in HEAVY_MODULES:
+        importlib.import_module(name)
+
+
+def warm_rpc():
+    from bot.wallet_manager import get_solana_client
+
+    get_solana_client().get_latest_blockhash()
+
+
+def warm_jupiter():
+    from bot.transaction import http_session, jupiter_url
+
+    # Any response is fine, this only opens the pooled keep-alive connection
+    http_session.head(jupiter_url("quote"), timeout=5)
+
+
+async def warm_up(timer: StartupTimer, telegram: Callable[[], Awaitable[Any]]):
+    """
+    Import the solana stack and open pooled Telegram/RPC/Jupiter connections concurrently.
+    A failed warm-up step is logged and skipped, it only costs latency on first use.
+    """
+
+    async def step(name: str, awaitable: Awaitable):
+        try:
+            await timer.timed(name, awaitable)
+        except Exception as e:
+            logger.warning(f"Warm-up step '{name}' failed: {e}")
+
+    async def imports_then_connections():
+        await step("imports", asyncio.to_thread(import_heavy_modules))
+        await asyncio.gather(
+            step("rpc", asyncio.to_thread(warm_rpc)),
+            step("jupiter", asyncio.to_thread(warm_jupiter)),
+        )
+
+    with timer.phase("warm-up"):
+        await asyncio.gather(step("telegram", telegram()), imports_then_connections())
+
+
+class FirstResponseMiddleware:
+    """
+    Outer update middleware that logs how long after process start the first update was answered.
+    """
+
+    def __init__(self, timer: StartupTimer):
+        self.timer = timer
+
+    async def __call__(self, handler, event, data):
+        if self.timer.first_response_logged:
+            return await handler(event, data)
+        started = perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            self.timer.first_response_logged = True
+            logger.info(f"First update handled {(perf_counter() - self.timer.started_at):.2f} s after start "
+                        f"(handler {(perf_counter() - started) * 1000:.0f} ms)")
@@ -0,0 +1,70 @@
+import asyncio
+from typing import Optional
+from aiogram.types import Message
+from bot.outbox import outbox
+
+STATUS_LINES = {
+    "building": "🛠 Building transaction (attempt {attempt})...",
+    "sent": "📤 Sent (attempt {attempt}), waiting for the cluster...",
+    "processed": "🟡 Processed, waiting for confirmation...",
+    "confirmed": "🟢 Confirmed",
+    "finalized": "🔒 Finalized",
+    "failed": "❌ Failed on chain",
+    "expired": "⌛ Expired (attempt {attempt}), re-quoting...",
+}
+
+
+class StatusMessage:
+    """
+    One Telegram message edited in place as a transaction progresses.
+
+    `on_status` may be called from worker threads; edits go through the outbox, which keeps only
+    the latest pending text, so a burst of states costs at most one edit per chat rate slot.
+    """
+
+    def __init__(self, message: Message, loop: asyncio.AbstractEventLoop):
+        self.message = message
+        self.loop = loop
+        self.body = ""
+        self.status = ""
+        self.signature: Optional[str] = None
+        self._shown = message.text or ""
+
+    @classmethod
+    async def send(cls, message: Message, text: str) -> "StatusMessage":
+        sent = await outbox.send(message.chat.id, text, wait=True)
+        return cls(sent, asyncio.get_running_loop())
+
+    def text(self) -> str:
+        parts = [part for part in (self.body, self.status) if part]
+        if self.signature:
+            parts.append(f"https://solana.fm/tx/{self.signature}")
+        return "\n\n".join(parts)
+
+    def on_status(self, event: str, signature: Optional[str], attempt: int):
+        """
+        Transaction lifecycle callback, safe to call from any thread.
+        """
+        line = STATUS_LINES.get(event)
+        if line is None:
+            return
+        if event == "finalized" and self.status.startswith(STATUS_LINES["confirmed"]):
+            line = f"{STATUS_LINES['confirmed']} · {line}"
+        self.status = line.format(attempt=attempt)
+        self.signature = signature or self.signature
+        self.loop.call_soon_threadsafe(self.flush)
+
+    def update(self, body: Optional[str] = None, status: Optional[str] = None):
+        if body is not None:
+            self.body = body
+        if status is not None:
+            self.status = status
+        self.flush()
+
+    def flush(self):
+        text = self.text()
+        if not text or text == self._shown:
+            return
+        self._shown = text
+        outbox.edit(self.message.chat.id, self.message.message_id, text,
+                    parse_mode="Markdown", disable_web_page_preview=True)
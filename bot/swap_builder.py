@@ -0,0 +1,213 @@
+import asyncio
+import base64
+import logging
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from solders.address_lookup_table_account import AddressLookupTable, AddressLookupTableAccount
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.hash import Hash
+from solders.instruction import AccountMeta, Instruction
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.transaction import VersionedTransaction
+from solana.rpc.commitment import Confirmed
+from bot.transaction import TransactionManager, http_session, jupiter_url
+from bot.wallet_manager import get_solana_client
+
+logger = logging.getLogger(__name__)
+
+ALT_CACHE_SIZE = 512
+ALT_MAX_AGE_SLOTS = 9000        # ~1 hour; tables change rarely, a failed compile also invalidates
+BLOCKHASH_MAX_AGE_SECONDS = 10  # A blockhash stays usable for ~60 s, refresh well before that
+COMPUTE_UNIT_LIMIT_DEFAULT = 300_000
+COMPUTE_UNIT_LIMIT_MAX = 1_400_000
+COMPUTE_UNIT_MARGIN = 1.15
+COMPUTE_UNIT_PRICE = 200_000    # micro-lamports per compute unit
+REQUEST_TIMEOUT_SECONDS = 10
+
+
+def parse_instruction(raw: Dict[str, Any]) -> Instruction:
+    return Instruction(
+        Pubkey.from_string(raw["programId"]),
+        base64.b64decode(raw["data"]),
+        [AccountMeta(Pubkey.from_string(a["pubkey"]), a["isSigner"], a["isWritable"]) for a in raw["accounts"]],
+    )
+
+
+class LookupTableCache:
+    """
+    LRU cache of address lookup table accounts. Entries remember the slot they were fetched at and
+    are re-fetched once the cluster is `max_age_slots` past it; missing tables are fetched in one
+    getMultipleAccounts call.
+    """
+
+    def __init__(self, max_entries: int = ALT_CACHE_SIZE, max_age_slots: int = ALT_MAX_AGE_SLOTS):
+        self.max_entries = max_entries
+        self.max_age_slots = max_age_slots
+        self._entries: "OrderedDict[str, Tuple[AddressLookupTableAccount, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get_many(self, addresses: List[str], current_slot: int, client=None) -> List[AddressLookupTableAccount]:
+        tables, missing = {}, []
+        with self._lock:
+            for address in addresses:
+                entry = self._entries.get(address)
+                if entry is not None and current_slot - entry[1] <= self.max_age_slots:
+                    self._entries.move_to_end(address)
+                    tables[address] = entry[0]
+                    self.hits += 1
+                else:
+                    missing.append(address)
+                    self.misses += 1
+        if missing:
+            client = client or get_solana_client()
+            response = client.get_multiple_accounts([Pubkey.from_string(a) for a in missing], commitment=Confirmed)
+            slot = response.context.slot
+            for address, account in zip(missing, response.value):
+                if account is None:
+                    logger.warning(f"Lookup table {address} not found")
+                    continue
+                table = AddressLookupTable.deserialize(bytes(account.data))
+                tables[address] = AddressLookupTableAccount(Pubkey.from_string(address), list(table.addresses))
+                self.put(address, tables[address], slot)
+        return [tables[a] for a in addresses if a in tables]
+
+    def put(self, address: str, table: AddressLookupTableAccount, slot: int):
+        with self._lock:
+            self._entries[address] = (table, slot)
+            self._entries.move_to_end(address)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, addresses: List[str]):
+        with self._lock:
+            for address in addresses:
+                self._entries.pop(address, None)
+
+
+class BlockhashCache:
+    """
+    Recent blockhash with its last valid block height and the slot it was read at, refreshed when
+    older than `max_age` seconds (or continuously by `run`).
+    """
+
+    def __init__(self, max_age: float = BLOCKHASH_MAX_AGE_SECONDS):
+        self.max_age = max_age
+        self._value: Optional[Tuple[Hash, int, int]] = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self, client=None) -> Tuple[Hash, int, int]:
+        client = client or get_solana_client()
+        response = client.get_latest_blockhash(commitment=Confirmed)
+        value = (response.value.blockhash, response.value.last_valid_block_height, response.context.slot)
+        with self._lock:
+            self._value, self._fetched_at = value, monotonic()
+        return value
+
+    def get(self, client=None) -> Tuple[Hash, int, int]:
+        """
+        (blockhash, last valid block height, slot)
+        """
+        with self._lock:
+            if self._value is not None and monotonic() - self._fetched_at < self.max_age:
+                return self._value
+        return self.refresh(client)
+
+
+class SwapBuilder:
+    """
+    Builds swaps locally from Jupiter's swap-instructions: the v0 message is compiled here with our
+    own compute budget, cached lookup tables and a cached blockhash, so only the instruction list
+    crosses the network and extra instructions (tips, more swaps) can be merged into one transaction.
+    """
+
+    def __init__(self, compute_unit_price: int = COMPUTE_UNIT_PRICE, enabled: bool = False):
+        self.compute_unit_price = compute_unit_price
+        self.enabled = enabled
+        self.lookup_tables = LookupTableCache()
+        self.blockhash = BlockhashCache()
+
+    def get_swap_instructions(self, user_wallet: str, quote_response: dict) -> Optional[Dict[str, Any]]:
+        payload = TransactionManager.swap_payload(user_wallet, quote_response)
+        # Priority fee and compute budget are decided locally
+        payload.pop("prioritizationFeeLamports", None)
+        try:
+            response = http_session.post(jupiter_url("swap-instructions"), json=payload,
+                                         timeout=REQUEST_TIMEOUT_SECONDS)
+            response.raise_for_status()
+            instructions = response.json()
+        except requests.RequestException as e:
+            logger.error(f"Error in get_swap_instructions: {e}", extra={"stage": "swap"})
+            return None
+        if "error" in instructions:
+            logger.error(f"Jupiter swap-instructions error: {instructions['error']}", extra={"stage": "swap"})
+            return None
+        logger.debug(f"swap-instructions response {len(response.content)} bytes", extra={"stage": "swap"})
+        return instructions
+
+    def compute_budget(self, compute_unit_limit: int) -> List[Instruction]:
+        limit = min(int(compute_unit_limit * COMPUTE_UNIT_MARGIN), COMPUTE_UNIT_LIMIT_MAX)
+        return [set_compute_unit_limit(limit), set_compute_unit_price(self.compute_unit_price)]
+
+    def assemble(self, payer: Pubkey, parts: List[Dict[str, Any]],
+                 extra_instructions: Optional[List[Instruction]] = None) -> Tuple[MessageV0, int]:
+        """
+        Compile one v0 message from one or more swap-instructions responses plus extra instructions.
+        Returns the message and the last valid block height of its blockhash.
+        """
+        instructions, table_addresses, compute_units = [], [], 0
+        for part in parts:
+            compute_units += int(part.get("computeUnitLimit") or COMPUTE_UNIT_LIMIT_DEFAULT)
+            instructions.extend(parse_instruction(ix) for ix in part.get("otherInstructions") or [])
+            instructions.extend(parse_instruction(ix) for ix in part.get("setupInstructions") or [])
+            instructions.append(parse_instruction(part["swapInstruction"]))
+            if part.get("cleanupInstruction"):
+                instructions.append(parse_instruction(part["cleanupInstruction"]))
+            table_addresses.extend(a for a in part.get("addressLookupTableAddresses") or [] if a not in table_addresses)
+        instructions = self.compute_budget(compute_units) + instructions + list(extra_instructions or [])
+
+        blockhash, last_valid_block_height, slot = self.blockhash.get()
+        tables = self.lookup_tables.get_many(table_addresses, slot)
+        try:
+            message = MessageV0.try_compile(payer, instructions, tables, blockhash)
+        except Exception:
+            # A table may have been extended since it was cached: refetch once
+            self.lookup_tables.invalidate(table_addresses)
+            tables = self.lookup_tables.get_many(table_addresses, slot)
+            message = MessageV0.try_compile(payer, instructions, tables, blockhash)
+        return message, last_valid_block_height
+
+    def build(self, user_wallet: str, quote_response: dict) -> Optional[Dict[str, Any]]:
+        """
+        Same contract as `TransactionManager.get_swap` for the transaction lifecycle.
+        """
+        instructions = self.get_swap_instructions(user_wallet, quote_response)
+        if not instructions:
+            return None
+        message, last_valid_block_height = self.assemble(Pubkey.from_string(user_wallet), [instructions])
+        return {"message": message, "lastValidBlockHeight": last_valid_block_height}
+
+    @staticmethod
+    def sign(payer_keypair: Keypair, swap: Dict[str, Any]) -> VersionedTransaction:
+        return VersionedTransaction(swap["message"], [payer_keypair])
+
+    async def run(self, interval: float = BLOCKHASH_MAX_AGE_SECONDS / 2):
+        """
+        Keep the blockhash warm while local building is enabled, so builds never wait for it.
+        """
+        while True:
+            if self.enabled:
+                try:
+                    await asyncio.to_thread(self.blockhash.refresh)
+                except Exception as e:
+                    logger.warning(f"Blockhash refresh failed: {e}")
+            await asyncio.sleep(interval)
+
+
+swap_builder = SwapBuilder()
@@ -0,0 +1,252 @@
+import asyncio
+import logging
+import mmap
+import os
+import struct
+from bisect import bisect_left
+from typing import Dict, List, Optional
+from solders.pubkey import Pubkey
+from bot.transaction import http_session
+
+logger = logging.getLogger(__name__)
+
+TOKEN_LIST_URL = "https://tokens.jup.ag/tokens?tags=verified"
+INDEX_FILE = "data/tokens.idx"
+REFRESH_SECONDS = 6 * 60 * 60
+BASE58_ALPHABET = set("123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz")
+
+# File layout: header | token records (sorted by address) | key records (sorted by key) | string blob
+MAGIC = b"TIX1"
+HEADER = struct.Struct("<4sIII")      # magic, tokens, keys, etag length
+TOKEN_RECORD = struct.Struct("<32sBIHIH")  # address, decimals, symbol offset/len, name offset/len
+KEY_RECORD = struct.Struct("<IHI")    # key offset/len, token index
+
+
+def is_valid_pubkey(address: str) -> bool:
+    """
+    Real base58 public key check (32-44 chars, base58 alphabet, decodes to 32 bytes).
+    """
+    if not 32 <= len(address) <= 44 or not set(address) <= BASE58_ALPHABET:
+        return False
+    try:
+        Pubkey.from_string(address)
+        return True
+    except ValueError:
+        return False
+
+
+def build_index(tokens: List[dict], path: str, etag: str = ""):
+    """
+    Write the compact index for a token list to `path` (atomically).
+    """
+    blob = bytearray()
+    strings: Dict[str, tuple] = {}
+
+    def intern(text: str) -> tuple:
+        if text not in strings:
+            raw = text.encode("utf-8")[:0xFFFF]
+            strings[text] = (len(blob), len(raw))
+            blob.extend(raw)
+        return strings[text]
+
+    records = []
+    for token in tokens:
+        try:
+            address = bytes(Pubkey.from_string(token["address"]))
+        except (KeyError, ValueError):
+            continue
+        records.append((address, int(token.get("decimals") or 0), token.get("symbol") or "", token.get("name") or ""))
+    records.sort(key=lambda record: record[0])
+    records = [r for i, r in enumerate(records) if i == 0 or r[0] != records[i - 1][0]]
+
+    keys = set()
+    token_bytes = bytearray()
+    for index, (address, decimals, symbol, name) in enumerate(records):
+        symbol_offset, symbol_length = intern(symbol)
+        name_offset, name_length = intern(name)
+        token_bytes += TOKEN_RECORD.pack(address, decimals, symbol_offset, symbol_length, name_offset, name_length)
+        # Prefix keys: symbol, full name and each word of the name
+        for key in {symbol.lower(), name.lower(), *name.lower().split()}:
+            if key:
+                keys.add((key.encode("utf-8")[:0xFFFF], index))
+
+    key_bytes = bytearray()
+    for key, index in sorted(keys):
+        offset, length = intern(key.decode("utf-8", "ignore"))
+        key_bytes += KEY_RECORD.pack(offset, length, index)
+
+    etag_raw = etag.encode("utf-8")
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(records), len(keys), len(etag_raw)))
+        f.write(etag_raw)
+        f.write(token_bytes)
+        f.write(key_bytes)
+        f.write(blob)
+    os.replace(tmp_path, path)
+
+
+class _Keys:
+    """
+    Sequence view over the sorted key records, so `bisect` can search the mapped file directly.
+    """
+
+    def __init__(self, snapshot: "IndexSnapshot"):
+        self.snapshot = snapshot
+
+    def __len__(self):
+        return self.snapshot.key_count
+
+    def __getitem__(self, position: int) -> bytes:
+        return self.snapshot.key(position)[0]
+
+
+class IndexSnapshot:
+    """
+    One opened index file: the map and the offsets into it. Never modified after construction, so a
+    reader that took a reference keeps a consistent view while a refresh swaps in a new snapshot.
+    """
+
+    def __init__(self, mapped: mmap.mmap, token_count: int, key_count: int, etag_length: int):
+        self.mmap = mapped
+        self.token_count = token_count
+        self.key_count = key_count
+        self.etag = bytes(mapped[HEADER.size:HEADER.size + etag_length]).decode("utf-8")
+        self.tokens_at = HEADER.size + etag_length
+        self.keys_at = self.tokens_at + token_count * TOKEN_RECORD.size
+        self.strings_at = self.keys_at + key_count * KEY_RECORD.size
+
+    def string(self, offset: int, length: int) -> str:
+        start = self.strings_at + offset
+        return self.mmap[start:start + length].decode("utf-8", "ignore")
+
+    def key(self, position: int) -> tuple:
+        offset, length, token = KEY_RECORD.unpack_from(self.mmap, self.keys_at + position * KEY_RECORD.size)
+        start = self.strings_at + offset
+        return self.mmap[start:start + length], token
+
+    def token(self, position: int) -> dict:
+        address, decimals, symbol_offset, symbol_length, name_offset, name_length = TOKEN_RECORD.unpack_from(
+            self.mmap, self.tokens_at + position * TOKEN_RECORD.size
+        )
+        return {
+            "address": str(Pubkey.from_bytes(address)),
+            "decimals": decimals,
+            "symbol": self.string(symbol_offset, symbol_length),
+            "name": self.string(name_offset, name_length),
+        }
+
+    def find(self, target: bytes) -> Optional[int]:
+        low, high = 0, self.token_count
+        while low < high:
+            middle = (low + high) // 2
+            start = self.tokens_at + middle * TOKEN_RECORD.size
+            if self.mmap[start:start + 32] < target:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.token_count:
+            start = self.tokens_at + low * TOKEN_RECORD.size
+            if self.mmap[start:start + 32] == target:
+                return low
+        return None
+
+
+class TokenIndex:
+    """
+    Memory-mapped token list. Prefix search binary-searches the sorted key records (the flattened
+    form of a prefix trie over symbols and names) and exact mint lookups binary-search the
+    address-sorted token records, so neither loads the list into Python objects.
+
+    Lookups run on the event loop and in worker threads while refresh() runs in another thread, so
+    each lookup reads `_snapshot` once and a refresh replaces it with a single assignment. A replaced
+    map is not closed explicitly; it is released once the last reader drops its reference.
+    """
+
+    def __init__(self, path: str = INDEX_FILE, url: str = TOKEN_LIST_URL):
+        self.path = path
+        self.url = url
+        self._snapshot: Optional[IndexSnapshot] = None
+
+    @property
+    def etag(self) -> str:
+        snapshot = self._snapshot
+        return snapshot.etag if snapshot else ""
+
+    @property
+    def token_count(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.token_count if snapshot else 0
+
+    @property
+    def key_count(self) -> int:
+        snapshot = self._snapshot
+        return snapshot.key_count if snapshot else 0
+
+    def open(self) -> bool:
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            return False
+        with open(self.path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, token_count, key_count, etag_length = HEADER.unpack_from(mapped, 0)
+        if magic != MAGIC:
+            mapped.close()
+            return False
+        self._snapshot = IndexSnapshot(mapped, token_count, key_count, etag_length)
+        logger.info(f"Token index loaded: {token_count} tokens, {key_count} keys")
+        return True
+
+    # ----------------- Lookups -----------------
+    def get(self, address: str) -> Optional[dict]:
+        snapshot = self._snapshot
+        if snapshot is None or not is_valid_pubkey(address):
+            return None
+        position = snapshot.find(bytes(Pubkey.from_string(address)))
+        return snapshot.token(position) if position is not None else None
+
+    def search(self, query: str, limit: int = 10) -> List[dict]:
+        """
+        Tokens whose symbol, name or a name word starts with `query`; exact symbol matches first.
+        """
+        query = query.strip().lower()
+        snapshot = self._snapshot
+        if snapshot is None or not query:
+            return []
+        prefix = query.encode("utf-8")
+        position = bisect_left(_Keys(snapshot), prefix)
+        found = {}
+        while position < snapshot.key_count and len(found) < limit * 4:
+            key, token = snapshot.key(position)
+            if not key.startswith(prefix):
+                break
+            found.setdefault(token, key)
+            position += 1
+        tokens = [snapshot.token(token) for token in found]
+        tokens.sort(key=lambda t: (t["symbol"].lower() != query, len(t["symbol"])))
+        return tokens[:limit]
+
+    # ----------------- Refresh -----------------
+    def refresh(self) -> bool:
+        """
+        Download the token list only if it changed (ETag) and swap in a rebuilt index.
+        """
+        headers = {"If-None-Match": self.etag} if self.etag else {}
+        response = http_session.get(self.url, headers=headers, timeout=30)
+        if response.status_code == 304:
+            return False
+        response.raise_for_status()
+        build_index(response.json(), self.path, response.headers.get("ETag", ""))
+        return self.open()
+
+    async def run(self, refresh_seconds: float = REFRESH_SECONDS):
+        await asyncio.to_thread(self.open)
+        while True:
+            try:
+                if await asyncio.to_thread(self.refresh):
+                    logger.info(f"Token index refreshed: {self.token_count} tokens")
+            except Exception as e:
+                logger.error(f"Token index refresh failed: {e}")
+            await asyncio.sleep(refresh_seconds)
+
+
+token_index = TokenIndex()
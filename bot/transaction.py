@@ -1,102 +1,106 @@
 import base64
 import logging
 import requests
-from time import time, sleep
 from solders.keypair import Keypair
-from solana.rpc.types import TxOpts
 from typing import Any, Dict, Optional
 from solders.message import to_bytes_versioned
 from solders.transaction import VersionedTransaction
-from solders.transaction_status import TransactionConfirmationStatus
-from solana.rpc.commitment import Processed, Confirmed, Finalized
-from bot.wallet_manager import get_user_data, get_solana_client
+from bot.wallet_manager import get_user_data, get_user_setting, get_solana_client, load_settings
+from bot.tx_lifecycle import TxLifecycle, TxResult, ABORTED, MAX_RESUBMITS, SUCCESS_COMMITMENT
 from bot.utils import get_token_balance_lamports, fetch_token_decimals
 
 logger = logging.getLogger(__name__)
 SOL = "So11111111111111111111111111111111111111112"
+JUPITER_URL = "https://quote-proxy.jup.ag"
+
+_jupiter_base = None
+
+def jupiter_url(path: str) -> str:
+    """
+    Jupiter endpoint under the base URL from settings.json ("jupiter_url"), e.g. jupiter_url("quote").
+    """
+    global _jupiter_base
+    if _jupiter_base is None:
+        _jupiter_base = load_settings().get("jupiter_url", JUPITER_URL).rstrip("/")
+    return f"{_jupiter_base}/{path}"
+
+# Shared keep-alive session for Jupiter requests
+http_session = requests.Session()
+_adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=32)
+http_session.mount("https://", _adapter)
+http_session.mount("http://", _adapter)
 
 class TransactionManager:
     @staticmethod
-    def confirm_txn(txn_sig: str, timeout: int = 90, sleep_seconds: float = 2.0) -> bool:
-        client = get_solana_client()
-        try:
-            timeout_time = time() + timeout
-            while time() < timeout_time:
-                response = client.get_signature_statuses([txn_sig])
-                # print(response)
-                if response.value:  # Проверяем, что есть значение
-                    txn_status = response.value[0]  # Получаем первый статус
-                    if txn_status:  # Проверяем, что статус существует
-                        # Достаем confirmation_status
-                        confirmation_status = txn_status.confirmation_status
-                        # print(confirmation_status.Confirmed)
-                        # print(type(confirmation_status))
-                        if confirmation_status == TransactionConfirmationStatus.Finalized:
-                            return True
-                sleep(sleep_seconds)
-            return False  # Возвращаем False, если таймаут истёк
-        except Exception as e:
-            print(f"Error confirming transaction: {e}")
-            return False
+    def quote_params(input_mint: str, output_mint: str, amount: int, pub_key_str: str) -> Dict[str, Any]:
+        return {
+            'inputMint': input_mint,
+            'outputMint': output_mint,
+            'amount': amount,
+            'dynamicSlippage': 'true',
+            'swapMode': 'ExactIn',
+            'onlyDirectRoutes': 'false',
+            'asLegacyTransaction': 'false',
+            'maxAccounts': '64',
+            'minimizeSlippage': 'false',
+            'taker': pub_key_str,
+        }
 
     @staticmethod
-    def get_quote(input_mint: str, output_mint: str, amount: int, pub_key_str: str) -> Optional[Dict[str, Any]]:
+    def get_quote(input_mint: str, output_mint: str, amount: int, pub_key_str: str,
+                  user_id=None) -> Optional[Dict[str, Any]]:
+        if user_id is not None:
+            from bot.paper import paper_trading
+
+            if paper_trading.enabled(user_id):
+                return paper_trading.simulator.quote(input_mint, output_mint, amount)
         try:
-            url = "https://quote-proxy.jup.ag/quote"
-            params = {
-                'inputMint': input_mint,
-                'outputMint': output_mint,
-                'amount': amount,
-                'dynamicSlippage': 'true',
-                'swapMode': 'ExactIn',
-                'onlyDirectRoutes': 'false',
-                'asLegacyTransaction': 'false',
-                'maxAccounts': '64',
-                'minimizeSlippage': 'false',
-                'taker': pub_key_str,
-            }
+            params = TransactionManager.quote_params(input_mint, output_mint, amount, pub_key_str)
             headers = {"Accept": "application/json"}
-            response = requests.get(url, headers=headers, params=params)
+            response = http_session.get(jupiter_url("quote"), headers=headers, params=params)
             response.raise_for_status()
             return response.json()
         except requests.RequestException as e:
-            print(f"Error in get_quote: {e}")
+            logger.error(f"Error in get_quote: {e}", extra={"mint": output_mint, "stage": "quote"})
             return None
 
+    @staticmethod
+    def swap_payload(user_wallet: str, quote_response: dict) -> Dict[str, Any]:
+        return {
+            "quoteResponse": quote_response,
+            "userPublicKey": user_wallet,
+            "wrapAndUnwrapSol": True,
+            'dynamicComputeUnitLimit': True,
+            'correctLastValidBlockHeight': True,
+            'asLegacyTransaction': False,
+            'allowOptimizedWrappedSolTokenAccount': True,
+            'addConsensusAccount': False,
+            'prioritizationFeeLamports': {
+                'priorityLevelWithMaxLamports': {
+                    'maxLamports': 50000000,
+                    # 'maxLamports': 5000000,
+                    'global': False,
+                    # 'priorityLevel': 'High',
+                    'priorityLevel': 'veryHigh',
+                },
+            },
+            'blockhashSlotsToExpiry': 32,
+            'dynamicSlippage': True,
+        }
+
     @staticmethod
     def get_swap(user_wallet: str, quote_response: dict) -> Optional[Dict[str, Any]]:
         try:
-            url = "https://quote-proxy.jup.ag/swap"
             params = {
                 'swapType': 'aggregator',
             }
-            payload = {
-                "quoteResponse": quote_response,
-                "userPublicKey": user_wallet,
-                "wrapAndUnwrapSol": True,
-                'dynamicComputeUnitLimit': True,
-                'correctLastValidBlockHeight': True,
-                'asLegacyTransaction': False,
-                'allowOptimizedWrappedSolTokenAccount': True,
-                'addConsensusAccount': False,
-                'prioritizationFeeLamports': {
-                    'priorityLevelWithMaxLamports': {
-                        'maxLamports': 50000000,
-                        # 'maxLamports': 5000000,
-                        'global': False,
-                        # 'priorityLevel': 'High',
-                        'priorityLevel': 'veryHigh',
-                    },
-                },
-                'blockhashSlotsToExpiry': 32,
-                'dynamicSlippage': True,
-            }
-            response = requests.post(url, json=payload, params=params)
+            payload = TransactionManager.swap_payload(user_wallet, quote_response)
+            response = http_session.post(jupiter_url("swap"), json=payload, params=params)
             response.raise_for_status()
             # print(response.json())
             return response.json()
         except requests.RequestException as e:
-            print(f"Error in get_swap: {e}")
+            logger.error(f"Error in get_swap: {e}", extra={"stage": "swap"})
             return None
 
     # @staticmethod
@@ -128,28 +132,7 @@ class TransactionManager:
     #     txn_message.instructions.insert(1, compute_unit_price_instruction)
 
     @staticmethod
-    def swap(user_id: str, input_mint: str, output_mint: str, amount_lamports: int, slippage_bps: int):
-        client = get_solana_client()
-        user_data = get_user_data(user_id)
-        pub_key_str = user_data["solana_wallet_address"]
-        payer_keypair = Keypair.from_base58_string(user_data["private_key"])
-
-        # print("Fetching quote JupiteAPI...")
-        logger.info(f"[{user_id}] {pub_key_str} | start getting quote via JupiteAPI...")
-        quote_response = TransactionManager.get_quote(input_mint, output_mint, amount_lamports, pub_key_str)
-        if not quote_response:
-            logger.error(f"[{user_id}] {pub_key_str} | Failed get quote via JupiteAPI...")
-            return False
-
-        logger.info(f"[{user_id}] {pub_key_str} | start getting transaction via JupiteAPI...")
-        swap_transaction = TransactionManager.get_swap(pub_key_str, quote_response)
-        if not swap_transaction:
-            logger.error(f"[{user_id}] {pub_key_str} | Failed getting transaction via JupiteAPI...")
-            return False
-
-        logger.info(f'[{user_id}] {pub_key_str} | TODO SYBMOLS WHAT SWAP TO WHAT')
-
-        logger.info(f"[{user_id}] {pub_key_str} | make deserializing transaction from JupiterAPI")
+    def sign_swap_transaction(payer_keypair: Keypair, swap_transaction: Dict[str, Any]) -> VersionedTransaction:
         raw_transaction = VersionedTransaction.from_bytes(
             base64.b64decode(swap_transaction['swapTransaction'])
         )
@@ -157,58 +140,129 @@ class TransactionManager:
         # TransactionManager.add_compute_budget_instructions(raw_transaction.message)
 
         signature = payer_keypair.sign_message(to_bytes_versioned(raw_transaction.message))
-        signed_txn = VersionedTransaction.populate(raw_transaction.message, [signature])
+        return VersionedTransaction.populate(raw_transaction.message, [signature])
+
+    @staticmethod
+    def max_resubmits(user_id) -> int:
+        return int(get_user_setting(user_id, "max_resubmits", MAX_RESUBMITS))
 
-        opts = TxOpts(skip_preflight=False, preflight_commitment=Processed)
+    @staticmethod
+    def success_commitment(user_id) -> str:
+        return get_user_setting(user_id, "success_commitment", SUCCESS_COMMITMENT)
 
-        try:
-            logger.info(f"[{user_id}] {pub_key_str} | Sending transaction")
-            tx_hash = client.send_raw_transaction(
-                txn=bytes(signed_txn),
-                opts=opts).value
-
-            logger.info(f"[{user_id}] {pub_key_str} | Confirming transaction... | TxHash: {tx_hash}")
-            confirmed = TransactionManager.confirm_txn(tx_hash, timeout=90, sleep_seconds=3)
-            if confirmed :
-                logger.info(f"[{user_id}] {pub_key_str} | Success send transaction | TxHash: {tx_hash}")
-                print("Transaction confirmed:", confirmed)
-                return confirmed, tx_hash
-            else:
-                logger.error(f"[{user_id}] {pub_key_str} | Failed send transaction... | TxHash: {tx_hash}")
-                return confirmed, tx_hash
+    @staticmethod
+    def run_swap(user_id: str, payer_keypair: Keypair, input_mint: str, output_mint: str, amount: int,
+                 quote_response: Optional[dict] = None, on_status=None) -> TxResult:
+        """
+        Send a swap through the blockhash-aware lifecycle: expired attempts are re-quoted, rebuilt and
+        resubmitted up to the user's `max_resubmits` setting, and a second identical swap started while
+        the first is in flight is refused. Users in paper mode trade against the local AMM simulator.
+        """
+        from bot.paper import paper_trading
+        from bot.swap_builder import swap_builder
+
+        if paper_trading.enabled(user_id):
+            return paper_trading.swap(user_id, input_mint, output_mint, amount, quote_response, on_status)
 
+        trade = {"user": user_id, "mint": output_mint if input_mint == SOL else input_mint}
+        if swap_builder.enabled:
+            # Message compiled locally from swap-instructions, cached lookup tables and blockhash
+            swap_fn, sign_fn = swap_builder.build, swap_builder.sign
+        else:
+            swap_fn, sign_fn = TransactionManager.get_swap, TransactionManager.sign_swap_transaction
+        lifecycle = TxLifecycle(
+            rpc=get_solana_client(),
+            payer_keypair=payer_keypair,
+            input_mint=input_mint,
+            output_mint=output_mint,
+            amount=amount,
+            quote_fn=TransactionManager.get_quote,
+            swap_fn=swap_fn,
+            sign_fn=sign_fn,
+            max_resubmits=TransactionManager.max_resubmits(user_id),
+            success_commitment=TransactionManager.success_commitment(user_id),
+            quote=quote_response,
+            intent_key=f"{user_id}:{payer_keypair.pubkey()}:{input_mint}:{output_mint}:{amount}",
+            log_extra=trade,
+            on_status=on_status,
+            user_id=user_id,
+        )
+        logger.info(f"[{user_id}] {lifecycle.pub_key_str} | start swap", extra=dict(trade, stage="quote"))
+        try:
+            result = lifecycle.run()
         except Exception as e:
-            print(f"Failed to send transaction: {e}")
+            logger.error(f"[{user_id}] {lifecycle.pub_key_str} | Swap lifecycle error: {e}", extra=dict(trade, stage="send"))
+            return TxResult(ABORTED, lifecycle.attempts[-1].signature if lifecycle.attempts else None,
+                            lifecycle.attempts, str(e))
+        logger.info(f"[{user_id}] {lifecycle.pub_key_str} | Swap {result.state} after {len(result.attempts)} attempt(s)"
+                    f" | TxHash: {result.signature}", extra=dict(trade, signature=result.signature, stage="done"))
+        return result
+
+    @staticmethod
+    def outcome(result: TxResult):
+        """
+        Legacy return shape: `(landed, tx_hash)` once something was sent, otherwise False.
+        """
+        if result.signature is None:
             return False
+        return result.landed, result.signature
 
     @staticmethod
-    def buy(user_id: str, token_address: str, sol_amount: float, slippage: int = 1) -> bool:
-        amount_lamports = int(sol_amount * 1e9)
-        slippage_bps = slippage * 100  # 100 is 1%
-        return TransactionManager.swap(user_id, SOL, token_address, amount_lamports, slippage_bps)
+    def swap(user_id: str, input_mint: str, output_mint: str, amount_lamports: int, slippage_bps: int):
+        user_data = get_user_data(user_id)
+        payer_keypair = Keypair.from_base58_string(user_data["private_key"])
+        result = TransactionManager.run_swap(user_id, payer_keypair, input_mint, output_mint, amount_lamports)
+        return TransactionManager.outcome(result)
 
     @staticmethod
-    def sell(user_id: str, token_address: str, percentage: int = 100, slippage: int = 1) -> bool:
+    def execute_swap(user_id: str, payer_keypair: Keypair, quote_response: dict):
+        """
+        Build, sign, send and confirm a swap for an already fetched quote.
+        """
+        result = TransactionManager.run_swap(
+            user_id, payer_keypair, quote_response.get("inputMint"), quote_response.get("outputMint"),
+            int(quote_response.get("inAmount")), quote_response,
+        )
+        return TransactionManager.outcome(result)
+
+    @staticmethod
+    def place_buy(user_id: str, token_address: str, sol_amount: float, on_status=None) -> TxResult:
+        user_data = get_user_data(user_id)
+        payer_keypair = Keypair.from_base58_string(user_data["private_key"])
+        return TransactionManager.run_swap(user_id, payer_keypair, SOL, token_address, int(sol_amount * 1e9),
+                                           on_status=on_status)
+
+    @staticmethod
+    def place_sell(user_id: str, token_address: str, percentage: int = 100, on_status=None) -> TxResult:
         if not (1 <= percentage <= 100):
-            print("Percentage must be between 1 and 100.")
-            return False
+            logger.warning("Percentage must be between 1 and 100.")
+            return TxResult(ABORTED, error="percentage must be between 1 and 100")
 
         token_balance = get_token_balance_lamports(user_id=user_id,token_address=token_address )
         if token_balance == 0:
-            print("No token balance available to sell.")
-            return False
+            logger.warning(f"[{user_id}] No token balance available to sell.", extra={"user": user_id, "mint": token_address})
+            return TxResult(ABORTED, error="no token balance")
 
         sell_amount = int(token_balance * (percentage / 100))
-        slippage_bps = slippage * 100
+        user_data = get_user_data(user_id)
+        payer_keypair = Keypair.from_base58_string(user_data["private_key"])
+        return TransactionManager.run_swap(user_id, payer_keypair, token_address, SOL, sell_amount,
+                                           on_status=on_status)
+
+    @staticmethod
+    def buy(user_id: str, token_address: str, sol_amount: float, slippage: int = 1) -> bool:
+        return TransactionManager.outcome(TransactionManager.place_buy(user_id, token_address, sol_amount))
 
-        return TransactionManager.swap(user_id, token_address, SOL, sell_amount, slippage_bps)
+    @staticmethod
+    def sell(user_id: str, token_address: str, percentage: int = 100, slippage: int = 1) -> bool:
+        return TransactionManager.outcome(TransactionManager.place_sell(user_id, token_address, percentage))
 
     @staticmethod
     def fetch_decimals_safe(token_address: str) -> int:
         try:
             return int(fetch_token_decimals(token_address))
         except ValueError:
-            print(f"Invalid decimal value for token {token_address}, defaulting to 0.")
+            logger.warning(f"Invalid decimal value for token {token_address}, defaulting to 0.", extra={"mint": token_address})
             return 0
 
     @staticmethod
@@ -217,5 +271,5 @@ class TransactionManager:
         try:
             return estimated_amount["outAmount"] / (10 ** decimals)
         except (KeyError, TypeError) as e:
-            print(f"Error calculating output amount: {e}")
+            logger.error(f"Error calculating output amount: {e}", extra={"mint": token_address})
             return 0.0
@@ -0,0 +1,311 @@
+import json
+import logging
+import threading
+from dataclasses import dataclass, field
+from time import sleep as default_sleep, time
+from typing import Any, Callable, Dict, List, Optional
+from solders.keypair import Keypair
+from solders.signature import Signature
+from solders.transaction import VersionedTransaction
+from solders.transaction_status import TransactionConfirmationStatus
+from solana.exceptions import SolanaRpcException
+from solana.rpc.commitment import Confirmed, Processed
+from solana.rpc.types import TxOpts
+
+logger = logging.getLogger(__name__)
+
+TRANSACTIONS_FILE = "data/transactions.json"
+MAX_RESUBMITS = 2
+SUCCESS_COMMITMENT = "confirmed"
+POLL_SECONDS = 2.0
+FINALIZE_TIMEOUT_POLLS = 60  # Safety net once a transaction has landed but is not finalized yet
+UNKNOWN_EXPIRY_POLLS = 45    # Give up after ~90 s without a status when lastValidBlockHeight is unknown
+# Send errors that a rebuilt transaction can get past; anything else (funds, slippage) is final
+RETRYABLE_SEND_ERRORS = ("BlockhashNotFound", "Blockhash not found", "NodeUnhealthy", "Node is behind")
+
+# States of a transaction intent
+BUILDING = "building"
+SENT = "sent"
+LANDED = "landed"          # Reached the success commitment without error
+FAILED = "failed"          # Landed with an on-chain error (no resubmit, the chain already decided)
+EXPIRED = "expired"        # Block height passed lastValidBlockHeight without the transaction landing
+ABORTED = "aborted"        # Rejected before landing (no quote/route, preflight error), unsent after the
+                           # resubmit limit, or no status at all without a known expiry height
+DUPLICATE = "duplicate"    # The same intent is already in flight
+
+# Commitment levels in increasing order (the solders enum is not hashable)
+COMMITMENTS = [
+    TransactionConfirmationStatus.Processed,
+    TransactionConfirmationStatus.Confirmed,
+    TransactionConfirmationStatus.Finalized,
+]
+COMMITMENT_NAMES = ["processed", "confirmed", "finalized"]
+
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+_records_lock = threading.Lock()
+
+
+def record_transaction(signature: str, **fields):
+    """
+    Merge `fields` into the record of `signature` in data/transactions.json.
+    """
+    with _records_lock:
+        try:
+            with open(TRANSACTIONS_FILE, "r") as f:
+                records = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            records = {}
+        records.setdefault(signature, {}).update(fields)
+        with open(TRANSACTIONS_FILE, "w") as f:
+            json.dump(records, f, indent=4)
+
+
+@dataclass
+class Attempt:
+    signature: Optional[str]
+    last_valid_block_height: Optional[int]
+    error: Optional[str] = None
+    commitment: Optional[str] = None  # Highest commitment level seen
+    retryable: bool = False           # Unsent because of a transport or blockhash error
+
+
+@dataclass
+class TxResult:
+    state: str
+    signature: Optional[str] = None
+    attempts: List[Attempt] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def landed(self) -> bool:
+        return self.state == LANDED
+
+
+class TxLifecycle:
+    """
+    Drives one swap intent until it lands, fails on chain or runs out of resubmits.
+
+    Each attempt records the `lastValidBlockHeight` returned by Jupiter with its transaction. While
+    waiting, the signature status and the current block height are polled; the attempt is expired
+    exactly when the confirmed block height passes that limit and a final status check still finds
+    nothing. Expired attempts are re-quoted, rebuilt and resubmitted up to `max_resubmits` times.
+    An intent key guards against the same swap running twice at once.
+
+    `on_status` hears every step (building, sent, processed, confirmed, finalized, failed, expired).
+    The swap counts as landed at `success_commitment`; if that is below finalized, finalization is
+    awaited in a background thread and recorded in data/transactions.json.
+
+    The RPC client, Jupiter functions and sleep are injected so tests can drive it with a mock RPC
+    that advances block height.
+    """
+
+    def __init__(self, rpc, payer_keypair: Keypair, input_mint: str, output_mint: str, amount: int,
+                 quote_fn: Callable[..., Optional[Dict[str, Any]]],
+                 swap_fn: Callable[..., Optional[Dict[str, Any]]],
+                 sign_fn: Callable[[Keypair, Dict[str, Any]], VersionedTransaction],
+                 max_resubmits: int = MAX_RESUBMITS, success_commitment: str = SUCCESS_COMMITMENT,
+                 poll_seconds: float = POLL_SECONDS, sleep: Callable[[float], None] = default_sleep,
+                 quote: Optional[Dict[str, Any]] = None, intent_key: Optional[str] = None,
+                 log_extra: Optional[dict] = None,
+                 on_status: Optional[Callable[[str, Optional[str], int], None]] = None,
+                 user_id=None):
+        self.rpc = rpc
+        self.payer_keypair = payer_keypair
+        self.pub_key_str = str(payer_keypair.pubkey())
+        self.input_mint = input_mint
+        self.output_mint = output_mint
+        self.amount = amount
+        self.quote_fn = quote_fn
+        self.swap_fn = swap_fn
+        self.sign_fn = sign_fn
+        self.max_resubmits = max_resubmits
+        self.success_rank = COMMITMENT_NAMES.index(success_commitment)
+        self.poll_seconds = poll_seconds
+        self.sleep = sleep
+        self.quote = quote
+        self.intent_key = intent_key or f"{self.pub_key_str}:{input_mint}:{output_mint}:{amount}"
+        self.log_extra = log_extra or {}
+        self.on_status = on_status
+        self.user_id = user_id
+        self.state = BUILDING
+        self.attempts: List[Attempt] = []
+
+    def _log(self, level: int, text: str, stage: str):
+        logger.log(level, f"{self.pub_key_str} | {text}", extra=dict(self.log_extra, stage=stage))
+
+    def _notify(self, event: str, signature: Optional[str] = None):
+        """
+        Report progress: building, sent, processed, confirmed, finalized, failed or expired.
+        """
+        if self.on_status is None:
+            return
+        try:
+            self.on_status(event, signature, len(self.attempts) + (event == BUILDING))
+        except Exception as e:
+            logger.warning(f"Status callback failed: {e}")
+
+    def run(self) -> TxResult:
+        with _in_flight_lock:
+            if self.intent_key in _in_flight:
+                self._log(logging.WARNING, "same swap already in flight, refusing duplicate", "idempotency")
+                return TxResult(DUPLICATE)
+            _in_flight.add(self.intent_key)
+        try:
+            return self._run()
+        finally:
+            with _in_flight_lock:
+                _in_flight.discard(self.intent_key)
+
+    def _run(self) -> TxResult:
+        while len(self.attempts) <= self.max_resubmits:
+            self.state = BUILDING
+            self._notify(BUILDING)
+            attempt = self._submit()
+            self.attempts.append(attempt)
+            if attempt.signature is None:
+                if not attempt.retryable:
+                    result = self._result(ABORTED, attempt.error)
+                    self._record(result)
+                    return result
+                continue  # Nothing reached the chain, safe to rebuild
+
+            self.state = SENT
+            self._notify(SENT, attempt.signature)
+            outcome = self._await(attempt)
+            if outcome in (LANDED, FAILED, ABORTED):
+                result = self._result(outcome, attempt.error)
+                self._record(result)
+                if outcome == LANDED and attempt.commitment != "finalized":
+                    threading.Thread(target=self._finalize, args=(attempt.signature,), daemon=True).start()
+                return result
+            self.state = EXPIRED
+            self._notify(EXPIRED, attempt.signature)
+            self._log(logging.WARNING, f"transaction {attempt.signature} expired at block height "
+                                       f"{attempt.last_valid_block_height}", "expired")
+            self.quote = None  # Prices moved, re-quote before rebuilding
+        last_error = self.attempts[-1].error if self.attempts else None
+        result = self._result(ABORTED if self.attempts and self.attempts[-1].signature is None else EXPIRED,
+                              f"resubmit limit reached, last error: {last_error}" if last_error
+                              else "resubmit limit reached")
+        self._record(result)
+        return result
+
+    def _submit(self) -> Attempt:
+        if self.quote is None:
+            self.quote = self.quote_fn(self.input_mint, self.output_mint, self.amount, self.pub_key_str)
+            if not self.quote:
+                return Attempt(None, None, "no quote")
+        swap_transaction = self.swap_fn(self.pub_key_str, self.quote)
+        if not swap_transaction:
+            return Attempt(None, None, "no swap")
+        last_valid_block_height = swap_transaction.get("lastValidBlockHeight")
+        signed_txn = self.sign_fn(self.payer_keypair, swap_transaction)
+        try:
+            signature = self.rpc.send_raw_transaction(
+                txn=bytes(signed_txn),
+                opts=TxOpts(skip_preflight=False, preflight_commitment=Processed),
+            ).value
+        except Exception as e:
+            retryable = isinstance(e, SolanaRpcException) or any(text in str(e) for text in RETRYABLE_SEND_ERRORS)
+            self._log(logging.ERROR, f"send failed{' (retrying)' if retryable else ''}: {e}", "send")
+            self.quote = None
+            error = e.error_msg if isinstance(e, SolanaRpcException) else str(e)
+            return Attempt(None, last_valid_block_height, error, retryable=retryable)
+        self._log(logging.INFO, f"sent attempt {len(self.attempts) + 1} | TxHash: {signature} | "
+                                f"lastValidBlockHeight {last_valid_block_height}", "send")
+        return Attempt(str(signature), last_valid_block_height)
+
+    def status(self, signature: str, search_history: bool = False):
+        response = self.rpc.get_signature_statuses([Signature.from_string(signature)],
+                                                   search_transaction_history=search_history)
+        return response.value[0] if response.value else None
+
+    def _await(self, attempt: Attempt) -> str:
+        landed_polls, unknown_polls, reported_rank = 0, 0, -1
+        while True:
+            status = self.status(attempt.signature)
+            if status is None and attempt.last_valid_block_height is not None:
+                block_height = self.rpc.get_block_height(commitment=Confirmed).value
+                if block_height > attempt.last_valid_block_height:
+                    # Last look with history search: a late status means it landed after all
+                    status = self.status(attempt.signature, search_history=True)
+                    if status is None:
+                        return EXPIRED
+            if status is not None:
+                if status.err is not None:
+                    attempt.error = str(status.err)
+                    self._log(logging.ERROR, f"transaction {attempt.signature} failed on chain: {status.err}", "failed")
+                    self._notify(FAILED, attempt.signature)
+                    return FAILED
+                reached = status.confirmation_status
+                rank = COMMITMENTS.index(reached) if reached is not None else 0
+                if rank > reported_rank:
+                    reported_rank = rank
+                    attempt.commitment = COMMITMENT_NAMES[rank]
+                    self._notify(COMMITMENT_NAMES[rank], attempt.signature)
+                if rank >= self.success_rank:
+                    self._log(logging.INFO, f"transaction {attempt.signature} landed ({COMMITMENT_NAMES[rank]})", "landed")
+                    return LANDED
+                landed_polls += 1
+                if landed_polls > FINALIZE_TIMEOUT_POLLS:
+                    # Landed and not failing, but the requested commitment was never reached
+                    attempt.error = (f"landed at {COMMITMENT_NAMES[reported_rank]}, requested "
+                                     f"{COMMITMENT_NAMES[self.success_rank]} not reached")
+                    self._log(logging.WARNING, f"transaction {attempt.signature}: {attempt.error}", "landed")
+                    return ABORTED
+            elif attempt.last_valid_block_height is None:
+                # Without an expiry height there is no safe point to resubmit, stop waiting instead
+                unknown_polls += 1
+                if unknown_polls > UNKNOWN_EXPIRY_POLLS:
+                    attempt.error = f"no status after {UNKNOWN_EXPIRY_POLLS * self.poll_seconds:.0f} s"
+                    self._log(logging.WARNING, f"transaction {attempt.signature}: {attempt.error}", "expired")
+                    return ABORTED
+            self.sleep(self.poll_seconds)
+
+    def _finalize(self, signature: str):
+        """
+        Background follow-up of a transaction accepted below finalized: record when it finalizes.
+        """
+        try:
+            finalized = False
+            for _ in range(FINALIZE_TIMEOUT_POLLS):
+                self.sleep(self.poll_seconds)
+                status = self.status(signature)
+                if status is not None and status.confirmation_status == TransactionConfirmationStatus.Finalized:
+                    finalized = True
+                    break  # Recorded and reported exactly once below
+            if not finalized:
+                self._log(logging.WARNING, f"transaction {signature} not finalized after "
+                                           f"{FINALIZE_TIMEOUT_POLLS * self.poll_seconds:.0f} s", "finalized")
+                return
+            record_transaction(signature, commitment="finalized", finalized_at=time())
+            self._log(logging.INFO, f"transaction {signature} finalized", "finalized")
+            self._notify("finalized", signature)
+        except Exception as e:
+            self._log(logging.ERROR, f"finalization tracking failed for {signature}: {e}", "finalized")
+
+    def _record(self, result: TxResult):
+        if result.signature is None:
+            return
+        try:
+            record_transaction(
+                result.signature,
+                user=self.user_id,
+                wallet=self.pub_key_str,
+                input_mint=self.input_mint,
+                output_mint=self.output_mint,
+                amount=self.amount,
+                state=result.state,
+                commitment=result.attempts[-1].commitment,
+                error=result.error,
+                attempts=[a.signature for a in result.attempts if a.signature],
+                recorded_at=time(),
+            )
+        except OSError as e:
+            self._log(logging.ERROR, f"failed to record transaction {result.signature}: {e}", "record")
+
+    def _result(self, state: str, error: Optional[str] = None) -> TxResult:
+        self.state = state
+        signature = next((a.signature for a in reversed(self.attempts) if a.signature), None)
+        return TxResult(state, signature, self.attempts, error)
@@ -1,10 +1,14 @@
 from solders.pubkey import Pubkey
 from bot.wallet_manager import get_solana_client, get_user_data
+from bot.balance_cache import balance_manager
 from solders.token.associated import get_associated_token_address
 from solders.rpc.errors import InvalidParamsMessage
-from loguru import logger
+import logging
 import requests
 import json
+from typing import Optional
+
+logger = logging.getLogger(__name__)
 
 def fetch_token_decimals(token_address: str) -> int:
     client = get_solana_client()
@@ -30,10 +34,24 @@ def get_token_balance_lamports(user_id: int, token_address: str) -> int:
         int: Token balance in lamports.
 
     """
+    from bot.paper import paper_trading
+
+    if paper_trading.enabled(user_id):
+        return paper_trading.token_balance(user_id, token_address)
+
+    cached = balance_manager.get_token_balance(user_id, token_address)
+    if cached is not None:
+        return cached
 
     user_data = get_user_data(user_id)
-    pub_key_str = user_data["solana_wallet_address"]
+    return get_wallet_token_balance_lamports(user_data["solana_wallet_address"], token_address, user_id=user_id)
 
+
+def get_wallet_token_balance_lamports(pub_key_str: str, token_address: str, user_id: Optional[int] = None) -> int:
+    """
+    Get token balance in lamports of any wallet. When `user_id` is given the token
+    account is tracked by the balance cache for that user.
+    """
     client = get_solana_client()
     try:
         token_program_id = (client.get_account_info(Pubkey.from_string(token_address))).value.owner
@@ -44,10 +62,14 @@ def get_token_balance_lamports(user_id: int, token_address: str) -> int:
         )
         response = client.get_token_account_balance(associated_token)
         if isinstance(response, InvalidParamsMessage):
-            return 0
-        return int(response.value.amount)
+            amount = 0
+        else:
+            amount = int(response.value.amount)
+        if user_id is not None:
+            balance_manager.track_token_account(user_id, token_address, str(associated_token), amount)
+        return amount
     except Exception as e:
-        print(f"Unknown error check fun get_token_balance_lamports : {e}")
+        logger.error(f"Unknown error check fun get_token_balance_lamports : {e}", extra={"mint": token_address})
         return 0
 
 
@@ -89,6 +111,17 @@ def get_token_price_from_coingecko(token: str) -> float:
 
 
 def get_sol_balance(user_id: int) -> int:
+    from bot.paper import paper_trading
+
+    if paper_trading.enabled(user_id):
+        return paper_trading.sol_balance(user_id)
+
+    cached = balance_manager.get_sol_balance(user_id)
+    if cached is not None:
+        return cached
+
     user_data = get_user_data(user_id)
     client = get_solana_client()
-    return (client.get_account_info(Pubkey.from_string(user_data["solana_wallet_address"]))).value.lamports
+    lamports = (client.get_account_info(Pubkey.from_string(user_data["solana_wallet_address"]))).value.lamports
+    balance_manager.track_wallet(user_id, user_data["solana_wallet_address"], lamports)
+    return lamports
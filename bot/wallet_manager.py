@@ -1,10 +1,13 @@
 import json
 import logging
+import os
+import threading
 from solders.pubkey import Pubkey
 from solana.rpc.api import Client
 from solders.keypair import Keypair
 from spl.token.constants import TOKEN_PROGRAM_ID
 from spl.token.instructions import get_associated_token_address
+from bot.balance_cache import balance_manager
 
 logger = logging.getLogger(__name__)
 
@@ -12,6 +15,15 @@ USERS_FILE = "data/users.json"
 BALANCES_FILE = "data/balances.json"
 SETTINGS_FILE = "data/settings.json"
 
+# Serializes read-modify-write cycles of users.json; readers never see a partial file (os.replace)
+_users_lock = threading.Lock()
+
+
+def _write_users(users: dict):
+    tmp_path = USERS_FILE + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(users, f, indent=4)
+    os.replace(tmp_path, USERS_FILE)
 
 # Generate a private key and public address
 def generate_private_key():
@@ -32,21 +44,24 @@ def save_user_data(user_id, private_key, public_key):
     :param private_key: Private key in Base58 format
     :param public_key: Public key as a string
     """
-    try:
-        with open(USERS_FILE, "r") as f:
-            users = json.load(f)
-    except (FileNotFoundError, json.JSONDecodeError):
-        users = {}
+    with _users_lock:
+        try:
+            with open(USERS_FILE, "r") as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            users = {}
 
-    # Обновляем или создаем запись для пользователя
-    users[str(user_id)] = {
-        "private_key": str(private_key),
-        "solana_wallet_address": str(public_key),
-    }
+        # Обновляем или создаем запись для пользователя, сохраняя группу кошельков и настройки
+        existing = users.get(str(user_id), {})
+        users[str(user_id)] = {
+            "private_key": str(private_key),
+            "solana_wallet_address": str(public_key),
+            "wallets": existing.get("wallets", []),
+            "settings": existing.get("settings", {}),
+        }
 
-    # Сохраняем обновленные данные в файл
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=4)
+        # Сохраняем обновленные данные в файл
+        _write_users(users)
 
 # Get user data from users.json
 def get_user_data(user_id: int) -> dict:
@@ -62,6 +77,96 @@ def get_user_data(user_id: int) -> dict:
     except FileNotFoundError:
         return {}
 
+# Per-user trading settings stored next to the wallet
+def get_user_setting(user_id: int, name: str, default=None):
+    """
+    Read one setting of a user, `default` if it was never set.
+    """
+    return get_user_data(user_id).get("settings", {}).get(name, default)
+
+def set_user_setting(user_id: int, name: str, value) -> bool:
+    """
+    Store one setting of a user.
+    :return: False if the user has no wallet yet.
+    """
+    with _users_lock:
+        try:
+            with open(USERS_FILE, "r") as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        user = users.get(str(user_id))
+        if not user:
+            return False
+        user.setdefault("settings", {})[name] = value
+        _write_users(users)
+        return True
+
+# Wallet group: the main wallet plus extra wallets used for multi-wallet buys and sells
+def get_user_wallets(user_id: int) -> list:
+    """
+    All wallets of a user, main wallet first.
+    :param user_id: Telegram user ID
+    :return: List of dicts with private_key and solana_wallet_address.
+    """
+    user_data = get_user_data(user_id)
+    if not user_data:
+        return []
+    wallets = [{
+        "private_key": user_data["private_key"],
+        "solana_wallet_address": user_data["solana_wallet_address"],
+    }]
+    wallets.extend(user_data.get("wallets", []))
+    return wallets
+
+def add_user_wallet(user_id: int, private_key, public_key) -> bool:
+    """
+    Add an extra wallet to the user's group.
+    :return: False if the user has no main wallet or the wallet is already in the group.
+    """
+    with _users_lock:
+        try:
+            with open(USERS_FILE, "r") as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        user = users.get(str(user_id))
+        if not user:
+            return False
+        addresses = {user["solana_wallet_address"]} | {w["solana_wallet_address"] for w in user.get("wallets", [])}
+        if str(public_key) in addresses:
+            return False
+        user.setdefault("wallets", []).append({
+            "private_key": str(private_key),
+            "solana_wallet_address": str(public_key),
+        })
+        _write_users(users)
+        return True
+
+def remove_user_wallet(user_id: int, public_key: str) -> bool:
+    """
+    Remove an extra wallet from the user's group (the main wallet can't be removed).
+    """
+    with _users_lock:
+        try:
+            with open(USERS_FILE, "r") as f:
+                users = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        user = users.get(str(user_id))
+        if not user:
+            return False
+        wallets = user.get("wallets", [])
+        remaining = [w for w in wallets if w["solana_wallet_address"] != public_key]
+        if len(remaining) == len(wallets):
+            return False
+        user["wallets"] = remaining
+        _write_users(users)
+        return True
+
 # Check if a user exists in users.json
 def user_exists(user_id: int) -> bool:
     """
@@ -73,11 +178,21 @@ def user_exists(user_id: int) -> bool:
     return bool(user_data)
 
 
-# Load Solana RPC URL
-def get_solana_client():
+# Load settings.json
+def load_settings() -> dict:
     with open(SETTINGS_FILE, "r") as f:
-        settings = json.load(f)
-    return Client(endpoint=settings["solana_rpc_url"])
+        return json.load(f)
+
+# Load Solana RPC URL, one pooled client per endpoint
+_clients = {}
+
+def get_solana_client():
+    settings = load_settings()
+    endpoint = settings["solana_rpc_url"]
+    client = _clients.get(endpoint)
+    if client is None:
+        client = _clients[endpoint] = Client(endpoint=endpoint)
+    return client
 
 # Initialize balances for a user
 def initialize_user_balances(user_id: int, public_key: str):
@@ -147,9 +262,17 @@ def update_user_balances(user_id: int, wallet_address: str):
     user_balances = balances.get(str(user_id), {}).get("tokens", [])
     for token in user_balances:
         if token["ticker"] == "SOL":
-            # Update SOL balance
-            token["balance"] = get_sol_balance(wallet_address)
+            # Update SOL balance (memory read when the wallet is subscribed)
+            cached = balance_manager.get_sol_balance(user_id)
+            if cached is None:
+                cached = get_sol_balance(wallet_address)
+                balance_manager.track_wallet(user_id, wallet_address, cached)
+            token["balance"] = cached
         else:
+            cached = balance_manager.get_token_balance(user_id, token["contract_address"])
+            if cached is not None:
+                token["balance"] = cached
+                continue
             # Get associated token address
             associated_token_address = get_associated_token_address(
                 owner=Pubkey.from_string(wallet_address),
@@ -159,6 +282,9 @@ def update_user_balances(user_id: int, wallet_address: str):
                 token_info = client.get_token_account_balance(associated_token_address)
                 if hasattr(token_info, "value") and token_info.value is not None:
                     token["balance"] = int(token_info.value.amount)  # Store as raw lamports
+                    balance_manager.track_token_account(
+                        user_id, token["contract_address"], str(associated_token_address), token["balance"]
+                    )
                 else:
                     logger.warning(f"No balance data for {token['ticker']}.")
                 token["associated_token_address"] = str(associated_token_address)
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+import traceback
+from collections import Counter
+from datetime import datetime, timezone
+from time import monotonic, sleep
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+REPORT_FILE = "logs/watchdog.jsonl"
+THRESHOLD_SECONDS = 0.25
+HEARTBEAT_SECONDS = 0.1
+SAMPLE_SECONDS = 0.005
+STACK_DEPTH = 40
+SUMMARY_SECONDS = 300
+
+
+class LoopWatchdog:
+    """
+    Measures event-loop lag with a heartbeat task; a helper thread notices when the heartbeat is
+    overdue by more than `threshold` and captures the loop thread's stack while it is still blocked,
+    together with the task and Telegram update that were running. With `profile` enabled the stack
+    is sampled every `sample_interval` for the whole stall and reported as collapsed stacks.
+    """
+
+    def __init__(self, threshold: float = THRESHOLD_SECONDS, interval: float = HEARTBEAT_SECONDS,
+                 profile: bool = False, sample_interval: float = SAMPLE_SECONDS, report_path: str = REPORT_FILE):
+        self.threshold = threshold
+        self.interval = interval
+        self.profile = profile
+        self.sample_interval = sample_interval
+        self.report_path = report_path
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._beat = monotonic()
+        self._running = False
+        self._updates: Dict[asyncio.Task, dict] = {}
+        self.max_lag = 0.0
+        self.stalls = 0
+
+    def start(self) -> asyncio.Task:
+        self.loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._beat = monotonic()
+        self._running = True
+        threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True).start()
+        return asyncio.create_task(self._heartbeat())
+
+    def stop(self):
+        self._running = False
+
+    # ----------------- Loop side -----------------
+    async def _heartbeat(self):
+        summary_at = monotonic() + SUMMARY_SECONDS
+        while self._running:
+            before = monotonic()
+            await asyncio.sleep(self.interval)
+            self._beat = monotonic()
+            self.max_lag = max(self.max_lag, self._beat - before - self.interval)
+            if self._beat >= summary_at:
+                if self.stalls:
+                    logger.info(f"Event loop: {self.stalls} stalls over {self.threshold * 1000:.0f} ms, "
+                                f"max lag {self.max_lag * 1000:.0f} ms in the last {SUMMARY_SECONDS} s")
+                self.stalls, self.max_lag = 0, 0.0
+                summary_at = self._beat + SUMMARY_SECONDS
+
+    def track_update(self, info: dict):
+        task = asyncio.current_task()
+        if task is not None:
+            self._updates[task] = info
+
+    def untrack_update(self):
+        self._updates.pop(asyncio.current_task(), None)
+
+    # ----------------- Helper thread -----------------
+    def _monitor(self):
+        while self._running:
+            sleep(self.interval / 2)
+            beat = self._beat
+            overdue = monotonic() - beat - self.interval
+            if overdue > self.threshold:
+                try:
+                    self._capture_stall(beat)
+                except Exception as e:
+                    logger.error(f"Watchdog capture failed: {e}")
+
+    def _loop_stack(self) -> List[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return [f"{os.path.relpath(f.filename)}:{f.lineno} {f.name}"
+                for f in traceback.extract_stack(frame)[-STACK_DEPTH:]]
+
+    def _running_task(self) -> Optional[asyncio.Task]:
+        # Read-only peek at asyncio's per-loop current task table (a plain dict, safe under the GIL)
+        return asyncio.tasks._current_tasks.get(self.loop)
+
+    def _capture_stall(self, beat: float):
+        stalled_since = beat + self.interval
+        task = self._running_task()
+        update = self._updates.get(task) if task is not None else None
+        stack = self._loop_stack()
+        samples = Counter()
+        while self._running and self._beat == beat:
+            if self.profile:
+                sampled = self._loop_stack()
+                if sampled:
+                    samples[";".join(frame.split(" ", 1)[1] for frame in sampled)] += 1
+                sleep(self.sample_interval)
+            else:
+                sleep(self.interval / 2)
+        duration = monotonic() - stalled_since
+        self.stalls += 1
+
+        task_name = None
+        if task is not None:
+            coro = task.get_coro()
+            task_name = f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+        report = {
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "duration_ms": round(duration * 1000, 1),
+            "task": task_name,
+            "update": update,
+            "stack": stack,
+        }
+        if samples:
+            report["profile"] = dict(samples.most_common())
+        where = stack[-1] if stack else "unknown"
+        context = f"update {update['update_id']} ({update.get('event')})" if update else task_name
+        logger.warning(f"Event loop blocked {report['duration_ms']:.0f} ms in {where} during {context}")
+        self._write(report)
+
+    def _write(self, report: dict):
+        os.makedirs(os.path.dirname(self.report_path) or ".", exist_ok=True)
+        with open(self.report_path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(report, ensure_ascii=False) + "\n")
+
+
+def command_name(text: Optional[str]) -> Optional[str]:
+    """
+    Only the command itself goes into reports: free text and arguments can carry private keys.
+    """
+    if not text or not text.startswith("/"):
+        return None
+    return text.split(maxsplit=1)[0].split("@", 1)[0]
+
+
+class WatchdogMiddleware:
+    """
+    Outer update middleware that tells the watchdog which update the current task is handling.
+    """
+
+    def __init__(self, watchdog: LoopWatchdog):
+        self.watchdog = watchdog
+
+    async def __call__(self, handler, event, data):
+        user = data.get("event_from_user")
+        event_type = getattr(event, "event_type", None)
+        inner = getattr(event, event_type, None) if event_type else None
+        text = getattr(inner, "text", None)
+        self.watchdog.track_update({
+            "update_id": getattr(event, "update_id", None),
+            "event": event_type,
+            "user": user.id if user else None,
+            "command": command_name(text),
+        })
+        try:
+            return await handler(event, data)
+        finally:
+            self.watchdog.untrack_update()
@@ -0,0 +1,111 @@
+"""
+Load test the bot end to end against local stand-ins for Telegram, Solana RPC and Jupiter:
+
+    python -m loadtest --users 50 --iterations 2 --rpc-latency 0.05 --jupiter-latency 0.1
+
+The real bot (main.py) runs as a subprocess in a temporary working directory whose settings
+point at the mock servers; its logs stay in that directory for inspection.
+"""
+import argparse
+import asyncio
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+from solders.keypair import Keypair
+from loadtest.driver import LoadDriver
+from loadtest.mocks import MockBehaviour, MockJupiter, MockRpc, MockTelegram, stats_lines
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_USER_ID = 100_000
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m loadtest", description="End-to-end load test with mock servers")
+    parser.add_argument("--users", type=int, default=10)
+    parser.add_argument("--iterations", type=int, default=1, help="Buy+sell rounds per user")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Pause between steps, seconds")
+    parser.add_argument("--step-timeout", type=float, default=120.0)
+    for name, latency in (("telegram", 0.02), ("rpc", 0.05), ("jupiter", 0.1)):
+        parser.add_argument(f"--{name}-latency", type=float, default=latency, help="Mean response latency, seconds")
+        parser.add_argument(f"--{name}-error-rate", type=float, default=0.0, help="Share of failing requests")
+    parser.add_argument("--telegram-rate-limit", type=float, default=1.0, help="Requests per second per chat")
+    parser.add_argument("--rpc-rate-limit", type=float, default=None, help="Requests per second")
+    parser.add_argument("--jupiter-rate-limit", type=float, default=None, help="Requests per second")
+    parser.add_argument("--land-delay", type=float, default=0.4, help="Seconds until a sent transaction is processed")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="Share of transactions that never land")
+    parser.add_argument("--watchdog", action="store_true", help="Enable the event-loop watchdog in the bot")
+    parser.add_argument("--paper", action="store_true", help="Trade against the bot's paper-trading simulator")
+    parser.add_argument("--paper-latency", type=float, default=0.4, help="Simulated swap latency, seconds")
+    return parser.parse_args()
+
+
+def write_workdir(workdir: str, args, telegram: MockTelegram, rpc: MockRpc, jupiter: MockJupiter,
+                  user_ids: list):
+    os.makedirs(os.path.join(workdir, "data"), exist_ok=True)
+    settings = {
+        "telegram_token": "123456:LOADTEST",
+        "telegram_api_url": telegram.url,
+        "allowed_users": user_ids,
+        "solana_rpc_url": rpc.url,
+        "solana_ws_url": rpc.url.replace("http", "ws", 1) + "/ws",
+        "jupiter_url": jupiter.url,
+        "token_list_url": jupiter.url + "/tokens",
+        "watchdog": {"enabled": args.watchdog},
+        "paper_trading": {"latency_ms": args.paper_latency * 1000, "market_prices": False},
+    }
+    users = {}
+    for user_id in user_ids:
+        keypair = Keypair()
+        users[str(user_id)] = {"private_key": str(keypair), "solana_wallet_address": str(keypair.pubkey()),
+                               "wallets": [], "settings": {"paper_trading": args.paper}}
+    with open(os.path.join(workdir, "data", "settings.json"), "w") as f:
+        json.dump(settings, f, indent=4)
+    with open(os.path.join(workdir, "data", "users.json"), "w") as f:
+        json.dump(users, f, indent=4)
+
+
+async def main(args) -> int:
+    token = str(Keypair().pubkey())
+    telegram = MockTelegram(MockBehaviour(args.telegram_latency, args.telegram_error_rate, args.telegram_rate_limit))
+    rpc = MockRpc(MockBehaviour(args.rpc_latency, args.rpc_error_rate, args.rpc_rate_limit), mints={token: 6},
+                  land_delay=args.land_delay, drop_rate=args.drop_rate)
+    jupiter = MockJupiter(MockBehaviour(args.jupiter_latency, args.jupiter_error_rate, args.jupiter_rate_limit), rpc)
+    for server in (telegram, rpc, jupiter):
+        await server.start()
+
+    user_ids = [FIRST_USER_ID + i for i in range(args.users)]
+    workdir = tempfile.mkdtemp(prefix="bot-loadtest-")
+    write_workdir(workdir, args, telegram, rpc, jupiter, user_ids)
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    with open(os.path.join(workdir, "bot.out"), "w") as out:
+        bot = subprocess.Popen([sys.executable, os.path.join(REPO_ROOT, "main.py")], cwd=workdir, env=env,
+                               stdout=out, stderr=subprocess.STDOUT)
+    try:
+        try:
+            await asyncio.wait_for(telegram.polling.wait(), timeout=120)
+        except asyncio.TimeoutError:
+            print(f"Bot did not start polling, see {workdir}/bot.out")
+            return 1
+        print(f"Bot is polling, running {args.users} users x {args.iterations} iteration(s)...")
+        driver = LoadDriver(telegram, user_ids, token, args.iterations, args.step_timeout, args.think_time)
+        await driver.run()
+        print(driver.report())
+        print("\nMock servers:")
+        print("\n".join(stats_lines({"telegram": telegram, "rpc": rpc, "jupiter": jupiter})))
+        print(f"\nBot logs: {workdir}")
+        return 0
+    finally:
+        bot.send_signal(signal.SIGINT)
+        try:
+            bot.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            bot.kill()
+        for server in (telegram, rpc, jupiter):
+            await server.stop()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
@@ -0,0 +1,125 @@
+import asyncio
+import random
+from collections import defaultdict
+from dataclasses import dataclass
+from time import monotonic
+from typing import Dict, List, Tuple
+from loadtest.mocks import MockTelegram
+
+TOKEN = "{token}"
+CONFIRM = "Confirm and send transaction"
+FAILURE_MARKERS = ("❌", "⌛", "error occurred", "Invalid", "Failed", "Please enter a valid",
+                   "not authorized", "don't have", "No token balance", "incomplete")
+
+
+@dataclass
+class Step:
+    name: str
+    text: str
+    expect: str  # Substring of the bot message that completes the step
+    ignore: Tuple[str, ...] = ()  # Failure markers that are only informational for this step
+
+
+BUY_FLOW = [
+    Step("buy.menu", "Buy", "Please enter the token address"),
+    Step("buy.token", TOKEN, "Token address saved", ignore=("don't have",)),
+    Step("buy.amount", "0.01", "'Confirm' to proceed"),
+    Step("buy.confirm", CONFIRM, "successfully sent"),
+]
+SELL_FLOW = [
+    Step("sell.menu", "Sell", "you want to sell"),
+    Step("sell.token", TOKEN, "Token address saved"),
+    Step("sell.percent", "50", "'Confirm' to proceed"),
+    Step("sell.confirm", CONFIRM, "successfully sent"),
+]
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[int(round(q * (len(ordered) - 1)))] if ordered else 0.0
+
+
+class LoadDriver:
+    """
+    Simulates `users` Telegram users walking the Buy and Sell flows against the bot through the
+    mock Bot API, timing each step from the pushed update to the bot message that completes it.
+    """
+
+    def __init__(self, telegram: MockTelegram, user_ids: List[int], token: str, iterations: int = 1,
+                 step_timeout: float = 120.0, think_time: float = 0.0):
+        self.telegram = telegram
+        self.user_ids = user_ids
+        self.token = token
+        self.iterations = iterations
+        self.step_timeout = step_timeout
+        self.think_time = think_time
+        self._waiting: Dict[int, Tuple[Step, asyncio.Future]] = {}
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.outcomes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.flows_completed = 0
+        self.duration = 0.0
+        telegram.on_outgoing = self.on_outgoing
+
+    def on_outgoing(self, chat_id: int, text: str, message_id: int):
+        waiting = self._waiting.get(chat_id)
+        if waiting is None:
+            return
+        step, future = waiting
+        if future.done():
+            return
+        if step.expect in text:
+            future.set_result(True)
+        elif any(marker in text for marker in FAILURE_MARKERS if marker not in step.ignore):
+            future.set_result(False)
+
+    async def run_step(self, user_id: int, step: Step) -> bool:
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[user_id] = (step, future)
+        started = monotonic()
+        self.telegram.push_message(user_id, step.text.format(token=self.token))
+        try:
+            ok = await asyncio.wait_for(future, timeout=self.step_timeout)
+            outcome = "ok" if ok else "failed"
+        except asyncio.TimeoutError:
+            ok, outcome = False, "timeout"
+        finally:
+            self._waiting.pop(user_id, None)
+        self.latencies[step.name].append(monotonic() - started)
+        self.outcomes[step.name][outcome] += 1
+        return ok
+
+    async def run_user(self, user_id: int):
+        await asyncio.sleep(random.uniform(0, 1))  # Spread the first updates
+        for _ in range(self.iterations):
+            for flow in (BUY_FLOW, SELL_FLOW):
+                for step in flow:
+                    if not await self.run_step(user_id, step):
+                        self.telegram.push_message(user_id, "Back")  # Reset the FSM before the next flow
+                        await asyncio.sleep(1)
+                        break
+                    if self.think_time:
+                        await asyncio.sleep(self.think_time)
+                else:
+                    self.flows_completed += 1
+
+    async def run(self):
+        started = monotonic()
+        await asyncio.gather(*(self.run_user(user_id) for user_id in self.user_ids))
+        self.duration = monotonic() - started
+
+    def report(self) -> str:
+        lines = [f"{'step':<14}{'count':>7}{'ok':>6}{'fail':>6}{'t/o':>6}"
+                 f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'max ms':>9}"]
+        for flow in (BUY_FLOW, SELL_FLOW):
+            for step in flow:
+                values = self.latencies.get(step.name, [])
+                outcomes = self.outcomes[step.name]
+                lines.append(
+                    f"{step.name:<14}{len(values):>7}{outcomes['ok']:>6}{outcomes['failed']:>6}{outcomes['timeout']:>6}"
+                    + "".join(f"{percentile(values, q) * 1000:>9.0f}" for q in (0.5, 0.9, 0.99, 1.0))
+                )
+        steps = sum(len(values) for values in self.latencies.values())
+        lines.append(f"\n{len(self.user_ids)} users, {self.flows_completed} flows completed in {self.duration:.1f} s: "
+                     f"{self.flows_completed / self.duration if self.duration else 0:.2f} flows/s, "
+                     f"{steps / self.duration if self.duration else 0:.2f} steps/s")
+        return "\n".join(lines)
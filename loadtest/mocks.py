@@ -0,0 +1,386 @@
+import asyncio
+import base64
+import json
+import random
+import struct
+from collections import Counter, deque
+from dataclasses import dataclass
+from time import monotonic, time
+from typing import Callable, Dict, List, Optional
+from aiohttp import web, WSMsgType
+from solders.hash import Hash
+from solders.instruction import Instruction
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+from solders.signature import Signature
+from solders.transaction import VersionedTransaction
+
+TOKEN_PROGRAM = "TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA"
+SYSTEM_PROGRAM = "11111111111111111111111111111111"
+MEMO_PROGRAM = Pubkey.from_string("MemoSq4gqABAXKb1qn5Xu5rH5JvmEA3WZJZbkV3GvnT")
+
+
+@dataclass
+class MockBehaviour:
+    """
+    Latency (seconds, jittered ±50%), share of failing requests and request rate limit (per second).
+    """
+    latency: float = 0.0
+    error_rate: float = 0.0
+    rate_limit: Optional[float] = None
+
+
+class RateLimiter:
+    def __init__(self, rate: Optional[float], burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst or rate or 0
+        self.tokens = self.capacity
+        self.updated = monotonic()
+
+    def allow(self) -> bool:
+        if not self.rate:
+            return True
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+
+class MockServer:
+    def __init__(self, behaviour: MockBehaviour):
+        self.behaviour = behaviour
+        self.limiter = RateLimiter(behaviour.rate_limit)
+        self.stats = Counter()
+        self.runner: Optional[web.AppRunner] = None
+        self.url = ""
+
+    def app(self) -> web.Application:
+        raise NotImplementedError
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self.runner = web.AppRunner(self.app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self):
+        if self.runner is not None:
+            await self.runner.cleanup()
+
+    async def delay(self):
+        if self.behaviour.latency:
+            await asyncio.sleep(self.behaviour.latency * random.uniform(0.5, 1.5))
+
+    def should_fail(self) -> bool:
+        return random.random() < self.behaviour.error_rate
+
+
+# ----------------- Telegram Bot API -----------------
+class MockTelegram(MockServer):
+    """
+    Bot API stand-in: updates are pushed by the driver and served through getUpdates; outgoing
+    sendMessage/editMessageText calls are reported to `on_outgoing(chat_id, text, message_id)`.
+    The rate limit applies per chat and is answered with 429 and retry_after like Telegram.
+    """
+
+    def __init__(self, behaviour: MockBehaviour, on_outgoing: Optional[Callable[[int, str, int], None]] = None):
+        super().__init__(behaviour)
+        self.on_outgoing = on_outgoing
+        self._updates: deque = deque()
+        self._update_id = 0
+        self._message_id = 0
+        self._new_updates = asyncio.Event()
+        self._chat_limiters: Dict[int, RateLimiter] = {}
+        self.polling = asyncio.Event()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/bot{token}/{method}", self.handle)
+        return app
+
+    def push_message(self, user_id: int, text: str):
+        self._update_id += 1
+        self._message_id += 1
+        self._updates.append({
+            "update_id": self._update_id,
+            "message": {
+                "message_id": self._message_id,
+                "date": int(time()),
+                "chat": {"id": user_id, "type": "private"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"load{user_id}"},
+                "text": text,
+            },
+        })
+        self._new_updates.set()
+
+    def message(self, chat_id: int, text: str, message_id: Optional[int] = None) -> dict:
+        if message_id is None:
+            self._message_id += 1
+            message_id = self._message_id
+        return {
+            "message_id": message_id,
+            "date": int(time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": {"id": 1, "is_bot": True, "first_name": "bot"},
+            "text": text,
+        }
+
+    async def get_updates(self, params: dict) -> list:
+        offset = int(params.get("offset") or 0)
+        while self._updates and self._updates[0]["update_id"] < offset:
+            self._updates.popleft()
+        if not self._updates:
+            self._new_updates.clear()
+            self.polling.set()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=min(float(params.get("timeout") or 0), 5))
+            except asyncio.TimeoutError:
+                pass
+        return list(self._updates)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = dict(await request.post()) if request.content_type != "application/json" else await request.json()
+        self.stats[method] += 1
+        if method == "getUpdates":
+            return web.json_response({"ok": True, "result": await self.get_updates(params)})
+
+        await self.delay()
+        chat_id = int(params.get("chat_id") or 0)
+        if chat_id:
+            limiter = self._chat_limiters.setdefault(chat_id, RateLimiter(self.behaviour.rate_limit, 3))
+            if not limiter.allow():
+                self.stats["429"] += 1
+                return web.json_response({"ok": False, "error_code": 429,
+                                          "description": "Too Many Requests: retry after 1",
+                                          "parameters": {"retry_after": 1}}, status=429)
+        if self.should_fail():
+            self.stats["errors"] += 1
+            return web.json_response({"ok": False, "error_code": 500, "description": "Internal Server Error"},
+                                     status=500)
+
+        if method == "getMe":
+            result = {"id": 1, "is_bot": True, "first_name": "bot", "username": "load_test_bot"}
+        elif method == "sendMessage":
+            result = self.message(chat_id, params["text"])
+            if self.on_outgoing:
+                self.on_outgoing(chat_id, params["text"], result["message_id"])
+        elif method == "editMessageText":
+            result = self.message(chat_id, params["text"], int(params["message_id"]))
+            if self.on_outgoing:
+                self.on_outgoing(chat_id, params["text"], result["message_id"])
+        else:
+            result = True  # setMyCommands, deleteWebhook, answerInlineQuery...
+        return web.json_response({"ok": True, "result": result})
+
+
+# ----------------- Solana JSON-RPC -----------------
+class MockRpc(MockServer):
+    """
+    Solana RPC stand-in for the methods the bot uses. Sent transactions land after `land_delay`
+    (processed), are confirmed 0.4 s later and finalized `finalize_delay` after that; `drop_rate`
+    of them never land so blockhash expiry can be exercised. Block height advances in real time.
+    """
+
+    def __init__(self, behaviour: MockBehaviour, mints: Dict[str, int], sol_lamports: int = 10 * 10 ** 9,
+                 token_amount: int = 10 ** 12, land_delay: float = 0.4, finalize_delay: float = 12.8,
+                 drop_rate: float = 0.0, blocks_per_second: float = 2.5):
+        super().__init__(behaviour)
+        self.mints = mints
+        self.sol_lamports = sol_lamports
+        self.token_amount = token_amount
+        self.land_delay = land_delay
+        self.finalize_delay = finalize_delay
+        self.drop_rate = drop_rate
+        self.blocks_per_second = blocks_per_second
+        self.started = monotonic()
+        self._sent: Dict[str, Optional[float]] = {}
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        app.router.add_get("/ws", self.websocket)
+        return app
+
+    @property
+    def slot(self) -> int:
+        return 300_000_000 + int((monotonic() - self.started) * self.blocks_per_second)
+
+    @property
+    def block_height(self) -> int:
+        return self.slot - 20_000_000
+
+    def context(self) -> dict:
+        return {"slot": self.slot, "apiVersion": "2.0.0"}
+
+    def account(self, address: str) -> dict:
+        if address in self.mints:
+            data = bytearray(82)
+            data[44] = self.mints[address]
+            data[45] = 1
+            owner, lamports = TOKEN_PROGRAM, 1_461_600
+        else:
+            # Valid both as a wallet (lamports) and as a token account (u64 amount at offset 64)
+            data = bytearray(165)
+            struct.pack_into("<Q", data, 64, self.token_amount)
+            owner, lamports = SYSTEM_PROGRAM, self.sol_lamports
+        return {"data": [base64.b64encode(bytes(data)).decode(), "base64"], "executable": False,
+                "lamports": lamports, "owner": owner, "rentEpoch": 0, "space": len(data)}
+
+    def status(self, signature: str) -> Optional[dict]:
+        landed_at = self._sent.get(signature)
+        if landed_at is None or monotonic() < landed_at:
+            return None
+        age = monotonic() - landed_at
+        level = "finalized" if age >= self.finalize_delay + 0.4 else "confirmed" if age >= 0.4 else "processed"
+        return {"slot": self.slot, "confirmations": None if level == "finalized" else int(age * 2.5),
+                "err": None, "status": {"Ok": None}, "confirmationStatus": level}
+
+    def call(self, method: str, params: list):
+        if method == "getAccountInfo":
+            return {"context": self.context(), "value": self.account(params[0])}
+        if method == "getMultipleAccounts":
+            return {"context": self.context(), "value": [self.account(a) for a in params[0]]}
+        if method == "getBalance":
+            return {"context": self.context(), "value": self.sol_lamports}
+        if method == "getTokenAccountBalance":
+            amount = str(self.token_amount)
+            return {"context": self.context(), "value": {"amount": amount, "decimals": 6,
+                                                         "uiAmount": self.token_amount / 10 ** 6,
+                                                         "uiAmountString": str(self.token_amount / 10 ** 6)}}
+        if method == "getLatestBlockhash":
+            return {"context": self.context(), "value": {"blockhash": str(Hash.new_unique()),
+                                                         "lastValidBlockHeight": self.block_height + 150}}
+        if method == "getBlockHeight":
+            return self.block_height
+        if method == "getSlot":
+            return self.slot
+        if method == "sendTransaction":
+            transaction = VersionedTransaction.from_bytes(base64.b64decode(params[0]))
+            signature = str(transaction.signatures[0])
+            dropped = random.random() < self.drop_rate
+            self._sent[signature] = None if dropped else monotonic() + self.land_delay * random.uniform(0.5, 1.5)
+            return signature
+        if method == "getSignatureStatuses":
+            return {"context": self.context(), "value": [self.status(s) for s in params[0]]}
+        if method == "getHealth":
+            return "ok"
+        raise KeyError(method)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        method = body.get("method")
+        self.stats[method] += 1
+        await self.delay()
+        if not self.limiter.allow():
+            self.stats["429"] += 1
+            return web.Response(status=429, text="Too many requests")
+        if self.should_fail():
+            self.stats["errors"] += 1
+            return web.json_response({"jsonrpc": "2.0", "id": body.get("id"),
+                                      "error": {"code": -32005, "message": "Node is behind"}})
+        try:
+            result = self.call(method, body.get("params") or [])
+        except KeyError:
+            return web.json_response({"jsonrpc": "2.0", "id": body.get("id"),
+                                      "error": {"code": -32601, "message": "Method not found"}})
+        return web.json_response({"jsonrpc": "2.0", "id": body.get("id"), "result": result})
+
+    async def websocket(self, request: web.Request) -> web.WebSocketResponse:
+        """
+        Accepts subscriptions (account/logs) and never notifies, so the bot's socket clients stay quiet.
+        """
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        subscription = 0
+        async for message in ws:
+            if message.type != WSMsgType.TEXT:
+                continue
+            payload = json.loads(message.data)
+            for request_body in payload if isinstance(payload, list) else [payload]:
+                subscription += 1
+                result = True if request_body.get("method", "").endswith("Unsubscribe") else subscription
+                await ws.send_str(json.dumps({"jsonrpc": "2.0", "id": request_body.get("id"), "result": result}))
+        return ws
+
+
+# ----------------- Jupiter -----------------
+class MockJupiter(MockServer):
+    """
+    Jupiter stand-in: /quote prices every token at `rate` output units per input unit, /swap returns
+    an unsigned memo transaction paid by the user (enough for the bot to sign and send it).
+    """
+
+    def __init__(self, behaviour: MockBehaviour, rpc: MockRpc, rate: float = 1000.0):
+        super().__init__(behaviour)
+        self.rpc = rpc
+        self.rate = rate
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/quote", self.quote, allow_head=False)
+        app.router.add_head("/quote", self.head)
+        app.router.add_post("/swap", self.swap)
+        app.router.add_get("/tokens", self.tokens)
+        return app
+
+    async def guard(self, name: str) -> Optional[web.Response]:
+        self.stats[name] += 1
+        await self.delay()
+        if not self.limiter.allow():
+            self.stats["429"] += 1
+            return web.json_response({"error": "Rate limit exceeded"}, status=429)
+        if self.should_fail():
+            self.stats["errors"] += 1
+            return web.json_response({"error": "Internal error"}, status=500)
+        return None
+
+    async def head(self, request: web.Request) -> web.Response:
+        return web.Response()
+
+    async def tokens(self, request: web.Request) -> web.Response:
+        return web.json_response([], headers={"ETag": "load-test"})
+
+    async def quote(self, request: web.Request) -> web.Response:
+        failure = await self.guard("quote")
+        if failure is not None:
+            return failure
+        amount = int(request.query["amount"])
+        out_amount = int(amount * self.rate)
+        return web.json_response({
+            "inputMint": request.query["inputMint"],
+            "outputMint": request.query["outputMint"],
+            "inAmount": str(amount),
+            "outAmount": str(out_amount),
+            "otherAmountThreshold": str(int(out_amount * 0.99)),
+            "swapMode": "ExactIn",
+            "slippageBps": 50,
+            "priceImpactPct": "0.0012",
+            "routePlan": [],
+        })
+
+    async def swap(self, request: web.Request) -> web.Response:
+        failure = await self.guard("swap")
+        if failure is not None:
+            return failure
+        payload = await request.json()
+        payer = Pubkey.from_string(payload["userPublicKey"])
+        memo = Instruction(MEMO_PROGRAM, f"swap {random.random()}".encode(), [])
+        message = MessageV0.try_compile(payer, [memo], [], Hash.new_unique())
+        transaction = VersionedTransaction.populate(message, [Signature.default()])
+        return web.json_response({
+            "swapTransaction": base64.b64encode(bytes(transaction)).decode(),
+            "lastValidBlockHeight": self.rpc.block_height + 150,
+            "prioritizationFeeLamports": 5000,
+        })
+
+
+def stats_lines(servers: Dict[str, MockServer]) -> List[str]:
+    return [f"{name}: " + ", ".join(f"{key} {value}" for key, value in sorted(server.stats.items()))
+            for name, server in servers.items()]
@@ -1,65 +1,173 @@
-from aiogram import Bot, Dispatcher
-from aiogram.types import BotCommand
+from time import perf_counter
+
+STARTED_AT = perf_counter()
+
 from utils.setup import ensure_directories_and_files_exist
-from bot.handlers import router
+from bot.startup import StartupTimer, FirstResponseMiddleware, warm_up
+from bot.logging_setup import setup_logging
 import asyncio
 import json
 import logging
-import os
 import sys
 
-# Setup logging
-LOG_DIR = "logs"
-os.makedirs(LOG_DIR, exist_ok=True)  # Create logs directory if it doesn't exist
-logging.basicConfig(
-    filename=os.path.join(LOG_DIR, "bot.log"),
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-)
 logger = logging.getLogger(__name__)
-logger.addHandler(logging.StreamHandler())  # Also output logs to console
-
-# Ensure directories and files exist
-ensure_directories_and_files_exist()
-
-# Load settings
-try:
-    with open("data/settings.json", "r") as f:
-        config = json.load(f)
-except FileNotFoundError:
-    logger.error("Settings file not found! Please ensure 'data/settings.json' exists.")
-    sys.exit(1)
-
-# Validate Telegram token
-if not config.get("telegram_token"):
-    print('')
-    logger.error("Telegram token is missing in 'data/settings.json'. Please fill it and restart the bot.")
-    print('')
-    sys.exit(1)
-
-# Initialize bot
-try:
-    bot = Bot(token=config["telegram_token"])
-except Exception as e:
-    logger.error(f"Failed to initialize bot: {e}")
-    sys.exit(1)
-
-dp = Dispatcher()
-
-# Register routes
-dp.include_router(router)
+
+# Telegram commands menu
+COMMANDS = [
+    ("/start", "Start working with the bot"),
+    ("/orders", "List open TP/SL orders"),
+    ("/tp", "Take-profit: /tp <token> <price SOL> [percent]"),
+    ("/sl", "Stop-loss: /sl <token> <price SOL> [percent]"),
+    ("/trail", "Trailing stop: /trail <token> <distance %> [percent]"),
+    ("/cancel", "Cancel an order: /cancel <order id>"),
+    ("/dca", "Recurring buy: /dca <token> <SOL> <minutes> <count>"),
+    ("/dca_list", "List DCA schedules"),
+    ("/dca_cancel", "Cancel a DCA schedule: /dca_cancel <id>"),
+    ("/snipe", "Arm new-pool sniper: /snipe <SOL> [min liquidity]"),
+    ("/snipe_status", "Sniper settings and latency"),
+    ("/snipe_off", "Disarm the sniper"),
+    ("/wallets", "List your wallet group"),
+    ("/multibuy", "Buy from all wallets: /multibuy <token> <SOL>"),
+    ("/multisell", "Sell from all wallets: /multisell <token> <percent>"),
+    ("/resubmits", "Resubmit limit for expired transactions: /resubmits <0-5>"),
+    ("/commitment", "Success level: /commitment <processed|confirmed|finalized>"),
+    ("/pnl", "Profit and loss per token"),
+    ("/paper", "Paper trading: /paper <on|off|reset> [starting SOL]"),
+    ("/backtest", "Backtest TP/SL/trailing rules: /backtest <token> [tp=..] [sl=..] [trail=..]"),
+    ("/backtest_dca", "Backtest DCA intervals: /backtest_dca <token> [every=..] [tp=..]"),
+]
+
+
+# Load and validate settings
+def load_config() -> dict:
+    try:
+        with open("data/settings.json", "r") as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        logger.error("Settings file not found! Please ensure 'data/settings.json' exists.")
+        sys.exit(1)
+
+    # Validate Telegram token
+    if not config.get("telegram_token"):
+        logger.error("Telegram token is missing in 'data/settings.json'. Please fill it and restart the bot.")
+        sys.exit(1)
+    return config
+
 
 # Set Telegram commands
-async def set_commands():
-    commands = [
-        BotCommand(command="/start", description="Start working with the bot"),
-    ]
+async def set_commands(bot):
+    from aiogram.types import BotCommand
+
+    commands = [BotCommand(command=command, description=description) for command, description in COMMANDS]
     await bot.set_my_commands(commands)
     logger.info("Commands successfully set in Telegram")
 
+
+# Background services: outbound message queue, balance subscriptions, TP/SL orders, DCA, sniper, token index, blockhash cache and paper accounts
+def start_services(bot, config: dict) -> list:
+    from bot.balance_cache import balance_manager, ws_url_from_rpc
+    from bot.orders import order_engine
+    from bot.scheduler import dca_scheduler
+    from bot.sniper import sniper
+    from bot.token_index import token_index
+    from bot.swap_builder import swap_builder
+    from bot.outbox import outbox
+    from bot.paper import paper_trading
+
+    outbox.bot = bot
+
+    async def notify_user(user_id: int, text: str):
+        outbox.send(user_id, text, parse_mode="Markdown")
+
+    ws_url = config.get("solana_ws_url") or ws_url_from_rpc(config["solana_rpc_url"])
+    balance_manager.ws_url = ws_url
+
+    order_engine.notify = notify_user
+    order_engine.tick_seconds = config.get("order_tick_seconds", order_engine.tick_seconds)
+
+    dca_scheduler.notify = notify_user
+
+    sniper.ws_url = ws_url
+    sniper.rpc_url = config["solana_rpc_url"]
+    sniper.programs = config.get("sniper_programs") or sniper.programs
+    sniper.send_urls = config.get("sniper_send_urls", [])
+    sniper.notify = notify_user
+
+    token_index.url = config.get("token_list_url") or token_index.url
+
+    swap_builder.enabled = config.get("local_swap_build", False)
+    swap_builder.compute_unit_price = config.get("compute_unit_price", swap_builder.compute_unit_price)
+
+    # Paper trading simulator, e.g. "paper_trading": {"latency_ms": 400, "fee_bps": 25, "liquidity_sol": 200}
+    paper_config = config.get("paper_trading") or {}
+    simulator = paper_trading.simulator
+    simulator.latency = paper_config.get("latency_ms", simulator.latency * 1000) / 1000
+    simulator.fee_bps = paper_config.get("fee_bps", simulator.fee_bps)
+    simulator.liquidity_sol = paper_config.get("liquidity_sol", simulator.liquidity_sol)
+    simulator.market_prices = paper_config.get("market_prices", simulator.market_prices)
+    paper_trading.starting_sol = paper_config.get("starting_sol", paper_trading.starting_sol)
+
+    return [
+        asyncio.create_task(outbox.run()),
+        asyncio.create_task(balance_manager.run()),
+        asyncio.create_task(order_engine.run()),
+        asyncio.create_task(dca_scheduler.run()),
+        asyncio.create_task(sniper.run()),
+        asyncio.create_task(token_index.run()),
+        asyncio.create_task(swap_builder.run()),
+        asyncio.create_task(paper_trading.run()),
+    ]
+
+
 async def main():
-    logger.info("Bot is starting...")
-    await set_commands()
+    timer = StartupTimer(STARTED_AT)
+    with timer.phase("setup"):
+        setup_logging()
+        logger.info("Bot is starting...")
+        # Ensure directories and files exist
+        ensure_directories_and_files_exist()
+        config = load_config()
+
+    with timer.phase("aiogram"):
+        from aiogram import Bot, Dispatcher
+    with timer.phase("handlers"):
+        from bot.handlers import router
+
+    # Initialize bot (optionally against another Bot API server, e.g. the load-test stand-in)
+    try:
+        session = None
+        if config.get("telegram_api_url"):
+            from aiogram.client.session.aiohttp import AiohttpSession
+            from aiogram.client.telegram import TelegramAPIServer
+
+            session = AiohttpSession(api=TelegramAPIServer.from_base(config["telegram_api_url"]))
+        bot = Bot(token=config["telegram_token"], session=session)
+    except Exception as e:
+        logger.error(f"Failed to initialize bot: {e}")
+        sys.exit(1)
+
+    dp = Dispatcher()
+    # Register routes
+    dp.include_router(router)
+    dp.update.outer_middleware(FirstResponseMiddleware(timer))
+
+    # Diagnostics: event-loop lag watchdog, e.g. "watchdog": {"enabled": true, "threshold_ms": 250, "profile": false}
+    watchdog_config = config.get("watchdog") or {}
+    if watchdog_config.get("enabled"):
+        from bot.watchdog import LoopWatchdog, WatchdogMiddleware
+
+        watchdog = LoopWatchdog(threshold=watchdog_config.get("threshold_ms", 250) / 1000,
+                                profile=watchdog_config.get("profile", False))
+        dp.update.outer_middleware(WatchdogMiddleware(watchdog))
+        watchdog_task = watchdog.start()  # noqa: F841 keep a reference to the task
+
+    # Solana stack imports and RPC/Jupiter/Telegram connections are warmed up concurrently
+    await warm_up(timer, lambda: asyncio.gather(bot.get_me(), set_commands(bot)))
+
+    with timer.phase("services"):
+        services = start_services(bot, config)  # noqa: F841 keep references to the tasks
+
+    logger.info(timer.report())
     logger.info("Bot is ready! Waiting for messages...")
     await dp.start_polling(bot)
 
@@ -67,4 +175,4 @@ if __name__ == "__main__":
     try:
         asyncio.run(main())
     except KeyboardInterrupt:
-        logger.info("Bot stopped manually via KeyboardInterrupt.")
\ No newline at end of file
+        logger.info("Bot stopped manually via KeyboardInterrupt.")
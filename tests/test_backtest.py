@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from bot.backtest import HEADER, MAX_GRID, PriceSeries, backtest_dca, backtest_exits, parse_values, write_series
+
+
+def test_last_rejects_fewer_than_one_candle(tmp_path):
+    path = str(tmp_path / "mint.px")
+    write_series(path, 1_700_000_000, 60, np.arange(1, 11, dtype=np.float32))
+    series = PriceSeries(path)
+    assert list(series.last(3).prices) == [8, 9, 10]
+    assert series.last(3).start == 1_700_000_000 + 7 * 60
+    with pytest.raises(ValueError):
+        series.last(0)
+
+
+def test_truncated_file_raises_value_error(tmp_path):
+    path = tmp_path / "mint.px"
+    path.write_bytes(b"PXS1" + bytes(HEADER.size - 10))
+    with pytest.raises(ValueError):
+        PriceSeries(str(path))
+
+
+def naive_exits(prices, take_profit, stop_loss, trailing, hold, entry_every, fee_bps):
+    keep = (1 - fee_bps / 10_000) ** 2
+    entries = [e for e in range(0, len(prices) - hold, entry_every) if prices[e] > 0]
+    shape = (len(take_profit), len(stop_loss), len(trailing))
+    total, held = np.zeros(shape), np.zeros(shape)
+    for index in np.ndindex(shape):
+        tp, sl, trail = take_profit[index[0]], stop_loss[index[1]], trailing[index[2]]
+        for entry in entries:
+            peak, exit_at = 1.0, hold - 1  # Hold expiry unless a rule fires first
+            for step in range(hold):
+                ratio = prices[entry + 1 + step] / prices[entry]
+                peak = max(peak, ratio)
+                if (tp > 0 and ratio >= 1 + tp) or (sl > 0 and ratio <= 1 - sl) or \
+                        (trail > 0 and 1 - ratio / peak >= trail):
+                    exit_at = step
+                    break
+            total[index] += prices[entry + 1 + exit_at] / prices[entry] * keep - 1
+            held[index] += exit_at + 1
+    return total / len(entries), held / len(entries), len(entries)
+
+
+def test_backtest_exits_matches_a_per_entry_loop():
+    rng = np.random.default_rng(5)
+    prices = np.exp(np.cumsum(rng.normal(0, 0.03, 1500)))
+    take_profit = parse_values("off,5:40:5", 0.01)
+    stop_loss = parse_values("off,5:30:5", 0.01)
+    trailing = parse_values("off,3,10,25", 0.01)
+    result = backtest_exits(prices, take_profit, stop_loss, trailing, hold=60, entry_every=7, fee_bps=50)
+    mean_return, mean_hold, entries = naive_exits(prices, take_profit, stop_loss, trailing, 60, 7, 50)
+    assert int(result["entries"]) == entries
+    np.testing.assert_allclose(result["mean_return"], mean_return, rtol=1e-9, atol=1e-12)
+    np.testing.assert_allclose(result["mean_hold"], mean_hold)
+    # With every rule off each entry is held to expiry, which is also the baseline
+    assert result["mean_hold"][0, 0, 0] == 60
+    assert abs(result["mean_return"][0, 0, 0] - float(result["baseline"])) < 1e-12
+
+
+def test_backtest_dca_known_answer():
+    prices = np.array([1.0, 1.0, 2.0, 2.0])
+    result = backtest_dca(prices, np.array([1, 2]), np.array([0.0, 0.2]), fee_bps=0)
+    # Every candle: 3 tokens for 4 SOL, worth 6 SOL at the end; TP 20% fires at candle 2 (2.5 tokens x 2 / 3 SOL)
+    np.testing.assert_allclose(result["total_return"], [[0.5, 5 / 3 - 1], [0.5, 0.5]])
+    assert result["buys"].tolist() == [[4, 3], [2, 2]]
+    assert result["exit_at"].tolist() == [[3, 2], [3, 2]]
+
+
+def test_parse_values_and_grid_limits():
+    assert parse_values("10:30:10").tolist() == [10, 20, 30]
+    assert parse_values("off, 5,5", 0.01).tolist() == [0, 0.05]
+    for text in ("", "10:20:0", f"0:{MAX_GRID + 1}:1"):
+        with pytest.raises(ValueError):
+            parse_values(text)
+    values = np.arange(1, 64, dtype=np.float64) / 100
+    with pytest.raises(ValueError):
+        backtest_exits(np.ones(100), values, values, values, hold=10)
+    with pytest.raises(ValueError):
+        backtest_dca(np.ones(10), np.arange(1, MAX_GRID + 2), np.array([0.0]))
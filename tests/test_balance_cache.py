@@ -0,0 +1,91 @@
+import asyncio
+import json
+import websockets
+from bot.balance_cache import BalanceSubscriptionManager
+
+WALLET = "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM"
+
+
+class AccountWsStandIn:
+    """
+    Local websocket speaking just enough of accountSubscribe to push notifications to the manager.
+    """
+
+    def __init__(self):
+        self.subscriptions = {}  # subscription id -> account
+        self.connections = set()
+        self.subscribed = asyncio.Event()
+        self.server = None
+
+    async def start(self) -> str:
+        self.server = await websockets.serve(self.handle, "127.0.0.1", 0)
+        host, port = self.server.sockets[0].getsockname()[:2]
+        return f"ws://{host}:{port}"
+
+    async def handle(self, ws, path=None):
+        self.connections.add(ws)
+        try:
+            async for message in ws:
+                request = json.loads(message)
+                if request["method"] == "accountSubscribe":
+                    subscription = len(self.subscriptions) + 1
+                    self.subscriptions[subscription] = request["params"][0]
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": subscription}))
+                    self.subscribed.set()
+                else:
+                    await ws.send(json.dumps({"jsonrpc": "2.0", "id": request["id"], "result": True}))
+        finally:
+            self.connections.discard(ws)
+
+    async def notify(self, account: str, lamports: int):
+        subscription = next(sid for sid, subscribed in self.subscriptions.items() if subscribed == account)
+        value = {"lamports": lamports, "data": ["", "base64"], "owner": "11111111111111111111111111111111",
+                 "executable": False, "rentEpoch": 0, "space": 0}
+        message = {"jsonrpc": "2.0", "method": "accountNotification",
+                   "params": {"result": {"context": {"slot": 1}, "value": value}, "subscription": subscription}}
+        for ws in list(self.connections):
+            await ws.send(json.dumps(message))
+
+    async def drop_connections(self):
+        for ws in list(self.connections):
+            await ws.close()
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "condition not reached"
+        await asyncio.sleep(0.01)
+
+
+def test_balances_are_not_served_without_run():
+    manager = BalanceSubscriptionManager()
+    manager.track_wallet(1, WALLET, 5)
+    assert manager.get_sol_balance(1) is None
+
+
+def test_notifications_update_the_cache_and_a_drop_makes_it_stale():
+    async def scenario():
+        stand_in = AccountWsStandIn()
+        manager = BalanceSubscriptionManager(ws_url=await stand_in.start(), poll_interval=60)
+        polls = []
+        manager.poll_once = lambda: polls.append(True)  # No HTTP RPC in this test, the socket is the source
+        manager.track_wallet(1, WALLET, 5)
+        task = asyncio.create_task(manager.run())
+        try:
+            await asyncio.wait_for(stand_in.subscribed.wait(), 5)
+            await wait_for(lambda: manager.connected)
+            assert polls and manager.get_sol_balance(1) == 5
+
+            await stand_in.notify(WALLET, 42)
+            await wait_for(lambda: manager.get_sol_balance(1) == 42)
+
+            await stand_in.drop_connections()
+            await wait_for(lambda: not manager.connected)
+            assert manager.get_sol_balance(1) is None
+        finally:
+            task.cancel()
+            stand_in.server.close()
+            await stand_in.server.wait_closed()
+
+    asyncio.run(scenario())
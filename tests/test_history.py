@@ -0,0 +1,44 @@
+import json
+import os
+
+import bot.history as history_module
+from bot.history import MAX_FETCH_ATTEMPTS, WalletHistory
+
+WALLET = "Wallet1111111111111111111111111111111111111"
+
+
+def swap(slot: int) -> dict:
+    return {
+        "slot": slot,
+        "blockTime": 1_700_000_000 + slot,
+        "transaction": {"message": {"accountKeys": [WALLET]}},
+        "meta": {
+            "err": None,
+            "preBalances": [2_000_000_000],
+            "postBalances": [1_000_000_000],
+            "preTokenBalances": [],
+            "postTokenBalances": [{"owner": WALLET, "mint": "Mint", "uiTokenAmount": {"amount": "500", "decimals": 6}}],
+        },
+    }
+
+
+def test_signature_without_transaction_is_skipped_after_max_attempts(tmp_path, monkeypatch):
+    served = {"sig1": swap(1), "sig3": swap(3)}  # sig2 never comes back from the node
+    pending = ["sig1", "sig2", "sig3"]
+    monkeypatch.setattr(WalletHistory, "new_signatures",
+                        lambda self, max_backfill: pending[pending.index(self.cursor) + 1:] if self.cursor else pending)
+    monkeypatch.setattr(history_module, "fetch_transactions", lambda batch: [served.get(sig) for sig in batch])
+
+    history = WalletHistory(WALLET, str(tmp_path))
+    assert history.sync() == 1
+    assert history.cursor == "sig1"
+    for _ in range(MAX_FETCH_ATTEMPTS - 2):
+        assert history.sync() == 0
+        assert history.cursor == "sig1"
+
+    assert history.sync() == 1
+    assert history.cursor == "sig3"
+    assert history.skipped == ["sig2"] and history.attempts == {}
+    with open(os.path.join(history.path, "meta.json")) as f:
+        assert json.load(f)["skipped"] == ["sig2"]
+    assert len(WalletHistory(WALLET, str(tmp_path))) == 2
@@ -0,0 +1,137 @@
+import asyncio
+import random
+import threading
+from bot.orders import MAX_SELL_ATTEMPTS, MintBook, Order, OrderEngine, STOP_LOSS, TAKE_PROFIT, TRAILING_STOP
+from bot.tx_lifecycle import ABORTED, FAILED, LANDED, TxResult
+
+MINT_A = "MintA111111111111111111111111111111111111111"
+MINT_B = "MintB111111111111111111111111111111111111111"
+
+
+def naive_triggered(price: float, orders):
+    return {o.order_id for o in orders if (o.kind == TAKE_PROFIT and price >= o.trigger_price)
+            or (o.kind != TAKE_PROFIT and price <= o.trigger_price)}
+
+
+def test_mint_book_matches_a_scan_of_every_order():
+    rng = random.Random(3)
+    orders, book = {}, MintBook()
+    for order_id in range(1, 2001):
+        kind = rng.choice((TAKE_PROFIT, STOP_LOSS))
+        order = orders[order_id] = Order(order_id, 1, MINT_A, kind, trigger_price=rng.uniform(0.5, 1.5))
+        book.add(order)
+    for price in (0.4, 0.75, 1.0, 1.25, 1.6):
+        assert set(book.evaluate(price, orders)) == naive_triggered(price, orders.values())
+
+
+def test_trailing_stop_follows_the_peak():
+    orders, book = {}, MintBook()
+    order = orders[1] = Order(1, 1, MINT_A, TRAILING_STOP, trigger_price=0.9, trail_pct=10, peak=1.0)
+    book.add(order)
+
+    assert book.evaluate(1.5, orders) == []
+    assert order.peak == 1.5 and abs(order.trigger_price - 1.35) < 1e-12
+    assert book.stops == [(order.trigger_price, 1)] and book.peaks == [(1.5, 1)]
+    assert book.evaluate(1.4, orders) == []  # Below the peak, above the raised stop
+    assert order.peak == 1.5
+    assert book.evaluate(1.3, orders) == [1]
+    book.remove(order)
+    assert len(book) == 0 and book.peaks == []
+
+
+def make_engine(tmp_path, prices, seller):
+    fetches, notes = [], []
+
+    def price_source(mints):
+        fetches.append(sorted(mints))
+        return dict(prices)
+
+    async def notify(user_id, text):
+        notes.append(text)
+
+    engine = OrderEngine(orders_file=str(tmp_path / "orders.json"), price_source=price_source, seller=seller)
+    engine.notify = notify
+    return engine, fetches, notes
+
+
+async def settle(engine: OrderEngine):
+    while engine._tasks:
+        await asyncio.gather(*list(engine._tasks))
+
+
+def test_one_price_fetch_per_tick_across_mints(tmp_path):
+    sold = []
+    engine, fetches, _ = make_engine(tmp_path, {MINT_A: 1.0, MINT_B: 2.0},
+                                     lambda user_id, mint, percentage: sold.append(mint) or TxResult(LANDED, "sig"))
+    for user_id in range(50):
+        engine.place(user_id, MINT_A, TAKE_PROFIT, trigger_price=5.0)
+        engine.place(user_id, MINT_B, STOP_LOSS, trigger_price=1.0)
+    engine.place(99, MINT_B, TAKE_PROFIT, trigger_price=1.5)
+
+    async def scenario():
+        await engine.tick()
+        await settle(engine)
+
+    asyncio.run(scenario())
+    assert fetches == [[MINT_A, MINT_B]]
+    assert sold == [MINT_B]
+    assert len(engine.orders) == 100
+
+
+def test_second_order_on_the_same_mint_waits_for_the_running_sell(tmp_path):
+    release, calls = threading.Event(), []
+
+    def seller(user_id, mint, percentage):
+        calls.append(percentage)
+        release.wait(5)
+        return TxResult(LANDED, f"sig{len(calls)}")
+
+    engine, _, notes = make_engine(tmp_path, {MINT_A: 2.0}, seller)
+    first = engine.place(1, MINT_A, TAKE_PROFIT, percentage=50, trigger_price=1.5)
+    second = engine.place(1, MINT_A, TAKE_PROFIT, percentage=50, trigger_price=1.8)
+
+    async def scenario():
+        await engine.tick()
+        await asyncio.sleep(0.05)
+        # One sell runs, the other order went back into the book
+        assert calls == [50] and list(engine.orders) == [second.order_id]
+        release.set()
+        await settle(engine)
+        await engine.tick()
+        await settle(engine)
+
+    asyncio.run(scenario())
+    assert calls == [50, 50]
+    assert not engine.orders and len(notes) == 2 and first.order_id != second.order_id
+
+
+def run_failing_sells(tmp_path, results):
+    results = list(results)
+    engine, _, notes = make_engine(tmp_path, {MINT_A: 2.0}, lambda user_id, mint, percentage: results.pop(0))
+    order = engine.place(1, MINT_A, TAKE_PROFIT, trigger_price=1.5)
+
+    async def scenario():
+        while results:
+            await engine.tick()
+            await settle(engine)
+
+    asyncio.run(scenario())
+    return engine, order, notes
+
+
+def test_unsent_and_failed_sells_rearm_until_the_attempt_limit(tmp_path):
+    engine, order, notes = run_failing_sells(tmp_path, [
+        TxResult(ABORTED, error="no quote"),
+        TxResult(FAILED, "failedsig", error="slippage tolerance exceeded"),
+        TxResult(ABORTED, error="no quote"),
+    ][:MAX_SELL_ATTEMPTS])
+    assert order.failures == MAX_SELL_ATTEMPTS and not engine.orders
+    assert "stays open (attempt 1/" in notes[0]
+    assert "https://solana.fm/tx/failedsig" in notes[1] and "stays open" in notes[1]
+    assert "cancelled after" in notes[-1]
+
+
+def test_sent_sell_with_unknown_status_cancels_the_order(tmp_path):
+    engine, order, notes = run_failing_sells(tmp_path, [TxResult(ABORTED, "sentsig", error="no status after 90 s")])
+    assert not engine.orders and order.failures == 0
+    assert len(notes) == 1 and "status is unknown" in notes[0] and "https://solana.fm/tx/sentsig" in notes[0]
@@ -0,0 +1,38 @@
+import asyncio
+
+from bot.outbox import Outbox
+
+
+class RecordingBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.sent.append((chat_id, text, kwargs))
+        return len(self.sent)
+
+
+def test_plain_text_merges_into_markdown_escaped():
+    outbox = Outbox()
+    outbox.send(1, "Find 12.5 Tokens", parse_mode="Markdown")
+    outbox.send(1, "Token address saved. Now enter the SOL_amount", reply_markup=None)
+    assert outbox.pending() == 1
+    item = outbox._chats[1].items[0]
+    assert item.text == "Find 12.5 Tokens\n\nToken address saved. Now enter the SOL\\_amount"
+    assert item.kwargs["parse_mode"] == "Markdown"
+
+
+def test_delivery_tasks_are_referenced_until_done():
+    async def scenario():
+        bot = RecordingBot()
+        outbox = Outbox(bot)
+        outbox.send(1, "one")
+        outbox.send(2, "two")
+        outbox._dispatch_ready()
+        assert len(outbox._tasks) == 2
+        await asyncio.gather(*outbox._tasks)
+        await asyncio.sleep(0)
+        assert not outbox._tasks
+        return bot.sent
+
+    assert [text for _, text, _ in asyncio.run(scenario())] == ["one", "two"]
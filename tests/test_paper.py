@@ -0,0 +1,31 @@
+import os
+
+import bot.paper as paper_module
+from bot.paper import AmmSimulator, PaperTrading
+
+
+def test_enabled_reads_the_setting_once(monkeypatch):
+    reads = []
+    monkeypatch.setattr(paper_module, "get_user_setting", lambda user_id, key, default: reads.append(user_id) or True)
+    monkeypatch.setattr(paper_module, "set_user_setting", lambda user_id, key, value: None)
+    paper = PaperTrading(simulator=AmmSimulator(latency=0))
+    assert paper.enabled(7) and paper.enabled(7)
+    paper.disable(7)
+    assert not paper.enabled(7)
+    assert reads == [7]
+
+
+def test_corrupt_file_is_kept_and_save_replaces_atomically(tmp_path):
+    paper_file = tmp_path / "paper.json"
+    paper_file.write_text('{"accounts": {"7": {"sol": 1')
+    paper = PaperTrading(str(paper_file), AmmSimulator(latency=0))
+    paper.load()
+    assert paper.accounts == {}
+    assert [name for name in os.listdir(tmp_path) if name.startswith("paper.json.corrupt-")]
+
+    paper.account(7).sol = 123
+    paper.save()
+    assert not os.path.exists(f"{paper_file}.tmp")
+    reloaded = PaperTrading(str(paper_file), AmmSimulator(latency=0))
+    reloaded.load()
+    assert reloaded.accounts["7"].sol == 123
@@ -0,0 +1,85 @@
+import random
+from collections import deque
+
+import numpy as np
+
+from bot.pnl import compute_pnl
+
+
+def naive_fifo(rows, mint_count):
+    """
+    Per-row FIFO reference: buys open lots at the lamports spent, sells consume the oldest lots
+    proportionally, units beyond the held lots carry no cost basis.
+    """
+    lots = [deque() for _ in range(mint_count)]
+    result = {name: [0.0] * mint_count for name in ("realized", "spent", "received")}
+    trades = [0] * mint_count
+    for mint, quantity, lamports in rows:
+        if quantity > 0:
+            cost = max(-lamports, 0)
+            lots[mint].append([float(quantity), float(cost)])
+            result["spent"][mint] += cost
+            trades[mint] += 1
+            continue
+        remaining, consumed = float(-quantity), 0.0
+        while remaining > 0 and lots[mint]:
+            lot = lots[mint][0]
+            take = min(remaining, lot[0])
+            share = lot[1] * take / lot[0]
+            consumed += share
+            lot[0] -= take
+            lot[1] -= share
+            remaining -= take
+            if lot[0] <= 0:
+                lots[mint].popleft()
+        if lamports > 0:
+            result["realized"][mint] += lamports - consumed
+            result["received"][mint] += lamports
+            trades[mint] += 1
+    result["position"] = [sum(lot[0] for lot in mint_lots) for mint_lots in lots]
+    result["cost_basis"] = [sum(lot[1] for lot in mint_lots) for mint_lots in lots]
+    result["trades"] = trades
+    return result
+
+
+def random_rows(rng: random.Random, mint_count: int, count: int):
+    held = [0] * mint_count
+    rows = []
+    for _ in range(count):
+        mint = rng.randrange(mint_count)
+        kind = rng.random()
+        if held[mint] == 0 or kind < 0.45:
+            quantity = rng.randint(1, 10_000)
+            lamports = -rng.randint(1, 10 ** 9) if rng.random() < 0.85 else 0  # Some transfers in
+            held[mint] += quantity
+        else:
+            if kind < 0.6:
+                quantity = held[mint] + rng.randint(1, 5_000)  # Sells beyond the known buys
+            elif kind < 0.8:
+                quantity = held[mint]
+            else:
+                quantity = rng.randint(1, held[mint])  # Partial sell
+            lamports = rng.randint(1, 2 * 10 ** 9) if rng.random() < 0.85 else -5000  # Some transfers out
+            held[mint] = max(held[mint] - quantity, 0)
+            quantity = -quantity
+        rows.append((mint, quantity, lamports))
+    return rows
+
+
+def test_compute_pnl_matches_a_per_trade_fifo_loop():
+    rng = random.Random(11)
+    for _ in range(200):
+        mint_count = rng.randint(1, 5)
+        rows = random_rows(rng, mint_count, rng.randint(1, 60))
+        mint, token_delta, sol_delta = (np.array(column, dtype=np.int64) for column in zip(*rows))
+        result = compute_pnl(mint.astype(np.int32), token_delta, sol_delta, mint_count)
+        expected = naive_fifo(rows, mint_count)
+        for name in ("position", "cost_basis", "realized", "spent", "received"):
+            np.testing.assert_allclose(result[name], expected[name], rtol=1e-9, atol=1e-3, err_msg=name)
+        assert list(result["trades"]) == expected["trades"]
+
+
+def test_empty_history():
+    empty = np.empty(0, dtype=np.int64)
+    result = compute_pnl(empty.astype(np.int32), empty, empty, 2)
+    assert not result["position"].any() and list(result["trades"]) == [0, 0]
@@ -0,0 +1,44 @@
+import asyncio
+import threading
+
+import bot.quote_ladder as quote_ladder
+from bot.quote_ladder import QuoteCache, fetch_ladder, render_ladder
+
+SOL = "So11111111111111111111111111111111111111112"
+MINT = "EPjFWdd5AufqSSqeM2qZwtg2H6Dja3JBGaxCTsLJ5jg1"
+
+
+def test_quote_cache_hits_until_the_ttl_expires(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(quote_ladder, "monotonic", lambda: now[0])
+    cache = QuoteCache(ttl=10, max_entries=2)
+    cache.put((SOL, MINT, 1), {"outAmount": "5"})
+    now[0] += 10
+    assert cache.get((SOL, MINT, 1)) == {"outAmount": "5"}
+    now[0] += 0.5
+    assert cache.get((SOL, MINT, 1)) is None and not cache._entries
+
+    cache.put((SOL, MINT, 1), {"outAmount": "1"})
+    cache.put((SOL, MINT, 2), {"outAmount": "2"})
+    cache.put((SOL, MINT, 3), {"outAmount": "3"})  # Full: the oldest entry makes room
+    assert cache.get((SOL, MINT, 1)) is None and cache.get((SOL, MINT, 3)) == {"outAmount": "3"}
+
+
+def test_ladder_quotes_concurrently_in_order_and_marks_failed_rungs(monkeypatch):
+    monkeypatch.setattr(quote_ladder, "quote_cache", QuoteCache())
+    barrier = threading.Barrier(4, timeout=5)  # Only passes if all four quotes are in flight at once
+
+    def get_quote(input_mint, output_mint, amount, pub_key_str, user_id=None):
+        barrier.wait()
+        if amount == 100:
+            raise RuntimeError("route not found")
+        return {"outAmount": str(amount * 3), "priceImpactPct": "0.01"}
+
+    monkeypatch.setattr(quote_ladder.TransactionManager, "get_quote", get_quote)
+    ladder = asyncio.run(fetch_ladder(SOL, MINT, 100, "wallet"))
+
+    assert [rung["amount"] for rung in ladder] == [25, 50, 100, 200]
+    assert [rung["quote"] and rung["quote"]["outAmount"] for rung in ladder] == ["75", "150", None, "600"]
+    lines = render_ladder(ladder, 0, 0).splitlines()
+    assert lines[2] == "▶ 100 SOL: no quote"
+    assert lines[3].startswith("200 SOL → 600.0000")
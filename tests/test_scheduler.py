@@ -0,0 +1,90 @@
+import asyncio
+import json
+import random
+from bot.scheduler import DcaScheduler
+
+MINT = "So11111111111111111111111111111111111111112"
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def make_scheduler(tmp_path, clock, buys, max_per_second=5):
+    def buyer(user_id, mint, sol_amount, slippage):
+        buys.append((user_id, clock(), sol_amount))
+        return True, f"sig{len(buys)}"
+
+    return DcaScheduler(dca_file=str(tmp_path / "dca.json"), max_per_second=max_per_second, clock=clock,
+                        rng=random.Random(7), buyer=buyer)
+
+
+async def settle(scheduler: DcaScheduler):
+    while scheduler._running:
+        await asyncio.gather(*list(scheduler._running))
+
+
+def test_buys_follow_the_interval_and_finish(tmp_path):
+    clock, buys = FakeClock(), []
+    scheduler = make_scheduler(tmp_path, clock, buys)
+    schedule = scheduler.add(1, MINT, 0.5, interval_seconds=600, count=3)
+
+    async def scenario():
+        started = clock()
+        for _ in range(4 * 600):
+            await scheduler.run_due()
+            await settle(scheduler)
+            clock.now += 1
+        return started
+
+    started = asyncio.run(scenario())
+    assert [amount for _, _, amount in buys] == [0.5, 0.5, 0.5]
+    for index, (_, at, _) in enumerate(buys):
+        # Each slot is anchored to the previous one plus at most MAX_JITTER_SECONDS of jitter
+        assert index * 600 <= at - started <= index * 600 + (index + 1) * 30 + 1
+    assert schedule.executed == 3 and schedule.schedule_id not in scheduler.schedules
+
+
+def test_due_buys_are_spread_over_seconds(tmp_path):
+    clock, buys = FakeClock(), []
+    scheduler = make_scheduler(tmp_path, clock, buys, max_per_second=2)
+    for user_id in range(5):
+        scheduler.add(user_id, MINT, 0.1, interval_seconds=60, count=1)
+    clock.now += 60
+
+    async def scenario():
+        return [await scheduler.run_due() for _ in range(3)]
+
+    assert asyncio.run(scenario()) == [2, 2, 1]
+
+
+def test_ids_are_not_reused_after_cancel_or_restart(tmp_path):
+    clock, buys = FakeClock(), []
+    scheduler = make_scheduler(tmp_path, clock, buys)
+    first = scheduler.add(1, MINT, 0.1, interval_seconds=60, count=2)
+    second = scheduler.add(1, MINT, 0.1, interval_seconds=60, count=2)
+    assert scheduler.cancel(1, second.schedule_id)
+    third = scheduler.add(1, MINT, 0.1, interval_seconds=60, count=2)
+    assert third.schedule_id == second.schedule_id + 1
+
+    assert scheduler.cancel(1, third.schedule_id)
+    restarted = make_scheduler(tmp_path, clock, buys)
+    restarted.load()
+    assert list(restarted.schedules) == [first.schedule_id]
+    assert restarted.add(1, MINT, 0.1, interval_seconds=60, count=1).schedule_id == third.schedule_id + 1
+
+
+def test_loads_schedules_saved_as_a_list(tmp_path):
+    clock, buys = FakeClock(), []
+    old = make_scheduler(tmp_path, clock, buys)
+    schedule = old.add(1, MINT, 0.1, interval_seconds=60, count=2)
+    (tmp_path / "dca.json").write_text(json.dumps([json.load(open(tmp_path / "dca.json"))["schedules"][0]]))
+
+    scheduler = make_scheduler(tmp_path, clock, buys)
+    scheduler.load()
+    assert list(scheduler.schedules) == [schedule.schedule_id]
+    assert scheduler.next_id == schedule.schedule_id + 1
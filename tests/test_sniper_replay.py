@@ -0,0 +1,145 @@
+import asyncio
+import base64
+import json
+import os
+from types import SimpleNamespace
+import pytest
+from aiohttp import web
+from based58 import b58encode
+from solana.rpc.async_api import AsyncClient
+from solders.instruction import CompiledInstruction
+from solders.keypair import Keypair
+from solders.message import Message
+from solders.transaction import VersionedTransaction
+from solders.transaction_status import EncodedConfirmedTransactionWithStatusMeta
+from bot.sniper import ArmedBuy, Sniper, SniperFilters, find_pool_instruction
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_fixture(name: str) -> dict:
+    with open(os.path.join(FIXTURES, f"sniper_{name}.json")) as f:
+        return json.load(f)
+
+
+class RecordedRpc:
+    """
+    HTTP RPC stand-in answering getTransaction and getMultipleAccounts from a recorded fixture.
+    """
+
+    def __init__(self, fixture: dict):
+        self.fixture = fixture
+        self.runner = None
+
+    async def start(self) -> str:
+        app = web.Application()
+        app.router.add_post("/", self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        host, port = site._server.sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    async def handle(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        context = {"slot": self.fixture["transaction"]["slot"], "apiVersion": "2.0.0"}
+        if body["method"] == "getTransaction":
+            result = self.fixture["transaction"]
+        elif body["method"] == "getMultipleAccounts":
+            result = {"context": context, "value": [self.fixture["accounts"].get(a) for a in body["params"][0]]}
+        else:
+            return web.json_response({"jsonrpc": "2.0", "id": body["id"],
+                                      "error": {"code": -32601, "message": "Method not found"}})
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+
+def parse_transaction(raw: dict):
+    return SimpleNamespace(transaction=EncodedConfirmedTransactionWithStatusMeta.from_json(json.dumps(raw)).transaction)
+
+
+def replay(tmp_path, fixture: dict, filters: SniperFilters) -> list:
+    """
+    Replay the fixture's logsNotification through Sniper.replay with the real resolver; returns the
+    events the armed buy fired for.
+    """
+    stream = tmp_path / "stream.jsonl"
+    stream.write_text(json.dumps(fixture["notification"]) + "\n")
+    fired = []
+
+    async def sender(armed, event):
+        fired.append(event)
+        return event.signature
+
+    async def scenario():
+        rpc = RecordedRpc(fixture)
+        sniper = Sniper(dry_run=True)
+        sniper._rpc = AsyncClient(await rpc.start())
+        sniper.sender = sender
+        sniper.armed[1] = ArmedBuy(1, str(Keypair()), 0.1, 1, filters)
+        try:
+            await sniper.replay(str(stream), fixture["program"])
+        finally:
+            await sniper._rpc.close()
+            await rpc.runner.cleanup()
+
+    asyncio.run(scenario())
+    return fired
+
+
+def test_raydium_initialize2_resolves_the_token_side_despite_the_lp_mint(tmp_path):
+    fixture = load_fixture("raydium_initialize2")
+    (event,) = replay(tmp_path, fixture, SniperFilters(min_liquidity_sol=50))
+    assert event.mint == "9hSR6S7WPtxmTojgo6GG3k4yDPecgJY292j7xrsUGWBu"
+    assert event.creator == "AKnL4NNf3DGWZJS6cPknBuEGnVsV4A4m5tgebLHaRSZ9"
+    assert event.liquidity_lamports == 80_000_000_000
+    assert event.init_coin_amount == 206_900_000_000_000_000
+    assert event.mint_authority_revoked is True
+
+
+def test_raydium_below_min_liquidity_is_skipped(tmp_path):
+    assert replay(tmp_path, load_fixture("raydium_initialize2"), SniperFilters(min_liquidity_sol=100)) == []
+
+
+@pytest.mark.parametrize("min_liquidity_sol, fires", [(0, True), (1, True), (2, False)])
+def test_pump_fun_liquidity_comes_from_the_bonding_curve(tmp_path, min_liquidity_sol, fires):
+    fixture = load_fixture("pump_fun_create")
+    fired = replay(tmp_path, fixture, SniperFilters(min_liquidity_sol=min_liquidity_sol))
+    assert bool(fired) == fires
+    if fires:
+        (event,) = fired
+        assert event.mint == "EdmxWPmx2WH6WgFfTdu9xfkYf3k1g5wD1zccTVySEEh1"
+        assert event.creator == "GyGKxMyg1p9SsHfm15MkNUu1u9TN2JtTspcdmrtGUdse"
+        assert event.liquidity_lamports == 1_500_000_000
+        assert event.mint_authority_revoked is True
+
+
+def test_pool_instruction_invoked_by_another_program_is_found():
+    fixture = load_fixture("raydium_initialize2")
+    raw = fixture["transaction"]
+    tx = VersionedTransaction.from_bytes(base64.b64decode(raw["transaction"][0]))
+    message = tx.message
+    keys = [str(key) for key in message.account_keys]
+    instructions = list(message.instructions)
+    position = next(i for i, ix in enumerate(instructions) if keys[ix.program_id_index] == fixture["program"])
+    pool_ix = instructions[position]
+
+    # The same instruction as a CPI of a router program: the top level only carries the router call
+    router = next(index for index, key in enumerate(keys) if index > 0 and key != fixture["program"])
+    instructions[position] = CompiledInstruction(router, b"route", bytes(pool_ix.accounts))
+    header = message.header
+    rebuilt = Message.new_with_compiled_instructions(
+        header.num_required_signatures, header.num_readonly_signed_accounts, header.num_readonly_unsigned_accounts,
+        message.account_keys, message.recent_blockhash, instructions)
+    cpi = dict(raw, transaction=[base64.b64encode(bytes(VersionedTransaction.populate(rebuilt, tx.signatures))).decode(),
+                                 "base64"])
+    cpi["meta"] = dict(raw["meta"], innerInstructions=[{"index": position, "instructions": [{
+        "programIdIndex": pool_ix.program_id_index,
+        "accounts": list(pool_ix.accounts),
+        "data": b58encode(bytes(pool_ix.data)).decode(),
+        "stackHeight": 2,
+    }]}])
+
+    direct = find_pool_instruction(fixture["program"], parse_transaction(raw))
+    assert direct is not None and direct[1] == bytes(pool_ix.data)
+    assert find_pool_instruction(fixture["program"], parse_transaction(cpi)) == direct
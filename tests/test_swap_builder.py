@@ -0,0 +1,93 @@
+import base64
+import struct
+from time import monotonic
+from types import SimpleNamespace
+
+from solders.compute_budget import set_compute_unit_limit, set_compute_unit_price
+from solders.hash import Hash
+from solders.keypair import Keypair
+from solders.message import MessageV0
+from solders.pubkey import Pubkey
+
+import bot.swap_builder as swap_builder_module
+from bot.swap_builder import COMPUTE_UNIT_MARGIN, COMPUTE_UNIT_PRICE, SwapBuilder
+
+PROGRAM = Pubkey.new_unique()
+ACCOUNTS = [Pubkey.new_unique() for _ in range(4)]
+TABLE = Pubkey.new_unique()
+
+
+def table_data(addresses) -> bytes:
+    # Lookup table account layout: type, deactivation slot, last extended slot and index, authority, padding
+    meta = struct.pack("<IQQB", 1, 2 ** 64 - 1, 0, 0) + b"\x01" + bytes(Pubkey.new_unique()) + b"\x00\x00"
+    return meta + b"".join(bytes(address) for address in addresses)
+
+
+class LookupRpc:
+    def __init__(self, addresses):
+        self.addresses = addresses
+        self.fetches = 0
+
+    def get_multiple_accounts(self, pubkeys, commitment=None):
+        self.fetches += 1
+        return SimpleNamespace(context=SimpleNamespace(slot=100),
+                               value=[SimpleNamespace(data=table_data(self.addresses)) for _ in pubkeys])
+
+
+def instruction(accounts):
+    return {"programId": str(PROGRAM), "data": base64.b64encode(b"\x01").decode(),
+            "accounts": [{"pubkey": str(a), "isSigner": False, "isWritable": False} for a in accounts]}
+
+
+SWAP_INSTRUCTIONS = {
+    "computeUnitLimit": 200_000,
+    "otherInstructions": [],
+    "setupInstructions": [instruction(ACCOUNTS[:1])],
+    "swapInstruction": instruction(ACCOUNTS),
+    "cleanupInstruction": None,
+    "addressLookupTableAddresses": [str(TABLE)],
+}
+
+
+def builder(monkeypatch, rpc) -> SwapBuilder:
+    monkeypatch.setattr(swap_builder_module, "get_solana_client", lambda: rpc)
+    built = SwapBuilder()
+    built.blockhash._value = (Hash.new_unique(), 5_000, 100)
+    built.blockhash._fetched_at = monotonic()
+    return built
+
+
+def test_assemble_prepends_the_compute_budget_and_uses_lookup_tables(monkeypatch):
+    rpc = LookupRpc(ACCOUNTS)
+    payer = Keypair().pubkey()
+    message, last_valid_block_height = builder(monkeypatch, rpc).assemble(payer, [SWAP_INSTRUCTIONS])
+
+    assert isinstance(message, MessageV0) and last_valid_block_height == 5_000
+    assert message.account_keys[0] == payer
+    assert [bytes(ix.data) for ix in message.instructions[:2]] == [
+        bytes(set_compute_unit_limit(int(200_000 * COMPUTE_UNIT_MARGIN)).data), bytes(set_compute_unit_price(COMPUTE_UNIT_PRICE).data)]
+    assert len(message.instructions) == 4
+    lookup, = message.address_table_lookups
+    assert lookup.account_key == TABLE and sorted(lookup.readonly_indexes) == [0, 1, 2, 3]
+    assert rpc.fetches == 1
+
+
+def test_stale_lookup_table_is_refetched_once(monkeypatch):
+    rpc = LookupRpc(ACCOUNTS)
+    built = builder(monkeypatch, rpc)
+    built.lookup_tables.put(str(TABLE), swap_builder_module.AddressLookupTableAccount(TABLE, ACCOUNTS[:2]), 100)
+    compiled = []
+
+    class ExtendedTableMessage:
+        # Compilation against the cached copy fails, as it does when a table was extended since caching
+        @staticmethod
+        def try_compile(payer, instructions, tables, blockhash):
+            compiled.append(len(tables[0].addresses))
+            if len(tables[0].addresses) < len(ACCOUNTS):
+                raise ValueError("account not in lookup table")
+            return MessageV0.try_compile(payer, instructions, tables, blockhash)
+
+    monkeypatch.setattr(swap_builder_module, "MessageV0", ExtendedTableMessage)
+    message, _ = built.assemble(Keypair().pubkey(), [SWAP_INSTRUCTIONS])
+    assert compiled == [2, 4] and rpc.fetches == 1
+    assert len(message.address_table_lookups[0].readonly_indexes) == 4
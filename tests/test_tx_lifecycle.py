@@ -0,0 +1,179 @@
+from types import SimpleNamespace
+import httpx
+import pytest
+from solana.exceptions import SolanaRpcException
+from solana.rpc.core import RPCException
+from solders.keypair import Keypair
+from solders.signature import Signature
+from solders.transaction_status import TransactionConfirmationStatus
+import bot.tx_lifecycle as tx_lifecycle
+from bot.tx_lifecycle import TxLifecycle, ABORTED, DUPLICATE, EXPIRED, FAILED, LANDED
+
+SOL = "So11111111111111111111111111111111111111112"
+MINT = "EPjFWdd5AufqSSqeM2qZwtg2H6Dja3JBGaxCTsLJ5jg1"
+
+
+class MockRpc:
+    """
+    In-process RPC: block height advances on every sleep, sent transactions land after `land_after`
+    polls unless listed in `drop` (by send index). `send_errors` maps a send index to an exception.
+    """
+
+    def __init__(self, land_after: int = 1, drop=(), send_errors=None, status_error=None):
+        self.block_height = 1000
+        self.land_after = land_after
+        self.drop = set(drop)
+        self.send_errors = send_errors or {}
+        self.status_error = status_error
+        self.sent = {}  # signature -> block height when sent
+        self.sends = 0
+
+    def sleep(self, seconds: float):
+        self.block_height += 5
+
+    def send_raw_transaction(self, txn, opts=None):
+        index = self.sends
+        self.sends += 1
+        if index in self.send_errors:
+            raise self.send_errors[index]
+        signature = str(Signature.new_unique())
+        if index not in self.drop:
+            self.sent[signature] = self.block_height
+        return SimpleNamespace(value=signature)
+
+    def get_signature_statuses(self, signatures, search_transaction_history=False):
+        sent_at = self.sent.get(str(signatures[0]))
+        if sent_at is None or self.block_height < sent_at + 5 * self.land_after:
+            return SimpleNamespace(value=[None])
+        status = SimpleNamespace(err=self.status_error,
+                                 confirmation_status=TransactionConfirmationStatus.Finalized)
+        return SimpleNamespace(value=[status])
+
+    def get_block_height(self, commitment=None):
+        return SimpleNamespace(value=self.block_height)
+
+
+def lifecycle(rpc: MockRpc, expiry_blocks=None, **kwargs) -> TxLifecycle:
+    def swap_fn(pub_key, quote):
+        valid = rpc.block_height + expiry_blocks if expiry_blocks is not None else None
+        return {"swapTransaction": "", "lastValidBlockHeight": valid}
+
+    return TxLifecycle(rpc, Keypair(), SOL, MINT, 10 ** 8,
+                       quote_fn=lambda *args: {"outAmount": "1"}, swap_fn=swap_fn,
+                       sign_fn=lambda keypair, swap: b"signed", sleep=rpc.sleep, **kwargs)
+
+
+@pytest.fixture(autouse=True)
+def transactions_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(tx_lifecycle, "TRANSACTIONS_FILE", str(tmp_path / "transactions.json"))
+
+
+def test_lands_on_the_first_attempt():
+    rpc = MockRpc(land_after=2)
+    result = lifecycle(rpc, expiry_blocks=150).run()
+    assert result.state == LANDED and len(result.attempts) == 1 and rpc.sends == 1
+
+
+def test_expired_attempt_is_resubmitted_after_the_block_height_passes():
+    rpc = MockRpc(drop={0})
+    result = lifecycle(rpc, expiry_blocks=20).run()
+    assert result.state == LANDED
+    assert [a.signature is not None for a in result.attempts] == [True, True]
+    assert rpc.block_height > result.attempts[0].last_valid_block_height
+
+
+def test_resubmit_limit_reports_expired():
+    rpc = MockRpc(drop={0, 1, 2})
+    result = lifecycle(rpc, expiry_blocks=20, max_resubmits=2).run()
+    assert result.state == EXPIRED and rpc.sends == 3
+
+
+def test_on_chain_error_is_not_resubmitted():
+    rpc = MockRpc(status_error="InstructionError(2, Custom(6001))")
+    result = lifecycle(rpc, expiry_blocks=150).run()
+    assert result.state == FAILED and rpc.sends == 1 and "6001" in result.error
+
+
+def test_preflight_rejection_is_final_and_keeps_its_error():
+    error = RPCException("Transaction simulation failed: insufficient lamports 1000, need 5000")
+    rpc = MockRpc(send_errors={0: error})
+    result = lifecycle(rpc, expiry_blocks=150).run()
+    assert result.state == ABORTED and rpc.sends == 1
+    assert "insufficient lamports" in result.error
+
+
+def test_transport_error_is_retried():
+    error = SolanaRpcException(httpx.ConnectError("connection refused"), None, None, None)
+    rpc = MockRpc(send_errors={0: error})
+    result = lifecycle(rpc, expiry_blocks=150).run()
+    assert result.state == LANDED and rpc.sends == 2
+
+
+def test_repeated_transport_errors_end_with_the_last_error():
+    error = SolanaRpcException(httpx.ConnectError("connection refused"), None, None, None)
+    rpc = MockRpc(send_errors={0: error, 1: error, 2: error})
+    result = lifecycle(rpc, expiry_blocks=150, max_resubmits=2).run()
+    assert result.state == ABORTED and rpc.sends == 3
+    assert result.error.startswith("resubmit limit reached, last error:") and "ConnectError" in result.error
+
+
+def test_unknown_expiry_without_status_stops_waiting():
+    rpc = MockRpc(drop={0})
+    result = lifecycle(rpc, expiry_blocks=None).run()
+    assert result.state == ABORTED and rpc.sends == 1 and result.signature
+    assert "no status" in result.error
+
+
+def test_same_intent_in_flight_is_refused():
+    rpc = MockRpc()
+    first = lifecycle(rpc, expiry_blocks=150)
+    tx_lifecycle._in_flight.add(first.intent_key)
+    try:
+        assert lifecycle(rpc, expiry_blocks=150, intent_key=first.intent_key).run().state == DUPLICATE
+    finally:
+        tx_lifecycle._in_flight.discard(first.intent_key)
+
+
+def test_finalization_is_recorded_and_reported_once(monkeypatch):
+    rpc = MockRpc(land_after=1)
+    events, records = [], []
+    monkeypatch.setattr(tx_lifecycle, "record_transaction", lambda signature, **fields: records.append(fields))
+    confirmed = SimpleNamespace(err=None, confirmation_status=TransactionConfirmationStatus.Confirmed)
+    finalized = SimpleNamespace(err=None, confirmation_status=TransactionConfirmationStatus.Finalized)
+    statuses = iter([confirmed, confirmed, finalized])
+    rpc.get_signature_statuses = lambda signatures, search_transaction_history=False: SimpleNamespace(
+        value=[next(statuses, finalized)])
+    sleeps = []
+    tracker = lifecycle(rpc, expiry_blocks=150, on_status=lambda event, signature, attempt: events.append(event))
+    tracker.sleep = sleeps.append
+
+    tracker._finalize(str(Signature.new_unique()))
+    assert len(sleeps) == 3
+    assert events == ["finalized"] and len(records) == 1 and records[0]["commitment"] == "finalized"
+
+
+def test_status_found_only_in_history_after_expiry_lands():
+    rpc = MockRpc()
+    landed = SimpleNamespace(err=None, confirmation_status=TransactionConfirmationStatus.Finalized)
+    calls = []
+
+    def statuses(signatures, search_transaction_history=False):
+        calls.append(search_transaction_history)
+        if len(calls) > 100:
+            raise AssertionError("status polled without end")
+        return SimpleNamespace(value=[landed if search_transaction_history else None])
+
+    rpc.get_signature_statuses = statuses
+    result = lifecycle(rpc, expiry_blocks=20).run()
+    assert result.state == LANDED and rpc.sends == 1
+    assert calls[-1] is True and len(calls) < 20
+
+
+def test_commitment_below_the_requested_level_is_not_reported_as_landed():
+    rpc = MockRpc()
+    processed = SimpleNamespace(err=None, confirmation_status=TransactionConfirmationStatus.Processed)
+    rpc.get_signature_statuses = lambda signatures, search_transaction_history=False: SimpleNamespace(
+        value=[processed])
+    result = lifecycle(rpc, expiry_blocks=10_000, success_commitment="confirmed").run()
+    assert result.state == ABORTED and result.signature
+    assert result.error == "landed at processed, requested confirmed not reached"
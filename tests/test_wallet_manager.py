@@ -0,0 +1,34 @@
+import threading
+
+import bot.wallet_manager as wallet_manager
+
+
+def test_settings_writes_never_expose_a_partial_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(wallet_manager, "USERS_FILE", str(tmp_path / "users.json"))
+    wallet_manager.save_user_data(1, "key", "address")
+    for index in range(50):
+        wallet_manager.add_user_wallet(1, f"key{index}", f"address{index}")
+    done, errors = threading.Event(), []
+
+    def read():
+        while not done.is_set():
+            try:
+                wallet_manager.get_user_setting(1, "max_resubmits")
+            except Exception as e:
+                errors.append(e)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    writers = [threading.Thread(target=lambda n=n: [wallet_manager.set_user_setting(1, f"s{n}", i) for i in range(50)])
+               for n in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+    done.set()
+    for reader in readers:
+        reader.join()
+
+    assert errors == []
+    assert [wallet_manager.get_user_setting(1, f"s{n}") for n in range(4)] == [49] * 4
@@ -3,7 +3,7 @@ import json
 
 def ensure_directories_and_files_exist():
     # Create basic settings.json and other jsons
-    directories = ["data", "logs"]
+    directories = ["data", "data/history", "data/prices", "logs"]
     files = {
         "data/settings.json": {
             "telegram_token": "",
@@ -12,7 +12,11 @@ def ensure_directories_and_files_exist():
         },
         "data/balances.json": {},
         "data/transactions.json": {},
-        "data/users.json": {}
+        "data/users.json": {},
+        "data/orders.json": [],
+        "data/dca.json": {"next_id": 1, "schedules": []},
+        "data/sniper.json": {},
+        "data/paper.json": {}
     }
 
     # Create directory